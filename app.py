@@ -1,101 +1,35 @@
 import streamlit as st
 import os
-import json
-import tempfile
 import time
-import requests
-import numpy as np
-from PIL import Image, ImageDraw, ImageFont # Pillow 모듈
-import random
-import textwrap
 
 # --- 라이브러리 임포트 및 예외 처리 ---
-# 1. Google GenAI (텍스트용 - 구버전 SDK)
-import google.generativeai as genai_old
+# (Google SDK/MoviePy는 워커 프로세스의 pipeline_module/render_module에서만 씀)
 
-# 2. Google GenAI (이미지용 - 신버전 SDK)
-# pip install google-genai
-try:
-    from google import genai
-    from google.genai import types
-except ImportError:
-    st.error("❌ 'google-genai' 라이브러리가 설치되지 않았습니다. pip install google-genai")
-    st.stop()
-
-# 3. Google TTS
-from google.cloud import texttospeech
-from google.oauth2 import service_account
-
-# 4. Pillow 패치 (MoviePy 1.x 호환성)
-import PIL.Image
-if not hasattr(PIL.Image, 'ANTIALIAS'):
-    PIL.Image.ANTIALIAS = PIL.Image.LANCZOS
-
-# 5. MoviePy
-from moviepy.editor import *
-
-# 6. .env 로드
+# 1. .env 로드
 try:
     from dotenv import load_dotenv
     load_dotenv()
 except ImportError:
     pass
 
-# --- [데이터 사전] 화풍 및 BGM 매핑 ---
+# 2. 프로바이더별 동시 실행 한도
+from executor_module import load_provider_limits
 
-# 1. 화풍 (Style) 매핑: 사용자가 선택하면 -> 전문 프롬프트로 변환
-STYLE_PROMPTS = {
-    "📸 실사: 시네마틱 (Cinematic)": "Cinematic shot, 4k, hyper-realistic, shallow depth of field, dramatic lighting, shot on Sony A7R",
-    "📸 실사: 인스타 감성 (Aesthetic)": "Polaroid style, film grain, soft natural lighting, candid shot, aesthetic, VSCO filter",
-    "🎨 2D: 웹툰/만화 (Webtoon)": "Korean webtoon style, cel shaded, vibrant colors, clean lines, anime style, manhwa",
-    "🎨 3D: 픽사 스타일 (3D Animation)": "Disney Pixar style 3D render, cute, soft texture, volumetric lighting, Unreal Engine 5",
-    "🖌️ 예술: 수채화 (Watercolor)": "Watercolor painting, soft brush strokes, pastel colors, artistic, dreamy",
-    "🌃 사이버펑크 (Cyberpunk)": "Cyberpunk, neon lights, futuristic, dark atmosphere, glowing effects"
-}
+# 3. 프로바이더 클라이언트 공유 레지스트리
+from client_module import get_default_registry
 
-# --- [데이터 사전 추가] 장르별 최적화 설정 ---
-GENRE_SETTINGS = {
-    "📰 정보/뉴스 (Info)": {
-        "persona": "Professional Journalist",
-        "max_chars": 250, # 58초 꽉 채움
-        "structure": "Hook (Shocking Fact) -> Body (3 Key Facts) -> Outro (Conclusion)",
-        "tone": "Objective, clear, analytical, trustworthy",
-        "pacing": "Fast and informative"
-    },
-    "👄 썰/스토리 (Story)": {
-        "persona": "Friendly Storyteller",
-        "max_chars": 210, # 연기할 시간 확보
-        "structure": "Hook (Emotional Reaction) -> Body (Situation & Crisis) -> Outro (Twist/Ending)",
-        "tone": "Casual, emotional, conversational (use '음슴체' or slang)",
-        "pacing": "Dynamic with pauses for emphasis"
-    },
-    "🛍️ 리뷰/후기 (Review)": {
-        "persona": "Sharp Product Reviewer",
-        "max_chars": 180, # 제품 보여줄 시간 확보
-        "structure": "Hook (Result first) -> Body (Pros & Cons) -> Outro (Final Rating)",
-        "tone": "Honest, direct, trendy, critical",
-        "pacing": "Moderate, focus on visuals"
-    },
-    "🕯️ 감성/동기부여 (Motivation)": {
-        "persona": "Life Coach & Poet",
-        "max_chars": 150, # 여백의 미
-        "structure": "Hook (Deep Question) -> Body (Insight/Advice) -> Outro (Call to Action)",
-        "tone": "Soft, warm, inspiring, calm",
-        "pacing": "Slow, leaving space for music"
-    }
-}
+# 4. 렌더링 백엔드 목록 (moviepy / ffmpeg / 씬 병렬)
+from render_module import RENDER_BACKENDS, RENDER_PROFILES
 
-# 2. BGM 매핑: 사용자가 선택하면 -> 무료 음원 URL로 변환
-# (실제 운영 시에는 저작권 확인된 S3 링크나 Pexels/Youtube Audio Library 파일 권장)
-BGM_URLS = {
-    "🔇 없음 (Mute)": None,
-    "☕ Lo-fi / 칠합 (Study)": "https://cdn.pixabay.com/download/audio/2022/05/27/audio_1808fbf07a.mp3",
-    "🌞 어쿠스틱 / 브이로그 (Daily)": "https://cdn.pixabay.com/download/audio/2022/03/24/audio_c8c8a73467.mp3", # 임시 URL (실제론 다른 파일 추천)
-    "🏢 코퍼레이트 / 뉴스 (Info)": "https://cdn.pixabay.com/download/audio/2022/03/10/audio_c3d0b26f58.mp3",
-    "🎬 시네마틱 / 웅장함 (Epic)": "https://cdn.pixabay.com/download/audio/2022/03/15/audio_736862b691.mp3",
-    "🤪 펑키 / 예능 (Fun)": "https://cdn.pixabay.com/download/audio/2022/03/24/audio_823e8396d6.mp3"
-}
+# 5. 대본 수정 중 백그라운드 미리 받기 (Prefetch)
+from prefetch_module import Prefetcher
 
+# 6. Streamlit 없이 도는 생성 파이프라인 + 데이터 사전 (화풍/장르/BGM)
+import pipeline_module as pipeline
+from pipeline_module import BGM_URLS, GENRE_SETTINGS, STYLE_PROMPTS
+
+# 7. 작업 대기열 (SQLite) + 워커 프로세스
+from job_module import FINISHED_STATES, JobQueue, WorkerGroup
 
 # --- 1. 환경 및 UI 설정 ---
 st.set_page_config(page_title="AI 영상 공장 (Google Edition)", page_icon="🍌", layout="wide")
@@ -111,6 +45,37 @@ def get_secret(key_name):
         pass
     return os.getenv(key_name)
 
+@st.cache_resource
+def get_client_registry():
+    """[Pool] 모든 세션/스레드가 공유하는 프로바이더 클라이언트 레지스트리 (프로세스당 1개)"""
+    return get_default_registry()
+
+@st.cache_resource
+def get_job_queue():
+    """[Queue] 작업 대기열 (모든 세션이 같은 DB 파일을 씀)"""
+    return JobQueue()
+
+@st.cache_resource
+def get_job_workers():
+    """
+    [Worker] 서버 프로세스당 하나의 워커 묶음.
+    JOB_WORKERS=0이면 띄우지 않음 (별도 서버에서 python job_module.py 실행)
+    """
+    return WorkerGroup(int(get_secret("JOB_WORKERS") or 2))
+
+def start_job_workers():
+    """
+    [Worker] 서버 설정(secrets.toml/환경 변수)의 키는 DB에 저장하지 않으므로 환경 변수로 워커에 넘겨 줍니다.
+    사이드바에 직접 입력한 키는 작업을 넣을 때 그 작업에만 넘깁니다. (get_job_workers().submit)
+    """
+    env = {name: get_secret(name) for name in pipeline.SECRET_ENV.values()}
+    return get_job_workers().ensure(env)
+
+@st.cache_resource
+def warm_up_clients(gemini_key, tts_key_json, tts_key_path):
+    """[Warm] 키 조합별로 한 번만 클라이언트를 미리 만들어 둡니다."""
+    return get_client_registry().warm_up(gemini_key, tts_key_json, tts_key_path)
+
 # 사이드바 설정
 with st.sidebar:
     st.header("⚙️ 스튜디오 설정")
@@ -130,12 +95,16 @@ with st.sidebar:
         st.success("✅ Google TTS: Connected")
     else:
         st.error("❌ Google TTS: Missing Credentials")
+    
+    # 클라이언트 예열 (gRPC 채널/인증 정보를 미리 준비)
+    warm_up_clients(gemini_key, tts_key_json, tts_key_path if tts_key_path and os.path.exists(tts_key_path) else None)
         
     # [NEW] Pexels 키 입력 추가
     # secrets.toml에 PEXELS_API_KEY가 있으면 그걸 쓰고, 없으면 입력창을 띄움
     pexels_key_env = get_secret("PEXELS_API_KEY")
+    pexels_key_input = None # 직접 입력한 키는 DB에 저장하지 않고 이 세션이 넣은 작업에만 넘김
     if not pexels_key_env:
-        os.environ["PEXELS_API_KEY"] = st.text_input("Pexels API Key (스톡 영상용)", type="password")
+        pexels_key_input = st.text_input("Pexels API Key (스톡 영상용)", type="password") or None
     else:
         # 이미 환경변수에 있으면 성공 표시
         st.success("✅ Pexels API: Connected")
@@ -202,6 +171,7 @@ with st.sidebar:
     }
     selected_voice_label = st.selectbox("내레이터", list(voice_options.keys()), index=0)
     selected_voice_name = voice_options[selected_voice_label]
+    use_tts_batch = st.checkbox("전체 씬 한 번에 합성 (Batch TTS)", value=True, help="모든 씬 내레이션을 요청 1회로 합성한 뒤 씬별로 자릅니다. 한도를 넘으면 씬별 합성으로 자동 전환")
 
     # [4] BGM (Dictionary 활용)
     st.subheader("🎵 배경음악 (BGM)")
@@ -211,614 +181,185 @@ with st.sidebar:
     st.subheader("📝 자막 (Subtitles)")
     use_subtitles = st.checkbox("자막 포함 (Subtitles)", value=True) # 기본값은 켜짐
     
-    st.divider()
-    num_scenes = st.slider("씬(Scene) 개수", 2, 8, 4)
-    
-
-# --- 2. 핵심 모듈 함수 ---
-def generate_script_json(topic, num_scenes, genre_key):
-    """
-    [Final Fix] 컷 쪼개기('||') 지시사항 추가 + Gemini 2.5 Flash 적용
-    """
-    if not gemini_key: 
-        st.error("API 키가 없습니다.")
-        return None
-    
-    settings = GENRE_SETTINGS.get(genre_key, GENRE_SETTINGS["📰 정보/뉴스 (Info)"])
-    
-    try:
-        client = genai.Client(api_key=gemini_key)
-        model_id = "gemini-2.5-flash" # 최신 모델
-        
-        prompt_text = f"""
-        You are a {settings['persona']} specialized in creating viral YouTube Shorts.
-        Create a script for the topic: '{topic}'
-        
-        [GENRE SPECIFIC RULES]
-        - **Genre**: {genre_key}
-        - **Tone**: {settings['tone']}
-        - **Structure Strategy**: Follow {settings['structure']}
-        - **Length Constraint**: Keep the Korean narrative STRICTLY under **{settings['max_chars']} characters** (including spaces). This is critical for video pacing.
-        
-        [CONSTRAINT - SCENE COUNT]
-        Generate exactly {num_scenes} scenes.
-        
-        [VISUAL RULES]
-        1. "visual_prompt": **KOREAN (한국어)**.
-        2. **Dynamic Cuts (Important)**: 
-           - To make the video dynamic, split multiple visual actions in one scene using " || ".
-           - Example: "남자가 커피를 마신다 || 창밖을 바라보는 남자 || 클로즈업 된 커피잔"
-        3. **Stock Video**:
-           - Use `[VIDEO] keyword` for generic scenes (Sky, City, Coffee).
-        4. **Visual Strategy**:
-           - If the genre is 'Review' or 'Info', focus on showing the object/fact clearly.
-           - If the genre is 'Story' or 'Motivation', focus on facial expressions and atmosphere.
-        
-        [OUTPUT JSON FORMAT]
-        {{
-          "video_title": "Title in Korean",
-          "scenes": [
-            {{ "seq": 1, "narrative": "Korean script...", "visual_prompt": "Description 1 || Description 2..." }},
-            ...
-          ]
-        }}
-        """
-        
-        response = client.models.generate_content(
-            model=model_id,
-            contents=prompt_text,
-            config=types.GenerateContentConfig(
-                response_mime_type="application/json"
-            )
-        )
-        
-        text = response.text.strip()
-        
-        try:
-            return json.loads(text)
-        except json.JSONDecodeError:
-            # 파싱 실패 시 수동 추출
-            start_idx = text.find('{')
-            end_idx = text.rfind('}') + 1
-            if start_idx != -1 and end_idx != -1:
-                return json.loads(text[start_idx:end_idx])
-            else:
-                return None
-        
-    except Exception as e:
-        # 2.5 실패 시 2.0으로 백업
-        if "404" in str(e):
-             st.warning(f"Gemini 2.5를 찾을 수 없어 2.0으로 재시도합니다.")
-             try:
-                response = client.models.generate_content(
-                    model="gemini-2.0-flash-exp",
-                    contents=prompt_text,
-                    config=types.GenerateContentConfig(response_mime_type="application/json")
-                )
-                return json.loads(response.text.strip())
-             except:
-                 pass
-        st.error(f"기획 오류: {e}")
-        return None
-    
-
-def generate_image_google(prompt, filename, ref_image_path=None):
-    """
-    [Stabilized] Gemini 3 Pro Image: 503 과부하 에러 시 자동 재시도(Retry) 로직 추가
-    """
-    if not gemini_key: return None
-    
-    output_path = os.path.join(tempfile.gettempdir(), filename)
-
-    # [설정] 최대 재시도 횟수 및 대기 시간
-    max_retries = 3 
-    
-    client = genai.Client(api_key=gemini_key)
-    
-    # 1. 모델 우선순위 설정
-    # 3-pro가 503이 너무 심하면 2.0-flash로 대체 가능하지만, 일단 3-pro 재시도 시도
-    model_id = "gemini-3-pro-image-preview" # 3.0이 너무 불안정하면 이걸로 변경하세요 (현재 더 안정적)
-    # model_id = "gemini-3-pro-image-preview" 
-
-    for attempt in range(max_retries):
-        try:
-            # 1. 프롬프트 구성 (텍스트)
-            contents_parts = [types.Part.from_text(text=prompt + ", consistent character identity, high fidelity")]
-
-            # 2. 레퍼런스 이미지 추가
-            if ref_image_path and os.path.exists(ref_image_path):
-                with open(ref_image_path, "rb") as f:
-                    img_data = f.read()
-                    contents_parts.append(types.Part.from_bytes(data=img_data, mime_type="image/png"))
-
-            contents = [types.Content(role="user", parts=contents_parts)]
-            
-            generate_content_config = types.GenerateContentConfig(
-                response_modalities=["IMAGE"],
-                image_config=types.ImageConfig(image_size="1K"),
-            )
-            
-            # API 요청
-            response = client.models.generate_content(
-                model=model_id,
-                contents=contents,
-                config=generate_content_config,
-            )
-            
-            if response.candidates and response.candidates[0].content.parts:
-                for part in response.candidates[0].content.parts:
-                    if part.inline_data and part.inline_data.data:
-                        with open(output_path, "wb") as f:
-                            f.write(part.inline_data.data)
-                        return output_path
-            
-            # 여기까지 왔는데 리턴이 안 됐다면 뭔가 이상한 것
-            return None
-
-        except Exception as e:
-            error_msg = str(e)
-            # 503(과부하) 또는 429(너무 많은 요청) 에러인 경우
-            if "503" in error_msg or "429" in error_msg:
-                wait_time = (attempt + 1) * 3 # 1회차: 3초, 2회차: 6초 대기
-                print(f"⚠️ 서버 과부하(503). {wait_time}초 후 재시도합니다... ({attempt+1}/{max_retries})")
-                time.sleep(wait_time)
-                continue # 다시 루프의 처음으로
-            else:
-                # 다른 치명적인 에러면 그냥 종료
-                st.warning(f"이미지 생성 오류(중단): {e}")
-                return None
-    
-    st.error("❌ 3번 재시도했으나 서버 응답이 없습니다. 나중에 다시 시도해주세요.")
-    return None
-
-def generate_audio(text, filename, voice_name="ko-KR-Standard-C"):
-    """
-    [Voice] Google TTS: 성우 선택 기능 추가
-    """
-    output_path = os.path.join(tempfile.gettempdir(), filename)
+    # [NEW] 렌더링 엔진 선택 (같은 작업으로 속도 비교 가능)
+    st.subheader("🎞️ 렌더링 엔진 (Backend)")
+    render_backend = st.radio(
+        "렌더링 엔진", RENDER_BACKENDS, index=RENDER_BACKENDS.index("parallel"), horizontal=True,
+        help="moviepy: 파이썬 프레임 합성, 씬 하나씩 열고 닫으며 인코딩 / ffmpeg: 필터그래프 하나로 네이티브 렌더링 / "
+             "parallel: 씬마다 별도 프로세스로 인코딩 후 스트림 복사로 합침, 수정한 씬만 다시 렌더링 (실패 시 moviepy로 자동 전환)"
+    )
+    render_profile = st.radio(
+        "렌더링 품질", list(RENDER_PROFILES), index=list(RENDER_PROFILES).index("final"), horizontal=True,
+        help="draft: 360p/12fps, 모션 없이 빠르게 뽑는 미리보기 (컷/호흡 확인용) / final: 원본 해상도 최종본"
+    )
     
-    # 인증 (기존 로직 유지)
-    credentials = None
-    if tts_key_json:
-        try:
-            creds_info = json.loads(tts_key_json, strict=False)
-            credentials = service_account.Credentials.from_service_account_info(creds_info)
-        except: return None
-    elif tts_key_path and os.path.exists(tts_key_path):
-        credentials = service_account.Credentials.from_service_account_file(tts_key_path)
-    else:
-        return None
-
-    try:
-        client = texttospeech.TextToSpeechClient(credentials=credentials)
-        input_text = texttospeech.SynthesisInput(text=text)
-        
-        # [핵심 수정] 전달받은 voice_name 적용
-        # 성별(Gender)은 목소리 이름에 맞춰 자동 설정
-        if "Standard-A" in voice_name or "Standard-B" in voice_name:
-            gender = texttospeech.SsmlVoiceGender.FEMALE
-        else:
-            gender = texttospeech.SsmlVoiceGender.MALE
-            
-        voice = texttospeech.VoiceSelectionParams(
-            language_code="ko-KR", 
-            name=voice_name, 
-            ssml_gender=gender
-        )
-        
-        audio_config = texttospeech.AudioConfig(audio_encoding=texttospeech.AudioEncoding.MP3)
-        
-        response = client.synthesize_speech(input=input_text, voice=voice, audio_config=audio_config)
-        with open(output_path, "wb") as out:
-            out.write(response.audio_content)
-        return output_path
-        
-    except Exception as e:
-        st.error(f"🎙️ TTS 오류: {e}")
-        return None
+    st.divider()
+    num_scenes = st.slider("씬(Scene) 개수", 2, 50, 4) # 씬 단위로 열고 닫으며 렌더링하므로 롱폼도 메모리 일정
 
-def apply_random_motion(clip):
-    """
-    [Motion] 줌인, 줌아웃, 좌우/상하 패닝 중 하나를 랜덤으로 적용합니다.
-    """
-    try:
-        import cv2
-    except ImportError:
-        return clip
+    # [NEW] 프로바이더별 동시 실행 한도 (secrets/환경변수 CONCURRENCY_* 가 기본값)
+    default_limits = load_provider_limits(getter=get_secret)
+    with st.expander("⚡ 동시 처리 설정 (Concurrency)"):
+        provider_limits = {
+            "tts": st.number_input("TTS 동시 요청", 1, 16, default_limits["tts"]),
+            "image": st.number_input("이미지 동시 요청", 1, 16, default_limits["image"]),
+            "veo": st.number_input("Veo 동시 요청", 1, 8, default_limits["veo"]),
+            "stock": st.number_input("스톡/효과음 동시 다운로드", 1, 16, default_limits["stock"]),
+        }
 
-    # 가능한 효과 목록
-    effects = ['zoom_in', 'zoom_out', 'pan_left', 'pan_right', 'pan_up', 'pan_down']
-    effect_type = random.choice(effects)
+    # [NEW] 느린 단계 찾기: 단계별 트레이스(chrome://tracing 또는 ui.perfetto.dev에서 열기) + 렌더링 cProfile
+    with st.expander("🔬 진단 (Tracing)"):
+        trace_enabled = st.checkbox("단계별 트레이스 저장", value=False)
+        profile_render = st.checkbox("렌더링 cProfile 기록", value=False)
     
-    # 효과 강도 (너무 어지럽지 않게 조절)
-    speed = 0.04  # 움직임 속도
-
-    def fl(get_frame, t):
-        img = get_frame(t)
-        h, w = img.shape[:2]
-        
-        # 시간 t에 따른 진행률 (0.0 ~ 1.0) -> 클립 끝날 때 최대 움직임
-        progress = t / clip.duration if clip.duration > 0 else 0
-        scale = 1 + (speed * progress) # 1.0 ~ 1.04
-        
-        # 원본 크기 유지를 위한 리사이징 계산
-        new_w, new_h = int(w * scale), int(h * scale)
-        
-        # OpenCV로 이미지 확대 (기본 베이스)
-        img_resized = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
-        
-        # 잘라낼 위치(Crop) 결정 로직
-        if effect_type == 'zoom_in':
-            # 중앙을 향해 줌인 (점점 안쪽을 보여줌)
-            x = (new_w - w) // 2
-            y = (new_h - h) // 2
-            
-        elif effect_type == 'zoom_out':
-            # 줌아웃은 반대로 구현이 까다로우므로, 
-            # "이미 확대된 상태에서 시작해서 원래대로 돌아오는" 로직 대신
-            # 여기서는 편의상 "약한 줌인"으로 대체하거나 역방향 구현 필요.
-            # (간단하게 구현하기 위해 zoom_in과 줌 포인트를 다르게 설정)
-            x = (new_w - w) // 2
-            y = (new_h - h) // 2
-            
-        elif effect_type == 'pan_left':
-            # 오른쪽에서 왼쪽으로 이동 (보여주는 뷰포트가 왼쪽으로 감 -> x는 0에서 시작해서 커짐?? 반대임)
-            # 이미지의 오른쪽 끝을 보여주다가 -> 왼쪽으로 이동
-            # x: (new_w - w) -> 0 (감소)
-            max_x = new_w - w
-            x = int(max_x * (1 - progress))
-            y = (new_h - h) // 2 # Y는 중앙 고정
-            
-        elif effect_type == 'pan_right':
-            # 왼쪽에서 오른쪽으로 이동
-            # x: 0 -> (new_w - w) (증가)
-            max_x = new_w - w
-            x = int(max_x * progress)
-            y = (new_h - h) // 2
-            
-        elif effect_type == 'pan_up':
-            # 아래에서 위로
-            x = (new_w - w) // 2
-            max_y = new_h - h
-            y = int(max_y * (1 - progress))
-            
-        elif effect_type == 'pan_down':
-            # 위에서 아래로
-            x = (new_w - w) // 2
-            max_y = new_h - h
-            y = int(max_y * progress)
-            
-        else:
-            # 기본 중앙
-            x, y = (new_w - w) // 2, (new_h - h) // 2
-
-        # 좌표가 음수거나 범위를 벗어나지 않게 클리핑
-        x = max(0, min(x, new_w - w))
-        y = max(0, min(y, new_h - h))
-        
-        return img_resized[y:y+h, x:x+w]
 
-    return clip.fl(fl)
-
-def get_bgm_path(mood_key):
-    """
-    선택된 BGM 키에 해당하는 URL을 다운로드합니다.
-    """
-    if not mood_key or mood_key == "🔇 없음 (Mute)":
-        return None
-    
-    url = BGM_URLS.get(mood_key)
-    if not url: return None
-    
-    # [핵심 수정 1] 파일명에서 한글 제거 (괄호 안의 영어 키워드만 추출)
-    # 예: "🌞 어쿠스틱 / 브이로그 (Daily)" -> "Daily"
-    try:
-        if '(' in mood_key:
-            english_key = mood_key.split('(')[-1].replace(')', '').strip()
-        else:
-            english_key = "default"
-    except:
-        english_key = "bgm"
-        
-    # 영문/숫자만 남기기
-    safe_name = "".join(x for x in english_key if x.isalnum())
-    filename = f"bgm_{safe_name}.mp3"
-    filepath = os.path.join(tempfile.gettempdir(), filename)
-    
-    # 캐싱 확인 및 유효성 검사
-    if os.path.exists(filepath):
-        # 파일이 있는데 크기가 너무 작으면(1KB 미만) 삭제하고 다시 받음
-        if os.path.getsize(filepath) < 1000:
-            os.remove(filepath)
-        else:
-            return filepath
-        
-    try:
-        # [핵심 수정 2] 다운로드 검증
-        headers = {'User-Agent': 'Mozilla/5.0'}
-        response = requests.get(url, headers=headers, timeout=10)
-        
-        if response.status_code != 200:
-            print(f"❌ BGM 다운로드 실패(Status): {mood_key}")
-            return None
-            
-        # 내용이 HTML 에러페이지인지 확인 (크기 체크)
-        if len(response.content) < 1000:
-            print(f"❌ BGM 파일 손상(Too small): {mood_key}")
-            return None
-            
-        with open(filepath, "wb") as f:
-            f.write(response.content)
-        return filepath
-    except Exception as e:
-        print(f"❌ BGM 네트워크 오류: {e}")
-        return None
-
-def get_sfx_path(sfx_name):
-    """
-    [안전 버전] 효과음 다운로드 및 검증
-    """
-    if not sfx_name or sfx_name == "None":
-        return None
-        
-    # 1. 효과음 URL 매핑 (접근이 더 원활한 GitHub 소스 등으로 대체 권장)
-    # 아래는 예시용 URL이며, 실제 서비스시 본인의 S3나 호스팅 URL을 넣는 것이 가장 안전합니다.
-    sfx_library = {
-        "Whoosh (전환)": "https://cdn.pixabay.com/download/audio/2022/03/24/audio_c8c8a73467.mp3", # Pixabay Free
-        "Ding (정답/아이디어)": "https://cdn.pixabay.com/download/audio/2022/03/15/audio_736862b691.mp3",
-        "Camera (찰칵)": "https://cdn.pixabay.com/download/audio/2022/03/10/audio_c3d0b26f58.mp3",
-        "Pop (등장)": "https://cdn.pixabay.com/download/audio/2022/03/10/audio_c8c8a73467.mp3", # 임시 대체
-        "Keyboard (타자)": "https://cdn.pixabay.com/download/audio/2022/03/24/audio_823e8396d6.mp3"
-    }
-    
-    url = sfx_library.get(sfx_name)
-    if not url: return None
-    
-    # 2. 파일명 안전하게 변환 (한글 제거, 순수 영문/숫자만 남김)
-    # 예: "Pop (등장)" -> "Pop"
-    safe_key = sfx_name.split('(')[0].strip() # 괄호 앞부분만 가져옴
-    safe_name = "".join(x for x in safe_key if x.isalnum())
-    filename = f"sfx_{safe_name}.mp3"
-    filepath = os.path.join(tempfile.gettempdir(), filename)
-    
-    # 3. 캐싱 및 다운로드 검증
-    if not os.path.exists(filepath):
-        try:
-            # 타임아웃 3초 설정
-            headers = {'User-Agent': 'Mozilla/5.0'}
-            response = requests.get(url, headers=headers, timeout=3)
-            
-            # (중요) 요청이 성공했는지 확인
-            if response.status_code != 200:
-                print(f"❌ 효과음 다운로드 실패(HTTP Error): {sfx_name}")
-                return None
-                
-            # (중요) 파일 내용이 너무 작으면(1KB 미만) 가짜 파일(HTML 에러페이지)일 확률 높음
-            if len(response.content) < 1000:
-                print(f"❌ 효과음 파일 손상 의심(Too small): {sfx_name}")
-                return None
-                
-            with open(filepath, "wb") as f:
-                f.write(response.content)
-                
-        except Exception as e:
-            print(f"❌ 효과음 네트워크 오류: {e}")
-            return None
-            
-    return filepath
-
-# --- (get_sfx_path 함수 아래에 추가) ---
+# --- 2. 핵심 모듈 함수 ---
+# (생성 함수 본체는 pipeline_module에 있고, 여기서는 사이드바 값으로 설정 dict만 만듭니다)
+def job_settings():
+    """사이드바 선택값 -> 파이프라인 설정 dict"""
+    return pipeline.make_job_settings(
+        gemini_key=gemini_key,
+        tts_key_json=tts_key_json,
+        tts_key_path=tts_key_path,
+        pexels_key=pexels_key_input or get_secret("PEXELS_API_KEY"),
+        character_desc=character_desc,
+        video_style=video_style,
+        voice_name=selected_voice_name,
+        aspect_ratio="9:16" if is_shorts else "16:9",
+        bgm_mood=bgm_mood,
+        use_subtitles=use_subtitles,
+        use_tts_batch=use_tts_batch,
+        render_backend=render_backend,
+        render_profile=render_profile,
+        provider_limits=provider_limits,
+        trace=trace_enabled,
+        profile_render=profile_render,
+    )
 
-def get_korean_font():
+def generate_script_json(topic, num_scenes, genre_key):
     """
-    한글 폰트(나눔고딕)를 다운로드하여 경로를 반환합니다.
+    [Final Fix] 컷 쪼개기('||') 지시사항 추가 + Gemini 2.5 Flash 적용
     """
-    font_path = os.path.join(tempfile.gettempdir(), "NanumGothic-Bold.ttf")
+    return pipeline.generate_script_json(job_settings(), topic, num_scenes, genre_key, log=st.warning)
     
-    # 이미 있으면 반환
-    if os.path.exists(font_path):
-        return font_path
-        
-    # 없으면 다운로드 (Google Fonts)
-    url = "https://github.com/google/fonts/raw/main/ofl/nanumgothic/NanumGothic-Bold.ttf"
-    try:
-        response = requests.get(url, timeout=10)
-        with open(font_path, "wb") as f:
-            f.write(response.content)
-        return font_path
-    except Exception:
-        return None
-
-def create_subtitle_clip(text, duration, font_path):
+def start_prefetch(scenes):
     """
-    [Ratio Aware] 비율에 맞춰 자막 위치와 줄바꿈 자동 조절
+    [Prefetch] 기획안이 나오면 사용자가 대본을 고치는 동안 앵커 이미지, 내레이션 TTS,
+    [VIDEO] 스톡 영상 검색/다운로드를 미리 시작합니다. 결과는 자산 캐시에 저장되어
+    작업 워커가 같은 내용을 요청하면 바로 캐시에서 가져갑니다.
     """
-    try:
-        # 전역 변수 해상도 사용
-        w, h = VIDEO_W, VIDEO_H
-        img = PIL.Image.new('RGBA', (w, h), (255, 255, 255, 0))
-        draw = PIL.ImageDraw.Draw(img)
-        
-        font_size = 40 if not is_shorts else 50 # 쇼츠는 폰트 좀 더 크게
-        try:
-            if font_path:
-                font = PIL.ImageFont.truetype(font_path, font_size)
-            else:
-                font = PIL.ImageFont.load_default()
-        except:
-            font = PIL.ImageFont.load_default()
-
-        # [핵심] 쇼츠면 폭이 좁으므로 줄바꿈을 더 자주 (20자 vs 35자)
-        wrap_width = 20 if is_shorts else 35
-        wrapped_text = textwrap.fill(text, width=wrap_width)
-
-        left, top, right, bottom = draw.multiline_textbbox((0, 0), wrapped_text, font=font, align="center")
-        text_w = right - left
-        text_h = bottom - top
-        
-        x = (w - text_w) / 2
-        # 위치 조절: 쇼츠는 바닥에서 좀 더 띄움 (댓글창 가림 방지)
-        margin_bottom = 250 if is_shorts else 100
-        y = h - text_h - margin_bottom
-
-        draw.multiline_text((x, y), wrapped_text, font=font, fill="white", stroke_width=3, stroke_fill="black", align="center")
-        
-        return ImageClip(np.array(img)).set_duration(duration)
-        
-    except Exception as e:
-        print(f"자막 생성 오류: {e}")
+    old = st.session_state.pop("prefetcher", None)
+    if old is not None:
+        old.shutdown()
+    if not scenes:
         return None
 
-def get_pexels_video(query, duration):
-    """
-    [Ratio Aware] 가로/세로 모드에 맞춰 검색 및 크롭
-    """
-    api_key = get_secret("PEXELS_API_KEY") 
-    if not api_key: return None
-        
-    headers = {'Authorization': api_key}
-    # [핵심] 모드에 따라 검색 방향 변경
-    orientation = 'portrait' if is_shorts else 'landscape'
-    params = {'query': query, 'per_page': 1, 'orientation': orientation, 'size': 'medium'}
-    
-    try:
-        response = requests.get('https://api.pexels.com/videos/search', headers=headers, params=params, timeout=10)
-        data = response.json()
-        if not data.get('videos'): return None
-            
-        video_files = data['videos'][0]['video_files']
-        target_video = min(video_files, key=lambda x: abs(x['width'] - VIDEO_W))
-        video_url = target_video['link']
-        
-        # 4. 다운로드 및 캐싱
-        safe_name = "".join(x for x in query if x.isalnum())
-        filename = f"pexels_{safe_name}.mp4"
-        filepath = os.path.join(tempfile.gettempdir(), filename)
-        
-        if not os.path.exists(filepath):
-            vid_response = requests.get(video_url, stream=True)
-            with open(filepath, 'wb') as f:
-                for chunk in vid_response.iter_content(chunk_size=1024):
-                    if chunk: f.write(chunk)
-                    
-        clip = VideoFileClip(filepath).without_audio()
-        
-        if clip.duration < duration:
-            loop_count = int(duration // clip.duration) + 2
-            clip = concatenate_videoclips([clip] * loop_count)
-            
-        clip = clip.subclip(0, duration)
-        
-        # [핵심] 화면 꽉 차게 크롭 (Crop Center)
-        # 먼저 높이에 맞춰 리사이즈 하거나 너비에 맞춰 리사이즈
-        clip_ratio = clip.w / clip.h
-        target_ratio = VIDEO_W / VIDEO_H
-        
-        if clip_ratio > target_ratio: # 영상이 더 납작함 -> 높이 기준 리사이즈
-            clip = clip.resize(height=VIDEO_H)
-        else: # 영상이 더 길쭉함 -> 너비 기준 리사이즈
-            clip = clip.resize(width=VIDEO_W)
-            
-        # 중앙 크롭
-        clip = clip.crop(width=VIDEO_W, height=VIDEO_H, x_center=clip.w/2, y_center=clip.h/2)
-        
-        return clip
-
-    except Exception as e:
-        print(f"Pexels 다운로드 실패: {e}")
-        return None
+    cfg = job_settings()
+    prefetcher = Prefetcher()
+    anchor_prompt = pipeline.build_anchor_prompt(cfg)
+    prefetcher.submit(("anchor", anchor_prompt), "image", pipeline.generate_image_google, cfg, anchor_prompt, ref_image_path=None)
 
-def generate_video_veo(prompt, filename):
-    """
-    [Ratio Aware] Veo 생성 비율 설정
-    """
-    if not gemini_key: return None
-    output_path = os.path.join(tempfile.gettempdir(), filename)
-    if os.path.exists(output_path): return output_path
+    keys = [pipeline.prefetch_keys(cfg, scene) for scene in scenes]
+    # 내레이션은 일괄 합성 설정이어도 씬별로 미리 받음 (수정된 씬만 취소할 수 있게).
+    # 워커의 일괄 합성은 씬별로 만든 MP3 캐시도 그대로 가져다 씀
+    for scene, k in zip(scenes, keys):
+        prefetcher.submit(k["tts"], "tts", pipeline.generate_audio, cfg, scene['narrative'])
+    for k in keys:
+        if "stock" in k:
+            prefetcher.submit(k["stock"], "stock", pipeline.download_pexels_video, cfg, k["stock"][1])
 
-    try:
-        client = genai.Client(api_key=gemini_key)
-        model_id = "veo-3.1-generate-preview" 
+    st.session_state["prefetcher"] = prefetcher
+    return prefetcher
 
-        # [핵심] 비율 설정
-        aspect_ratio_val = "9:16" if is_shorts else "16:9"
-        
-        generate_config = types.GenerateContentConfig(
-            response_modalities=["VIDEO"],
-            video_config=types.VideoConfig(
-                aspect_ratio=aspect_ratio_val, # 비율 적용
-                sample_count=1, 
-                seconds=6
-            )
-        )
-        
-        # ... (이하 동일) ...
-        prompt_text = f"Cinematic movie shot, {prompt}, high quality, 4k"
-        response = client.models.generate_content(
-            model=model_id,
-            contents=prompt_text,
-            config=generate_config
-        )
-        # ... (저장 로직 동일) ...
-        if response.candidates and response.candidates[0].content.parts:
-            for part in response.candidates[0].content.parts:
-                if part.inline_data:
-                    with open(output_path, "wb") as f:
-                        f.write(part.inline_data.data)
-                    return output_path
-        return None
-    except Exception as e:
-        print(f"Veo Error: {e}")
-        return None
-    
-def create_subtitle(text, duration, font_path):
+def restore_from_job(job_id):
     """
-    [무설치 버전] Pillow를 사용하여 자막 이미지를 생성합니다.
-    ImageMagick이 필요 없어 오류가 나지 않습니다.
+    [Refresh] 새로고침으로 세션이 비었으면 주소(?job=...)의 작업에서 대본과 매니페스트 ID를 되살립니다.
+    그대로 다시 제출하면 변경 없는 씬은 매니페스트에서 재사용됩니다.
     """
-    try:
-        # 1. 캔버스 크기 설정 (HD 해상도 기준)
-        w, h = 1280, 720
-        # 투명 배경 이미지 생성 (RGBA)
-        img = Image.new('RGBA', (w, h), (255, 255, 255, 0))
-        draw = ImageDraw.Draw(img)
-        
-        # 2. 폰트 로드
-        font_size = 50
-        try:
-            if font_path:
-                font = ImageFont.truetype(font_path, font_size)
-            else:
-                # 폰트 경로 없으면 기본 폰트 (한글 깨질 수 있음)
-                font = ImageFont.load_default()
-        except Exception:
-            font = ImageFont.load_default()
-
-        # 3. 텍스트 줄바꿈 처리 (간단 버전)
-        if len(text) > 25:
-            text = text[:25] + "\n" + text[25:]
-        
-        # 4. 텍스트 크기 계산 및 위치 잡기 (중앙 하단)
-        # textbbox는 Pillow 최신 버전 기준
-        left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
-        text_w = right - left
-        text_h = bottom - top
-        
-        x = (w - text_w) / 2
-        y = h - 100 # 밑에서 100px 위
-        
-        # 5. 글자 테두리(Stroke) 그리기 (검은색)
-        stroke_width = 3
-        draw.text((x, y), text, font=font, fill="white", stroke_width=stroke_width, stroke_fill="black")
-
-        # 6. MoviePy 클립으로 변환
-        # Pillow 이미지 -> Numpy 배열 -> ImageClip
-        return ImageClip(np.array(img)).set_duration(duration)
-
-    except Exception as e:
-        st.error(f"자막 생성 중 오류 발생: {e}")
-        return None
-
+    job = get_job_queue().get(job_id)
+    if not job:
+        return
+    payload = job["payload"]
+    st.session_state["script_data"] = {"video_title": payload["title"], "scenes": payload["scenes"]}
+    st.session_state["step"] = 2
+    st.session_state["job_id"] = payload["manifest_id"]
+    st.session_state["queue_job_id"] = job_id
+
+def show_previews(previews, per_row=3):
+    """[Preview] 인코딩이 끝난 씬부터 바로 재생 (최종 렌더링을 기다리지 않음)"""
+    previews = [(seq, path) for seq, path in previews if os.path.exists(path)]
+    if not previews:
+        return
+    st.caption(f"🎞️ 씬 미리보기 ({len(previews)}개 완료)")
+    for start in range(0, len(previews), per_row):
+        cols = st.columns(per_row)
+        for col, (seq, path) in zip(cols, previews[start:start + per_row]):
+            with col:
+                st.video(path)
+                st.caption(f"Scene {seq}")
+
+def _job_progress(job_id):
+    """진행 중인 작업 상태 (2초마다 이 부분만 다시 그림)"""
+    queue = get_job_queue()
+    job = queue.get(job_id)
+    if job is None or job["state"] in FINISHED_STATES:
+        st.rerun() # 끝났으면 전체 화면을 다시 그려 결과 표시
+    if job["state"] == "queued":
+        st.progress(0.0, text=f"⏳ 대기 중... (앞에 {queue.position(job_id)}개 작업)")
+    else:
+        st.progress(min(1.0, job["progress"]), text=job["message"] or "🏗️ 작업 중...")
+    show_previews(queue.previews(job_id))
+    with st.status("🏗️ 영상 제작 공장 가동 중...", expanded=True):
+        for _, message in queue.events(job_id):
+            st.write(message)
+    if st.button("⛔ 작업 취소", key=f"cancel_{job_id}"):
+        queue.cancel(job_id)
+
+# st.fragment(run_every)가 있으면 진행 상황만 주기적으로 갱신, 없으면 새로고침 버튼으로 확인
+show_job_progress = st.fragment(run_every=2)(_job_progress) if hasattr(st, "fragment") else _job_progress
+
+def show_job(job_id):
+    """[Poll] 작업 상태/결과 표시. 작업은 워커 프로세스에서 돌기 때문에 브라우저를 닫거나 새로고침해도 계속 진행됩니다."""
+    queue = get_job_queue()
+    job = queue.get(job_id)
+    if job is None:
+        st.warning("작업을 찾을 수 없습니다.")
+        return
+    if job["state"] not in FINISHED_STATES:
+        show_job_progress(job_id)
+        if not hasattr(st, "fragment"):
+            st.button("🔄 상태 새로고침")
+        return
+
+    result = job["result"] or {}
+    with st.expander("📜 작업 로그", expanded=job["state"] == "failed"):
+        for _, message in queue.events(job_id):
+            st.write(message)
+    if job["state"] == "cancelled":
+        st.info("작업이 취소되었습니다.")
+    elif job["state"] == "failed":
+        st.error(f"렌더링 오류: {job['error']}")
+    elif not result.get("output_path"):
+        st.error("❌ 생성된 클립이 없습니다. 영상을 만들 수 없습니다.")
+    else:
+        if result.get("anchor_path") and os.path.exists(result["anchor_path"]):
+            st.image(result["anchor_path"], caption="✅ 생성된 기준 캐릭터 (이 얼굴로 고정됩니다)", width=200)
+        st.write(f"⏱️ 렌더링 {result['render_seconds']:.1f}초 ({result['backend']}, {result['scenes']}개 씬, 재사용 {result['reused']}개)")
+        if not st.session_state.get(f"celebrated_{job_id}"):
+            st.session_state[f"celebrated_{job_id}"] = True
+            st.balloons()
+        bgm = job["payload"]["settings"].get("bgm_mood")
+        st.success(f"🎉 '{result['title']}' 영상이 완성되었습니다! (BGM: {bgm})")
+        st.video(result["output_path"])
+        show_diagnostics(result)
+
+def show_diagnostics(result):
+    """트레이스/프로파일 파일이 있으면 내려받기 버튼"""
+    files = [("🔬 트레이스 (Chrome trace)", (result.get("trace_paths") or {}).get("chrome"), "application/json"),
+             ("🧪 렌더링 프로파일 (.prof)", result.get("profile_path"), "application/octet-stream")]
+    for label, path, mime in files:
+        if path and os.path.exists(path):
+            with open(path, "rb") as f:
+                st.download_button(label, f.read(), file_name=os.path.basename(path), mime=mime)
 
 # --- 3. 메인 실행 컨트롤러 ---
 
@@ -828,6 +369,11 @@ if "script_data" not in st.session_state:
 if "step" not in st.session_state:
     st.session_state["step"] = 1
 
+# 작업은 워커 프로세스에서 돌기 때문에, 작업 ID를 주소에 남겨 새로고침 후에도 이어서 확인
+start_job_workers()
+if st.session_state["script_data"] is None and st.query_params.get("job"):
+    restore_from_job(st.query_params["job"])
+
 st.divider()
 st.header("Step 1. 기획안 작성")
 topic = st.text_input("영상 주제 (Topic)", placeholder="예: 집에서 만드는 스타벅스 돌체라떼 레시피")
@@ -844,6 +390,10 @@ if st.button("💡 1. 기획안(대본) 생성하기", type="primary", use_conta
         if script_data:
             st.session_state["script_data"] = script_data
             st.session_state["step"] = 2
+            st.session_state["job_id"] = f"job_{int(time.time() * 1000)}" # 새 기획안 = 새 작업 매니페스트
+            st.session_state.pop("queue_job_id", None)
+            st.query_params.pop("job", None)
+            start_prefetch(script_data.get("scenes", [])) # 대본 수정하는 동안 자산 미리 받기
             st.rerun() # 화면 갱신
         else:
             st.error("기획안 생성에 실패했습니다. 다시 시도해주세요.")
@@ -905,7 +455,7 @@ if st.session_state["step"] >= 2 and st.session_state["script_data"]:
         # [버튼 2] 영상 생성 시작
         generate_btn = st.form_submit_button("🎬 2. 이 내용으로 영상 만들기 (Start Generation)", type="primary", use_container_width=True)
 
-    # 폼 제출 버튼이 눌렸을 때 실행
+    # 폼 제출 버튼이 눌렸을 때: 대기열에 작업만 넣고 바로 돌아옴 (실제 생성은 워커 프로세스)
     if generate_btn:
         # 수정된 데이터 수집
         final_scenes = []
@@ -914,208 +464,31 @@ if st.session_state["step"] >= 2 and st.session_state["script_data"]:
                 "seq": org_scene['seq'],
                 "narrative": st.session_state[f"narr_area_{i}"],
                 "visual_prompt": st.session_state[f"vis_area_{i}"],
-                "sound_effect": st.session_state[f"sfx_select_{i}"] # <--- 추가
+                "sound_effect": st.session_state[f"sfx_select_{i}"]
             })
-            
-        # 본격적인 생성 시작
-        status_box = st.status("🏗️ 영상 제작 공장 가동 중...", expanded=True)
-        
-        # --- Phase 2: Veo + Stock Video + AI Image 하이브리드 ---
-        status_box.write("🎨 Phase 2: 캐릭터 기준 이미지(Anchor) 생성 중...")
-        # [Step 0] 기준 캐릭터 이미지 생성 (이 이미지가 영상 내내 쓰임)
-        # 가장 자세한 묘사 + 정면 얼굴 위주
-        anchor_prompt = f"A detailed character sheet of {character_desc}, {video_style}, neutral expression, front view, white background"
-        anchor_img_name = f"anchor_char_{int(time.time())}.png"
-        
-        # 첫 번째 생성 시에는 레퍼런스가 없으므로 None
-        anchor_image_path = generate_image_google(anchor_prompt, anchor_img_name, ref_image_path=None)
-        
-        if anchor_image_path:
-            st.image(anchor_image_path, caption="✅ 생성된 기준 캐릭터 (이 얼굴로 고정됩니다)", width=200)
-        else:
-            st.warning("기준 캐릭터 생성 실패. 일관성이 떨어질 수 있습니다.")
-
-        progress_bar = st.progress(0)
-        generated_clips = []
-        
-        korean_font_path = get_korean_font()
-        
-        for i, scene in enumerate(final_scenes):
-            idx = scene['seq']
-            status_box.write(f"  - Scene {idx} 작업 중...")
-            
-            timestamp = int(time.time())
-            aud_name = f"aud_{idx}_{timestamp}.mp3"
-            
-            # 1. 오디오 생성
-            aud_path = generate_audio(scene['narrative'], aud_name, voice_name=selected_voice_name)
-            if not aud_path: continue
-            audio_clip = AudioFileClip(aud_path)
-            
-            # 효과음 믹싱
-            sfx_name = scene.get('sound_effect')
-            sfx_path = get_sfx_path(sfx_name)
-            if sfx_path and os.path.exists(sfx_path):
-                try:
-                    sfx_clip = AudioFileClip(sfx_path).volumex(0.6)
-                    audio_clip = CompositeAudioClip([audio_clip, sfx_clip])
-                except: pass
-            
-            scene_duration = audio_clip.duration
-            visual_prompt = scene['visual_prompt'].strip()
-            scene_final_clip = None
-
-            # ==========================================
-            # [전략 1] 스톡 비디오 (태그가 있는 경우 최우선)
-            # ==========================================
-            if visual_prompt.upper().startswith("[VIDEO]"):
-                search_query = visual_prompt[7:].strip()
-                status_box.write(f"    🎥 스톡 비디오 검색: {search_query}")
-                scene_final_clip = get_pexels_video(search_query, scene_duration)
-                
-                if not scene_final_clip:
-                    status_box.warning("스톡 비디오 실패 -> Veo 생성 시도")
-                    visual_prompt = search_query # 태그 떼고 Veo로 넘김
-
-            # ==========================================
-            # [전략 2] Google Veo (진짜 생성형 비디오)
-            # ==========================================
-            if scene_final_clip is None:
-                # 캐릭터 일관성을 위한 프롬프트 조합
-                veo_prompt = f"{character_desc}, {visual_prompt}, {video_style}, consistent character"
-                vid_name = f"veo_{idx}_{timestamp}.mp4"
-                
-                status_box.write(f"    🎬 Veo 영상 생성 중... (약 30초 소요)")
-                veo_path = generate_video_veo(veo_prompt, vid_name)
-                
-                if veo_path:
-                    try:
-                        # Veo 영상 로드
-                        veo_clip = VideoFileClip(veo_path)
-                        # 소리가 있을 수 있으므로 제거 (TTS 사용 위해)
-                        veo_clip = veo_clip.without_audio()
-                        
-                        # 길이 맞추기 (Loop or Cut)
-                        if veo_clip.duration < scene_duration:
-                             loop_count = int(scene_duration // veo_clip.duration) + 2
-                             veo_clip = concatenate_videoclips([veo_clip] * loop_count)
-                        
-                        scene_final_clip = veo_clip.subclip(0, scene_duration).resize(height=720)
-                        status_box.write("    ✅ Veo 생성 성공!")
-                    except Exception as e:
-                        st.warning(f"Veo 클립 처리 오류: {e}")
-
-            # ==========================================
-            # [전략 3] AI 이미지 (Veo 실패 시 백업)
-            # ==========================================
-            if scene_final_clip is None:
-                status_box.write("    🎨 AI 이미지 모드 (백업) 실행")
-                # (기존 이미지 컷 쪼개기 로직 유지)
-                raw_prompts = visual_prompt.split('||')
-                valid_prompts = [p.strip() for p in raw_prompts if p.strip()]
-                if not valid_prompts: valid_prompts = [visual_prompt]
-                
-                clip_duration = scene_duration / len(valid_prompts)
-                scene_sub_clips = []
-                
-                # [수정] 이미지 크롭 함수 (Local Helper)
-                def resize_and_crop(clip, target_w, target_h):
-                    # 비율 유지하며 꽉 차게 리사이즈
-                    clip_ratio = clip.w / clip.h
-                    target_ratio = target_w / target_h
-                    
-                    if clip_ratio > target_ratio:
-                        clip = clip.resize(height=target_h)
-                    else:
-                        clip = clip.resize(width=target_w)
-                    
-                    # 중앙 크롭
-                    return clip.crop(width=target_w, height=target_h, x_center=clip.w/2, y_center=clip.h/2)
-                
-                for sub_idx, raw_text in enumerate(valid_prompts):
-                    final_prompt = f"{character_desc}, {raw_text}, {video_style}"
-                    img_name = f"img_{idx}_{sub_idx}_{timestamp}.png"
-                    img_path = generate_image_google(final_prompt, img_name, ref_image_path=anchor_image_path)
-                    
-                    if img_path:
-                        try:
-                            # [핵심] 리사이즈 대신 resize_and_crop 사용
-                            sub_clip = ImageClip(img_path).set_duration(clip_duration)
-                            sub_clip = resize_and_crop(sub_clip, VIDEO_W, VIDEO_H)
-                            
-                            sub_clip = apply_random_motion(sub_clip)
-                            scene_sub_clips.append(sub_clip)
-                        except: pass
-                
-                if scene_sub_clips:
-                    scene_final_clip = concatenate_videoclips(scene_sub_clips, method="compose")
-
-            # 최종 합성 (오디오 + 자막 + 트랜지션)
-            if scene_final_clip:
-                try:
-                    scene_final_clip = scene_final_clip.set_audio(audio_clip)
-                    
-                    if use_subtitles:
-                        subtitle_clip = create_subtitle_clip(scene['narrative'], scene_final_clip.duration, korean_font_path)
-                        if subtitle_clip:
-                            scene_final_clip = CompositeVideoClip([scene_final_clip, subtitle_clip])
-                    
-                    scene_final_clip = scene_final_clip.fadein(0.5)
-                    generated_clips.append(scene_final_clip)
-                except Exception as e:
-                    st.error(f"최종 합성 실패: {e}")
-            
-            progress_bar.progress((i + 1) / len(final_scenes))
-
-        # Phase 3: Final Rendering (BGM Mixing 추가)
-        if generated_clips:
-            status_box.write("🎬 Phase 3: 영상 합치기 및 BGM 믹싱 중...")
-            try:
-                # 1. 컷 편집된 영상 연결
-                final_video = concatenate_videoclips(generated_clips, method="compose")
-                
-                # 2. BGM 처리 로직
-                bgm_path = get_bgm_path(bgm_mood)
-                
-                if bgm_path:
-                    try:
-                        # BGM 로드
-                        bgm_clip = AudioFileClip(bgm_path)
-                        
-                        # 영상 길이에 맞춰 BGM 반복(Loop) 또는 자르기
-                        # (영상보다 BGM이 짧으면 반복, 길면 자름)
-                        if bgm_clip.duration < final_video.duration:
-                            # 짝수 번 반복해서 충분히 길게 만듦
-                            loop_count = int(final_video.duration // bgm_clip.duration) + 2
-                            bgm_clip = concatenate_audioclips([bgm_clip] * loop_count)
-                        
-                        bgm_clip = bgm_clip.set_duration(final_video.duration)
-                        
-                        # 볼륨 조절 (가장 중요!)
-                        # 목소리(Voice)는 100%, BGM은 10%~15% 수준으로 낮춤
-                        voice_clip = final_video.audio.volumex(1.0) # 원본 목소리 유지
-                        bgm_clip = bgm_clip.volumex(0.15)           # 배경음악 15% (은은하게)
-                        
-                        # 페이드 아웃 (끝날 때 2초간 서서히 작아짐)
-                        bgm_clip = bgm_clip.audio_fadeout(2)
-                        
-                        # 오디오 합치기 (목소리 + BGM)
-                        final_audio = CompositeAudioClip([voice_clip, bgm_clip])
-                        final_video = final_video.set_audio(final_audio)
-                        
-                    except Exception as e:
-                        st.warning(f"BGM 합성 중 오류 발생(영상은 BGM 없이 생성됩니다): {e}")
-
-                # 3. 최종 내보내기
-                safe_title = "".join([c for c in new_title if c.isalnum()]).strip() or "output"
-                output_path = os.path.join(tempfile.gettempdir(), f"{safe_title}_final.mp4")
-                
-                final_video.write_videofile(output_path, fps=24, codec='libx264', audio_codec='aac', preset='ultrafast')
-                
-                status_box.update(label="✅ 영상 완성!", state="complete", expanded=False)
-                st.balloons()
-                st.success(f"🎉 '{new_title}' 영상이 완성되었습니다! (BGM: {bgm_mood})")
-                st.video(output_path)
-                
-            except Exception as e:
-                st.error(f"렌더링 오류: {e}")
\ No newline at end of file
+        cfg = job_settings()
+        
+        # [Prefetch] 수정된 씬의 미리 받기 작업은 취소 (내용이 그대로인 작업은 계속 돌아 캐시를 채움)
+        prefetcher = st.session_state.get("prefetcher")
+        if prefetcher is not None:
+            wanted_keys = [("anchor", pipeline.build_anchor_prompt(cfg))]
+            wanted_keys += [key for scene in final_scenes for key in pipeline.prefetch_keys(cfg, scene).values()]
+            prefetcher.cancel_except(wanted_keys)
+        
+        settings = pipeline.public_settings(cfg)
+        job_id = get_job_workers().submit(get_job_queue(), {
+            "title": new_title,
+            "scenes": final_scenes,
+            # [Incremental] 같은 기획안이면 같은 매니페스트 -> 바뀐 씬만 다시 생성
+            "manifest_id": st.session_state.setdefault("job_id", f"job_{int(time.time() * 1000)}"),
+            "settings": settings,
+        }, secrets={"pexels_key": pexels_key_input})
+        st.session_state["queue_job_id"] = job_id
+        st.query_params["job"] = job_id
+
+# [UI] 작업 진행 상황 / 결과
+active_job_id = st.session_state.get("queue_job_id") or st.query_params.get("job")
+if active_job_id:
+    st.divider()
+    st.header("Step 3. 영상 제작")
+    show_job(active_job_id)
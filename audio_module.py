@@ -0,0 +1,278 @@
+# audio_module.py
+import hashlib
+import json
+import os
+import subprocess
+import tempfile
+import threading
+import wave
+
+import numpy as np
+
+import trace_module as trace
+
+SAMPLE_RATE = 44100
+CHANNELS = 2
+ENVELOPE_WINDOW = 0.02 # 덕킹 판단 단위 (20ms)
+LOUDNESS_BLOCK = 0.4 # 라우드니스 측정 블록 (400ms, 무음 블록은 제외)
+DEFAULT_PCM_DIR = os.getenv("PCM_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "aigongjang_pcm")
+
+
+def decode_pcm(path, sample_rate=SAMPLE_RATE):
+    """
+    [Decode] 오디오 파일을 ffmpeg로 한 번에 float32 스테레오 PCM (samples, 2) 배열로 디코딩합니다.
+    """
+    from ffmpeg_module import get_ffmpeg_binary
+
+    cmd = [
+        get_ffmpeg_binary(), "-hide_banner", "-loglevel", "error", "-i", path,
+        "-vn", "-f", "f32le", "-acodec", "pcm_f32le", "-ac", str(CHANNELS), "-ar", str(sample_rate), "-",
+    ]
+    result = subprocess.run(cmd, capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"오디오 디코딩 실패 ({path}): {result.stderr.decode('utf-8', 'replace')[-500:]}")
+    trace.add("bytes", len(result.stdout))
+    return np.frombuffer(result.stdout, dtype=np.float32).reshape(-1, CHANNELS)
+
+
+def _db(value):
+    return round(float(20 * np.log10(max(value, 1e-9))), 2)
+
+
+def loudness_info(pcm, sample_rate=SAMPLE_RATE):
+    """피크/RMS(dBFS)와 무음 블록을 뺀 평균 크기 (400ms 블록, -70dB 게이트 - K 가중치 없는 간이 라우드니스)"""
+    if not len(pcm):
+        return {"peak_db": None, "rms_db": None, "loudness_db": None}
+    mono = pcm.mean(axis=1)
+    block = max(1, int(sample_rate * LOUDNESS_BLOCK))
+    usable = len(mono) // block * block
+    blocks = np.mean(mono[:usable].reshape(-1, block) ** 2, axis=1) if usable else np.mean(mono ** 2, keepdims=True)
+    gated = blocks[blocks > 1e-7]
+    return {
+        "peak_db": _db(np.abs(pcm).max()),
+        "rms_db": _db(np.sqrt(np.mean(mono ** 2))),
+        "loudness_db": _db(np.sqrt(gated.mean())) if len(gated) else None,
+    }
+
+
+class PcmLibrary:
+    """
+    [Cache] BGM/효과음 라이브러리를 디코딩된 float32 PCM(.f32)으로 보관하고 mmap으로 엽니다.
+    처음 한 번만 ffmpeg로 디코딩하고, 이후에는 디코딩 없이 파일을 메모리에 매핑만 합니다. (여러 프로세스가 같은 페이지를 공유)
+    메타데이터(.json): 원본, 샘플레이트, 샘플 수, 길이, 피크/RMS/라우드니스
+    """
+
+    def __init__(self, cache_dir=None, sample_rate=SAMPLE_RATE):
+        self.cache_dir = cache_dir or DEFAULT_PCM_DIR
+        self.sample_rate = sample_rate
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _key(self, path):
+        """원본 경로 + 크기 + 수정 시각 (다시 받은 파일은 새 키) - 내용을 읽지 않으므로 조회 비용이 거의 없음"""
+        st_ = os.stat(path)
+        raw = f"{os.path.abspath(path)}|{st_.st_size}|{st_.st_mtime_ns}|{self.sample_rate}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+    def _paths(self, path):
+        base = os.path.join(self.cache_dir, self._key(path))
+        return base + ".f32", base + ".json"
+
+    def info(self, path):
+        """캐시된 메타데이터 (아직 없으면 None)"""
+        _, meta_path = self._paths(path)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def prepare(self, path):
+        """
+        캐시에 없으면 디코딩해서 저장하고 메타데이터를 돌려줍니다.
+        PCM을 먼저 rename하고 메타데이터를 마지막에 쓰므로, 메타데이터가 있으면 PCM도 완전한 상태입니다.
+        """
+        meta = self.info(path)
+        if meta is not None:
+            trace.annotate(cache="hit")
+            return meta
+        trace.annotate(cache="miss")
+        pcm_path, meta_path = self._paths(path)
+        with self._lock:
+            meta = self.info(path)
+            if meta is not None:
+                return meta
+            pcm = decode_pcm(path, self.sample_rate)
+            meta = {
+                "source": os.path.abspath(path), "sample_rate": self.sample_rate, "channels": CHANNELS,
+                "samples": len(pcm), "duration": len(pcm) / self.sample_rate, **loudness_info(pcm, self.sample_rate),
+            }
+            self._write(pcm_path, pcm.tobytes())
+            self._write(meta_path, json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+        return meta
+
+    def _write(self, target, data):
+        """임시 파일에 쓴 뒤 rename (다른 프로세스가 반쯤 쓴 파일을 매핑하지 않도록)"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, target)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def load(self, path):
+        """(samples, 2) float32 읽기 전용 memmap"""
+        meta = self.prepare(path)
+        if not meta["samples"]:
+            return np.zeros((0, CHANNELS), dtype=np.float32)
+        pcm_path, _ = self._paths(path)
+        return np.memmap(pcm_path, dtype=np.float32, mode="r", shape=(meta["samples"], CHANNELS))
+
+
+_default_library = None
+_default_library_lock = threading.Lock()
+
+
+def get_pcm_library():
+    """프로세스 전체에서 공유하는 BGM/효과음 PCM 캐시."""
+    global _default_library
+    with _default_library_lock:
+        if _default_library is None:
+            _default_library = PcmLibrary()
+        return _default_library
+
+
+class PcmLoader:
+    """
+    한 번의 믹싱 안에서 같은 파일(반복되는 효과음 등)은 한 번만 엽니다.
+    library=True로 읽는 BGM/효과음은 PcmLibrary(mmap)에서, 내레이션은 그때그때 디코딩합니다.
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, library=None):
+        self.sample_rate = sample_rate
+        self.library = library
+        self._pcm = {}
+
+    def load(self, path, library=False):
+        if path not in self._pcm:
+            pcm_library = self.library or get_pcm_library()
+            if library and pcm_library.sample_rate == self.sample_rate:
+                self._pcm[path] = pcm_library.load(path)
+            else:
+                self._pcm[path] = decode_pcm(path, self.sample_rate)
+        return self._pcm[path]
+
+
+def _place(track, pcm, start, length, gain=1.0):
+    """pcm을 track[start:start+length]에 더합니다. (길면 자르고 짧으면 뒤는 무음)"""
+    n = min(len(pcm), length, len(track) - start)
+    if n > 0:
+        track[start:start + n] += pcm[:n] * gain
+
+
+def scene_offsets(timeline, sample_rate=SAMPLE_RATE):
+    """씬별 (시작 샘플, 길이 샘플) - 누적 시간을 반올림해서 씬이 많아도 오차가 쌓이지 않음"""
+    bounds = np.round(np.cumsum([0.0] + [spec["duration"] for spec in timeline]) * sample_rate).astype(np.int64)
+    return [(int(bounds[i]), int(bounds[i + 1] - bounds[i])) for i in range(len(timeline))]
+
+
+def mix_voice(timeline, settings, loader, sidechain=False):
+    """
+    내레이션 + 효과음 트랙 (씬마다 씬 길이로 자르고 무음으로 채움)
+    sidechain=True면 내레이션만의 크기(모노)도 함께 돌려줍니다. (덕킹이 효과음에는 반응하지 않도록)
+    반환: (voice, level 또는 None)
+    """
+    offsets = scene_offsets(timeline, loader.sample_rate)
+    total = offsets[-1][0] + offsets[-1][1] if offsets else 0
+    voice = np.zeros((total, CHANNELS), dtype=np.float32)
+    level = np.zeros((total,), dtype=np.float32) if sidechain else None
+    for spec, (start, length) in zip(timeline, offsets):
+        narration = loader.load(spec["audio_path"])
+        _place(voice, narration, start, length)
+        if level is not None:
+            n = min(len(narration), length)
+            level[start:start + n] = np.abs(narration[:n]).max(axis=1)
+        if spec.get("sfx_path") and os.path.exists(spec["sfx_path"]):
+            try:
+                _place(voice, loader.load(spec["sfx_path"], library=True), start, length, settings["sfx_volume"])
+            except Exception as e:
+                print(f"효과음 믹싱 실패(건너뜀): {e}")
+    return voice, level
+
+
+def ducking_gain(level, settings, sample_rate=SAMPLE_RATE):
+    """
+    [Ducking] 내레이션 크기(모노) RMS 엔벨로프로 BGM 게인 곡선(samples,)을 만듭니다.
+    20ms 창마다 말소리 여부를 보고, release 동안 유지한 뒤 attack 길이로 부드럽게 이어줍니다.
+    """
+    duck_gain = settings["duck_gain"]
+    if duck_gain >= 1.0 or not len(level):
+        return None
+    hop = max(1, int(sample_rate * ENVELOPE_WINDOW))
+    frames = -(-len(level) // hop)
+    padded = np.zeros((frames * hop,), dtype=np.float32)
+    padded[:len(level)] = level
+    rms = np.sqrt(np.mean(padded.reshape(frames, hop) ** 2, axis=1))
+    speaking = (rms > settings["duck_threshold"]).astype(np.float32)
+
+    # 말이 끝난 뒤 release 동안 줄인 상태 유지 (창 단위 이동 최대값)
+    hold = max(1, int(settings["duck_release"] / ENVELOPE_WINDOW))
+    held = np.convolve(speaking, np.ones(hold, dtype=np.float32))[:frames] > 0
+    # attack 길이 이동 평균으로 계단을 완만하게
+    smooth = max(1, int(settings["duck_attack"] / ENVELOPE_WINDOW))
+    amount = np.convolve(held.astype(np.float32), np.ones(smooth, dtype=np.float32) / smooth, mode="same")
+    gain = 1.0 - (1.0 - duck_gain) * amount
+    return np.repeat(gain, hop)[:len(level)].astype(np.float32)
+
+
+def mix_bgm_track(mix, level, bgm, settings, sample_rate=SAMPLE_RATE):
+    """BGM을 영상 길이만큼 반복 -> 볼륨 -> 덕킹 -> 끝부분 페이드 아웃 후 mix에 더합니다."""
+    total = len(mix)
+    if not len(bgm) or not total:
+        return mix
+    track = np.resize(bgm, (total, CHANNELS)) * np.float32(settings["bgm_volume"]) # 짧으면 반복, 길면 자름
+    gain = ducking_gain(level, settings, sample_rate)
+    if gain is not None:
+        track *= gain[:, None]
+    fade = min(total, int(settings["bgm_fadeout"] * sample_rate))
+    if fade:
+        track[total - fade:] *= np.linspace(1.0, 0.0, fade, dtype=np.float32)[:, None]
+    mix += track
+    return mix
+
+
+def write_wav(path, pcm, sample_rate=SAMPLE_RATE):
+    """float32 PCM -> 16bit WAV (클리핑 방지용으로 [-1, 1]로 자름)"""
+    data = (np.clip(pcm, -1.0, 1.0) * 32767).astype("<i2")
+    with wave.open(path, "wb") as f:
+        f.setnchannels(CHANNELS)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(data.tobytes())
+    return path
+
+
+def mix_soundtrack(timeline, settings, output_path, loader=None):
+    """
+    [Audio Mix] 타임라인 전체 사운드트랙(내레이션 + 효과음 + BGM 반복/볼륨/덕킹/페이드 아웃)을
+    벡터 연산 한 번으로 만들어 WAV 하나로 씁니다. 영상 인코딩은 이 파일을 먹싱만 합니다.
+    """
+    loader = loader or PcmLoader()
+    with trace.span("audio_mix", "render", scenes=len(timeline)):
+        bgm_path = settings.get("bgm_path")
+        bgm_path = bgm_path if bgm_path and os.path.exists(bgm_path) else None
+        mix, level = mix_voice(timeline, settings, loader, sidechain=bool(bgm_path))
+        if bgm_path:
+            try:
+                mix = mix_bgm_track(mix, level, loader.load(bgm_path, library=True), settings, loader.sample_rate)
+            except Exception as e:
+                print(f"BGM 합성 중 오류 발생(영상은 BGM 없이 생성됩니다): {e}")
+        return write_wav(output_path, mix, loader.sample_rate)
+
+
+def scene_audio_array(spec, settings, sample_rate=SAMPLE_RATE):
+    """씬 하나의 내레이션 + 효과음 PCM (세그먼트/미리보기용, 길이는 씬 길이)"""
+    return mix_voice([spec], settings, PcmLoader(sample_rate))[0]
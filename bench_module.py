@@ -0,0 +1,501 @@
+# bench_module.py
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import zlib
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+try:
+    import resource # 리눅스/맥 전용 (윈도우에서는 RSS 없이 측정)
+except ImportError:
+    resource = None
+
+import trace_module as trace
+from ffmpeg_module import get_ffmpeg_binary
+
+DEFAULT_BENCH_DIR = os.path.join(tempfile.gettempdir(), "aigongjang_bench")
+BENCH_SCENES = (2, 8, 50)
+
+# 가짜 프로바이더 지연: (중앙값 초, 로그정규 sigma) - 실제 API처럼 가끔 오래 걸리는 꼬리가 있음
+# (--latency image=3,0.4 처럼 바꾸거나 --latency-scale 0 으로 지연 없이 CPU 구간만 측정)
+DEFAULT_LATENCIES = {
+    "script": (2.0, 0.3),
+    "image": (3.0, 0.4),
+    "tts": (1.0, 0.3),
+    "veo": (10.0, 0.3),
+    "stock": (1.0, 0.5),
+    "sfx": (0.1, 0.3),
+}
+VEO_SUCCESS_RATE = 0.5 # Veo 성공 확률 (실패하면 이미지 컷으로 넘어감)
+STOCK_SHARE = 0.3 # [VIDEO] 스톡 영상 씬 비율
+AUDIO_SECONDS = (3.0, 4.0, 5.0, 6.0) # 픽스처 나레이션 길이 (씬마다 돌아가며 사용)
+
+# run_pipeline이 부르는 pipeline_module 함수 중 가짜로 바꿀 것들 -> 트레이스 구간 이름 (실제 함수와 같게)
+PATCHED_FUNCTIONS = {
+    "generate_script_json": "script", "generate_image_google": "image", "generate_audio": "tts",
+    "generate_audio_for_scenes": "tts_batch", "start_video_veo": "veo_start", "poll_video_veo": "veo_poll",
+    "download_pexels_video": "stock",
+    "get_sfx_path": "sfx", "get_bgm_path": "bgm", "get_korean_font": "font",
+}
+# 회귀 비교 대상 지표 (값이 클수록 나쁨)
+COMPARE_METRICS = (
+    "total_seconds", "assets_seconds", "preview_seconds", "render_seconds", "first_preview_seconds",
+    "peak_rss_mb", "peak_tree_rss_mb", "cpu_seconds",
+)
+
+
+def _ffmpeg(*args):
+    cmd = [get_ffmpeg_binary(), "-y", "-hide_banner", "-loglevel", "error", *args]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"픽스처 생성 실패: {result.stderr[-500:]}")
+
+
+def make_fixtures(fixture_dir, variants=4):
+    """
+    [Fixture] ffmpeg 테스트 소스로 벤치마크용 PNG/MP3/MP4를 만듭니다. (이미 있으면 재사용)
+    반환: {"images": [...], "audio": [...], "videos": [...], "sfx": 경로, "bgm": 경로}
+    """
+    os.makedirs(fixture_dir, exist_ok=True)
+    fixtures = {"images": [], "audio": [], "videos": []}
+
+    def build(name, *args):
+        path = os.path.join(fixture_dir, name)
+        if not os.path.exists(path):
+            _ffmpeg(*args, path + ".part" + os.path.splitext(name)[1])
+            os.replace(path + ".part" + os.path.splitext(name)[1], path)
+        return path
+
+    for i in range(variants):
+        fixtures["images"].append(build(
+            f"image_{i}.png", "-f", "lavfi", "-i", "testsrc2=size=1024x1024:rate=1",
+            "-vf", f"hue=h={i * 90}", "-frames:v", "1",
+        ))
+        seconds = AUDIO_SECONDS[i % len(AUDIO_SECONDS)]
+        fixtures["audio"].append(build(
+            f"voice_{i}.mp3", "-f", "lavfi", "-i", f"sine=frequency={220 + 110 * i}:duration={seconds}",
+            "-ac", "1", "-b:a", "64k",
+        ))
+        fixtures["videos"].append(build(
+            f"video_{i}.mp4", "-f", "lavfi", "-i", "testsrc2=size=1280x720:rate=24:duration=8",
+            "-vf", f"hue=h={i * 90}", "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p",
+        ))
+    fixtures["sfx"] = build("sfx.mp3", "-f", "lavfi", "-i", "sine=frequency=1200:duration=0.4", "-b:a", "64k")
+    fixtures["bgm"] = build("bgm.mp3", "-f", "lavfi", "-i", "sine=frequency=330:duration=60", "-ac", "2", "-b:a", "96k")
+    return fixtures
+
+
+def parse_latencies(items):
+    """["image=3,0.4", "veo=20"] -> {"image": (3.0, 0.4), "veo": (20.0, 0.3)}"""
+    latencies = {}
+    for item in items or []:
+        name, _, value = item.partition("=")
+        median, _, sigma = value.partition(",")
+        default_sigma = DEFAULT_LATENCIES.get(name.strip(), (0, 0.3))[1]
+        latencies[name.strip()] = (float(median), float(sigma) if sigma else default_sigma)
+    return latencies
+
+
+class FakeProviders:
+    """
+    [Bench] 실제 API 대신 픽스처 파일을 돌려주는 가짜 프로바이더.
+    호출마다 지연 분포에서 뽑은 시간만큼 기다린 뒤 결과를 주므로, 동시 실행 한도/대기 구조는 실제와 같게 동작합니다.
+    같은 seed면 같은 지연/성공 순서가 나와 리비전끼리 비교할 수 있습니다.
+    """
+
+    def __init__(self, fixtures, latencies=None, latency_scale=1.0, veo_success=VEO_SUCCESS_RATE, font_path=None, seed=0):
+        self.fixtures = fixtures
+        self.latencies = dict(DEFAULT_LATENCIES, **(latencies or {}))
+        self.latency_scale = latency_scale
+        self.veo_success = veo_success
+        self.font_path = font_path
+        self.rng = random.Random(seed)
+        self.calls = defaultdict(int)
+        self.wait_seconds = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def _delay(self, provider):
+        median, sigma = self.latencies.get(provider, (0, 0))
+        with self._lock:
+            delay = self.rng.lognormvariate(math.log(median), sigma) * self.latency_scale if median > 0 else 0.0
+            self.calls[provider] += 1
+            self.wait_seconds[provider] += delay
+        return delay
+
+    def _wait(self, provider):
+        delay = self._delay(provider)
+        if delay:
+            time.sleep(delay)
+
+    def _pick(self, kind, text):
+        items = self.fixtures[kind]
+        return items[zlib.crc32(text.encode("utf-8")) % len(items)]
+
+    def generate_script_json(self, cfg, topic, num_scenes, genre_key, log=print):
+        self._wait("script")
+        scenes = []
+        stock_every = max(1, round(1 / STOCK_SHARE)) if STOCK_SHARE else 0
+        for i in range(1, num_scenes + 1):
+            if stock_every and i % stock_every == 0:
+                visual_prompt = f"[VIDEO] city street {i}"
+            else:
+                visual_prompt = f"character at desk {i} || close up reaction {i}"
+            scenes.append({
+                "seq": i,
+                "narrative": f"{topic} {i}번째 장면입니다. 벤치마크용 나레이션 문장이에요.",
+                "visual_prompt": visual_prompt,
+                "sound_effect": "Pop (등장)" if i % 2 else "None",
+            })
+        return {"video_title": f"{topic} {num_scenes}", "scenes": scenes}
+
+    def generate_image_google(self, cfg, prompt, ref_image_path=None, log=print):
+        self._wait("image")
+        return self._pick("images", prompt)
+
+    def generate_audio(self, cfg, text, log=print):
+        self._wait("tts")
+        return self._pick("audio", text)
+
+    def generate_audio_for_scenes(self, cfg, texts, log=print):
+        self._wait("tts") # 일괄 합성은 요청 1회
+        return [self._pick("audio", text) for text in texts]
+
+    def start_video_veo(self, cfg, prompt, log=print):
+        # Veo는 서버에서 생성되므로 제출은 바로 끝나고, 지연만큼 지난 뒤 폴링하면 결과가 나옴
+        ready_at = time.time() + self._delay("veo")
+        with self._lock:
+            ok = self.rng.random() < self.veo_success
+        return {"ready_at": ready_at, "path": self._pick("videos", prompt) if ok else None}
+
+    def poll_video_veo(self, cfg, handle, log=print):
+        return time.time() >= handle["ready_at"], handle["path"]
+
+    def download_pexels_video(self, cfg, query, log=print):
+        self._wait("stock")
+        return self._pick("videos", query)
+
+    def get_sfx_path(self, sfx_name):
+        if not sfx_name or sfx_name == "None":
+            return None
+        self._wait("sfx")
+        return self.fixtures["sfx"]
+
+    def get_bgm_path(self, mood_key):
+        return self.fixtures["bgm"]
+
+    def get_korean_font(self):
+        return self.font_path
+
+    def stats(self):
+        with self._lock:
+            return {name: {"calls": self.calls[name], "wait_seconds": round(self.wait_seconds[name], 3)} for name in self.calls}
+
+
+@contextmanager
+def patched(module, replacements):
+    """module의 함수들을 잠시 바꿔 끼웁니다. (run_pipeline은 모듈 전역 이름으로 호출하므로 그대로 적용됨)"""
+    originals = {name: getattr(module, name) for name in replacements}
+    try:
+        for name, fn in replacements.items():
+            setattr(module, name, fn)
+        yield
+    finally:
+        for name, fn in originals.items():
+            setattr(module, name, fn)
+
+
+def _peak_rss_mb():
+    """이 프로세스의 최대 RSS - 리눅스 ru_maxrss는 KB, 맥은 바이트"""
+    if resource is None:
+        return None
+    unit = 1 if sys.platform == "darwin" else 1024
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit / 1e6, 1)
+
+
+def _tree_rss_bytes(root_pid):
+    """root_pid와 모든 자손 프로세스(렌더링 워커, ffmpeg)의 RSS 합 - /proc 기반이라 리눅스 전용"""
+    children = defaultdict(list)
+    rss = {}
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat") as f:
+                stat = f.read()
+            with open(f"/proc/{name}/statm") as f:
+                rss[int(name)] = int(f.read().split()[1]) * page_size
+        except (OSError, IndexError, ValueError):
+            continue
+        ppid = int(stat.rsplit(")", 1)[1].split()[1]) # 프로세스 이름에 공백/괄호가 있어도 안전하게
+        children[ppid].append(int(name))
+    total, stack = 0, [root_pid]
+    while stack:
+        pid = stack.pop()
+        total += rss.get(pid, 0)
+        stack.extend(children.get(pid, []))
+    return total
+
+
+class TreeRssSampler:
+    """
+    [Bench] 작업 중 프로세스 트리 전체의 RSS를 주기적으로 재서 최대값을 기록합니다.
+    (자식 프로세스의 ru_maxrss는 fork 시점의 부모 메모리를 물려받아 부풀려지므로 직접 샘플링)
+    """
+
+    def __init__(self, interval=0.2):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+        self.enabled = os.path.isdir("/proc")
+
+    def _run(self):
+        pid = os.getpid()
+        while not self._stop.is_set():
+            self.peak = max(self.peak, _tree_rss_bytes(pid))
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        if self.enabled:
+            self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.enabled:
+            self._stop.set()
+            self._thread.join()
+        return False
+
+    def peak_mb(self):
+        return round(self.peak / 1e6, 1) if self.enabled else None
+
+
+def _cpu_seconds():
+    if resource is None:
+        return None
+    total = 0.0
+    for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN):
+        usage = resource.getrusage(who)
+        total += usage.ru_utime + usage.ru_stime
+    return total
+
+
+def _video_info(path):
+    from moviepy.editor import VideoFileClip
+
+    clip = VideoFileClip(path)
+    try:
+        return {"duration": clip.duration, "fps": clip.fps, "size": list(clip.size)}
+    finally:
+        clip.close()
+
+
+def run_case(num_scenes, fixtures, options):
+    """
+    [Bench] 씬 num_scenes개짜리 작업 하나를 가짜 프로바이더로 끝까지 실행하고 지표 dict를 돌려줍니다.
+    최대 RSS가 작업별로 나오도록 run_benchmark가 작업마다 새 프로세스에서 호출합니다.
+    """
+    import pipeline_module as pipeline
+
+    fakes = FakeProviders(
+        fixtures, latencies=options.get("latencies"), latency_scale=options.get("latency_scale", 1.0),
+        veo_success=options.get("veo_success", VEO_SUCCESS_RATE), font_path=options.get("font_path"),
+        seed=options.get("seed", 0) + num_scenes,
+    )
+    output_dir = options.get("output_dir") or DEFAULT_BENCH_DIR
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_id = f"bench_{num_scenes}_{uuid.uuid4().hex[:8]}"
+    messages = []
+    first_preview = []
+    record = {"scenes": num_scenes, "status": "failed", "error": None}
+
+    start = time.perf_counter()
+    cpu_start = _cpu_seconds()
+
+    def on_preview(seq, path):
+        if not first_preview:
+            first_preview.append(time.perf_counter() - start)
+
+    sampler = TreeRssSampler()
+    try:
+        replacements = {name: trace.traced(span_name, "fake")(getattr(fakes, name)) for name, span_name in PATCHED_FUNCTIONS.items()}
+        with sampler, patched(pipeline, replacements):
+            cfg = pipeline.make_job_settings(
+                render_backend=options.get("backend"), render_profile=options.get("profile"),
+                aspect_ratio=options.get("aspect_ratio"), provider_limits=options.get("limits"),
+                trace=options.get("trace"), profile_render=options.get("profile_render"),
+                # 지연을 줄여 돌릴 때는 폴링 주기도 같은 비율로 (실제 10초 주기와 같은 비중의 대기)
+                veo_poll_seconds=pipeline.JOB_DEFAULTS["veo_poll_seconds"] * options.get("latency_scale", 1.0),
+            )
+            script_start = time.perf_counter()
+            script = pipeline.generate_script_json(cfg, "벤치마크", num_scenes, None)
+            script_seconds = time.perf_counter() - script_start
+            result = pipeline.run_pipeline(
+                cfg, script["video_title"], script["scenes"], manifest_id,
+                progress=lambda fraction=None, message=None: None, log=messages.append,
+                output_dir=output_dir, preview=on_preview if options.get("previews", True) else None,
+            )
+        total_seconds = time.perf_counter() - start
+        record.update(
+            status="done" if result["output_path"] else "failed",
+            backend=result["backend"], profile=cfg["render_profile"], rendered_scenes=result["scenes"],
+            total_seconds=round(total_seconds, 3),
+            script_seconds=round(script_seconds, 3),
+            assets_seconds=round(result["assets_seconds"] or 0, 3),
+            preview_seconds=round(result["preview_seconds"], 3),
+            render_seconds=round(result["render_seconds"] or 0, 3),
+            first_preview_seconds=round(first_preview[0], 3) if first_preview else None,
+            trace_paths=result["trace_paths"], profile_path=result["profile_path"],
+        )
+        if result["output_path"]:
+            video = _video_info(result["output_path"])
+            frames = video["duration"] * video["fps"]
+            record.update(
+                video_seconds=round(video["duration"], 3), output_fps=video["fps"], output_size=video["size"],
+                render_frames_per_second=round(frames / result["render_seconds"], 1) if result["render_seconds"] else None,
+                realtime_factor=round(video["duration"] / total_seconds, 3),
+            )
+            if not options.get("keep_outputs"):
+                os.remove(result["output_path"])
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        if not options.get("keep_outputs"):
+            from manifest_module import JobManifest
+            manifest = JobManifest(manifest_id)
+            shutil.rmtree(manifest.segment_dir, ignore_errors=True)
+            if os.path.exists(manifest.path):
+                os.remove(manifest.path)
+
+    cpu_end = _cpu_seconds()
+    record.update(
+        peak_rss_mb=_peak_rss_mb(), peak_tree_rss_mb=sampler.peak_mb(),
+        cpu_seconds=round(cpu_end - cpu_start, 2) if cpu_start is not None else None,
+        log_messages=len(messages), providers=fakes.stats(),
+    )
+    return record
+
+
+def _git_revision():
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        return result.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_benchmark(scene_counts=BENCH_SCENES, options=None, fixture_dir=None, log=print):
+    """
+    [Bench] 씬 개수별로 작업을 하나씩(각각 새 프로세스에서) 실행하고 결과 문서를 돌려줍니다.
+    결과는 JSON으로 저장해 compare_results로 리비전끼리 비교합니다.
+    """
+    options = dict(options or {})
+    fixtures = make_fixtures(fixture_dir or os.path.join(DEFAULT_BENCH_DIR, "fixtures"))
+    report = {
+        "revision": _git_revision(),
+        "started_at": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "options": {k: v for k, v in options.items() if k != "output_dir"},
+        "cases": [],
+    }
+    ctx = multiprocessing.get_context("spawn") # 작업마다 깨끗한 프로세스 -> 최대 RSS가 작업별로 나옴
+    for num_scenes in scene_counts:
+        log(f"⏱️ {num_scenes}개 씬 작업 실행 중...")
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+            case = pool.submit(run_case, num_scenes, fixtures, options).result()
+        report["cases"].append(case)
+        if case["status"] == "done":
+            log(f"  - 전체 {case['total_seconds']:.1f}초 (자산 {case['assets_seconds']:.1f} / 미리보기 대기 {case['preview_seconds']:.1f} / "
+                f"렌더링 {case['render_seconds']:.1f}), 첫 미리보기 {case['first_preview_seconds']}초, "
+                f"최대 RSS {case['peak_rss_mb']}MB (트리 {case['peak_tree_rss_mb']}MB), {case['render_frames_per_second']}fps")
+        else:
+            log(f"  - ❌ 실패: {case['error']}")
+    report["finished_at"] = time.time()
+    return report
+
+
+def compare_results(old, new, threshold=0.10):
+    """
+    두 결과 문서를 씬 개수별로 비교합니다. 지표가 threshold(10%) 넘게 나빠진 항목 목록을 돌려줍니다.
+    반환: [(씬 개수, 지표, 이전 값, 새 값, 변화율), ...]
+    """
+    old_cases = {case["scenes"]: case for case in old.get("cases", [])}
+    regressions = []
+    for case in new.get("cases", []):
+        before = old_cases.get(case["scenes"])
+        if not before:
+            continue
+        for metric in COMPARE_METRICS:
+            a, b = before.get(metric), case.get(metric)
+            if not a or b is None:
+                continue
+            change = (b - a) / a
+            print(f"  [{case['scenes']:>3}씬] {metric:<22} {a:>9} -> {b:>9} ({change:+.1%})")
+            if change > threshold:
+                regressions.append((case["scenes"], metric, a, b, change))
+    return regressions
+
+
+if __name__ == "__main__":
+    # 예: python bench_module.py --scenes 2 8 50 --output bench.json --compare bench_main.json
+    parser = argparse.ArgumentParser(description="파이프라인 벤치마크 (가짜 프로바이더, API 호출 없음)")
+    parser.add_argument("--scenes", type=int, nargs="+", default=list(BENCH_SCENES))
+    parser.add_argument("--backend", default="parallel", choices=["moviepy", "ffmpeg", "parallel"])
+    parser.add_argument("--profile", default="final")
+    parser.add_argument("--ratio", default="16:9", choices=["16:9", "9:16"])
+    parser.add_argument("--latency", action="append", metavar="PROVIDER=MEDIAN[,SIGMA]", help="가짜 지연 분포 (예: --latency veo=30,0.5)")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="모든 지연에 곱할 값 (0이면 지연 없이 CPU 구간만)")
+    parser.add_argument("--veo-success", type=float, default=VEO_SUCCESS_RATE)
+    parser.add_argument("--limit", action="append", metavar="PROVIDER=N", help="프로바이더별 동시 실행 한도")
+    parser.add_argument("--font", default=None, help="자막 폰트 경로 (없으면 기본 폰트)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="이전 결과 JSON과 비교 (10%% 넘게 나빠지면 종료 코드 1)")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    parser.add_argument("--keep-outputs", action="store_true")
+    parser.add_argument("--trace", action="store_true", help="작업마다 단계별 트레이스 저장 (결과 폴더에 .trace.json)")
+    parser.add_argument("--profile-render", action="store_true", help="렌더링 단계 cProfile 저장")
+    args = parser.parse_args()
+
+    limits = {}
+    for item in args.limit or []:
+        name, _, value = item.partition("=")
+        limits[name.strip()] = int(value)
+    report = run_benchmark(args.scenes, {
+        "backend": args.backend, "profile": args.profile, "aspect_ratio": args.ratio,
+        "latencies": parse_latencies(args.latency), "latency_scale": args.latency_scale,
+        "veo_success": args.veo_success, "limits": limits or None, "font_path": args.font,
+        "seed": args.seed, "keep_outputs": args.keep_outputs, "trace": args.trace, "profile_render": args.profile_render,
+    })
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"📄 결과 저장: {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"📊 비교: {baseline.get('revision')} -> {report['revision']}")
+        regressions = compare_results(baseline, report, args.threshold)
+        if regressions:
+            print(f"❌ 성능 회귀 {len(regressions)}건")
+            sys.exit(1)
+        print("✅ 성능 회귀 없음")
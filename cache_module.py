@@ -0,0 +1,183 @@
+# cache_module.py
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+
+import trace_module as trace
+
+# 캐시 위치/용량 (환경 변수로 조절)
+DEFAULT_CACHE_DIR = os.getenv("ASSET_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "aigongjang_cache")
+DEFAULT_MAX_MB = float(os.getenv("ASSET_CACHE_MAX_MB", "2048"))
+
+
+def file_digest(path):
+    """파일 내용의 sha256 (레퍼런스 이미지 키용). 파일이 없으면 None."""
+    if not path or not os.path.exists(path):
+        return None
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def make_key(kind, prompt=None, model=None, voice=None, aspect_ratio=None, ref_image_path=None, **extra):
+    """
+    [Content Address] 프롬프트, 모델, 성우, 비율, 레퍼런스 이미지 바이트를 합쳐 해시 키를 만듭니다.
+    파일명/시간과 무관하므로 같은 요청은 항상 같은 키가 됩니다.
+    """
+    parts = {
+        "kind": kind,
+        "prompt": prompt,
+        "model": model,
+        "voice": voice,
+        "aspect_ratio": aspect_ratio,
+        "ref": file_digest(ref_image_path),
+    }
+    parts.update(extra)
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AssetCache:
+    """
+    [Cache] 생성된 이미지/오디오/영상을 키(해시)로 저장하는 디스크 캐시.
+    용량이 max_mb를 넘으면 가장 오래 안 쓴 파일부터 지웁니다. (LRU)
+    """
+
+    def __init__(self, cache_dir=None, max_mb=None):
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.max_bytes = int((max_mb if max_mb is not None else DEFAULT_MAX_MB) * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._index = None  # 상대경로 -> 크기 (오래된 순)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    # --- 내부 도우미 ---
+    def _load_index(self):
+        if self._index is not None:
+            return
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue
+                full = os.path.join(root, name)
+                try:
+                    st_ = os.stat(full)
+                except OSError:
+                    continue
+                entries.append((st_.st_mtime, os.path.relpath(full, self.cache_dir), st_.st_size))
+        entries.sort()
+        self._index = OrderedDict((rel, size) for _, rel, size in entries)
+
+    def _rel(self, key, ext):
+        return os.path.join(key[:2], key + ext)
+
+    def _evict(self):
+        total = sum(self._index.values())
+        while total > self.max_bytes and len(self._index) > 1:
+            rel, size = self._index.popitem(last=False)
+            try:
+                os.remove(os.path.join(self.cache_dir, rel))
+            except OSError:
+                pass
+            total -= size
+
+    def _register(self, rel):
+        full = os.path.join(self.cache_dir, rel)
+        self._index[rel] = os.path.getsize(full)
+        self._index.move_to_end(rel)
+        self._evict()
+
+    # --- 공개 API ---
+    def path_for(self, key, ext):
+        return os.path.join(self.cache_dir, self._rel(key, ext))
+
+    def get(self, key, ext):
+        """캐시에 있으면 경로(최근 사용으로 갱신), 없으면 None."""
+        rel = self._rel(key, ext)
+        full = os.path.join(self.cache_dir, rel)
+        with self._lock:
+            self._load_index()
+            if os.path.exists(full) and os.path.getsize(full) > 0:
+                self.hits += 1
+                try:
+                    os.utime(full)  # 재시작 후에도 LRU 순서 유지
+                except OSError:
+                    pass
+                self._index[rel] = os.path.getsize(full)
+                self._index.move_to_end(rel)
+                trace.annotate(cache="hit")
+                return full
+            self.misses += 1
+            self._index.pop(rel, None)
+            trace.annotate(cache="miss")
+            return None
+
+    def put_bytes(self, key, data, ext):
+        """데이터를 임시 파일에 쓴 뒤 rename (중간에 끊겨도 깨진 캐시가 남지 않음)."""
+        rel = self._rel(key, ext)
+        full = os.path.join(self.cache_dir, rel)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(full), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, full)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        with self._lock:
+            self._load_index()
+            self._register(rel)
+        trace.add("bytes", len(data)) # 캐시에 새로 넣는 것 = API에서 받아온 결과
+        return full
+
+    def put_file(self, key, src_path, ext):
+        """이미 만들어진 파일을 캐시에 복사해 넣습니다."""
+        with open(src_path, "rb") as f:
+            return self.put_bytes(key, f.read(), ext)
+
+    def materialize(self, cached_path, dest_path):
+        """캐시 파일을 원하는 위치에 하드링크(안 되면 복사)합니다."""
+        if os.path.abspath(cached_path) == os.path.abspath(dest_path):
+            return dest_path
+        os.makedirs(os.path.dirname(dest_path) or ".", exist_ok=True)
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        try:
+            os.link(cached_path, dest_path)
+        except OSError:
+            shutil.copyfile(cached_path, dest_path)
+        return dest_path
+
+    def stats(self):
+        with self._lock:
+            self._load_index()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._index),
+                "bytes": sum(self._index.values()),
+                "max_bytes": self.max_bytes,
+            }
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_default_cache():
+    """프로세스 전체에서 공유하는 기본 캐시 인스턴스."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = AssetCache()
+        return _default_cache
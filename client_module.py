@@ -0,0 +1,106 @@
+# client_module.py
+import hashlib
+import json
+import os
+import threading
+
+
+class ClientRegistry:
+    """
+    [Pool] 프로바이더 클라이언트를 (종류, 인증 정보) 별로 한 번만 만들어 재사용합니다.
+    gRPC 채널/TLS 연결과 파싱된 인증 정보가 프로세스 전체에서 공유되며, 여러 스레드에서 동시에 써도 안전합니다.
+    """
+
+    def __init__(self):
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def _get_or_create(self, key, factory):
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+        # 같은 키를 두 스레드가 동시에 만들지 않도록 키별 잠금 (다른 키 생성은 막지 않음)
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = factory()
+                self._clients[key] = client
+            return client
+
+    def genai_client(self, api_key):
+        """google-genai (신버전 SDK) 클라이언트"""
+        from google import genai
+        return self._get_or_create(("genai", api_key), lambda: genai.Client(api_key=api_key))
+
+    def legacy_genai(self, api_key):
+        """google-generativeai (구버전 SDK): configure는 키당 한 번만 호출합니다."""
+        import google.generativeai as genai_old
+
+        def configure():
+            genai_old.configure(api_key=api_key)
+            return genai_old
+
+        return self._get_or_create(("genai_old", api_key), configure)
+
+    def tts_client(self, credentials_json=None, credentials_path=None, beta=False):
+        """
+        Google TTS 클라이언트. JSON 문자열 -> 키 파일 경로 -> 기본 인증(GOOGLE_APPLICATION_CREDENTIALS) 순서로 사용합니다.
+        beta=True면 timepoint(SSML mark)를 지원하는 v1beta1 클라이언트를 돌려줍니다.
+        """
+        if beta:
+            from google.cloud import texttospeech_v1beta1 as texttospeech
+        else:
+            from google.cloud import texttospeech
+        from google.oauth2 import service_account
+
+        if credentials_json:
+            cred_id = "json:" + hashlib.sha256(credentials_json.encode("utf-8")).hexdigest()
+        elif credentials_path:
+            cred_id = "file:" + os.path.abspath(credentials_path)
+        else:
+            cred_id = "default"
+
+        def create():
+            if credentials_json:
+                creds_info = json.loads(credentials_json, strict=False)
+                credentials = service_account.Credentials.from_service_account_info(creds_info)
+            elif credentials_path:
+                credentials = service_account.Credentials.from_service_account_file(credentials_path)
+            else:
+                credentials = None
+            return texttospeech.TextToSpeechClient(credentials=credentials)
+
+        return self._get_or_create(("tts_beta" if beta else "tts", cred_id), create)
+
+    def warm_up(self, gemini_key=None, tts_json=None, tts_path=None):
+        """
+        [Warm] 첫 씬이 클라이언트 생성 비용을 내지 않도록 백그라운드에서 미리 만들어 둡니다.
+        """
+        def run():
+            try:
+                if gemini_key:
+                    self.genai_client(gemini_key)
+                if tts_json or tts_path or os.getenv("GOOGLE_APPLICATION_CREDENTIALS"):
+                    self.tts_client(tts_json, tts_path)
+            except Exception as e:
+                print(f"⚠️ 클라이언트 예열 실패 (첫 호출 때 다시 시도): {e}")
+
+        thread = threading.Thread(target=run, name="client-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+
+_default_registry = None
+_default_lock = threading.Lock()
+
+
+def get_default_registry():
+    """스크립트/CLI 용 프로세스 전역 레지스트리 (Streamlit에서는 st.cache_resource로 감싸서 씀)."""
+    global _default_registry
+    with _default_lock:
+        if _default_registry is None:
+            _default_registry = ClientRegistry()
+        return _default_registry
@@ -0,0 +1,132 @@
+# download_module.py
+import os
+import threading
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import trace_module as trace
+
+try:
+    import fcntl
+except ImportError: # Windows: 프로세스 간 잠금 없이 스레드 잠금만
+    fcntl = None
+
+CHUNK_SIZE = 1024 * 1024 # 1MB (기존 1KB 청크 대비 시스템 콜 1/1000)
+DEFAULT_HEADERS = {'User-Agent': 'Mozilla/5.0'}
+DEFAULT_TIMEOUT = (5, 30) # (연결, 읽기) 초
+
+
+@contextmanager
+def _file_lock(lock_path):
+    """
+    같은 파일을 받는 다른 프로세스(미리 받기 중인 UI, 작업 워커)와 겹치지 않도록 lock 파일을 flock으로 잠급니다.
+    잠금은 프로세스가 죽으면 OS가 풀어 주므로 lock 파일은 지우지 않고 둡니다.
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(lock_path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class DownloadManager:
+    """
+    [Download] 공유 requests.Session(커넥션 풀) 기반 다운로드 관리자.
+    - 임시 파일(.part)에 쓴 뒤 rename: 중간에 끊겨도 깨진 파일이 캐시처럼 보이지 않음
+    - 같은 파일은 한 번에 하나만 받음 (스레드 잠금 + 프로세스 간 flock)
+    - .part가 남아 있으면 HTTP Range로 이어받기
+    """
+
+    def __init__(self, pool_size=16, retries=3):
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=(500, 502, 503, 504), allowed_methods=("GET", "HEAD"))
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def _lock_for(self, path):
+        with self._locks_lock:
+            return self._locks.setdefault(os.path.abspath(path), threading.Lock())
+
+    def get(self, url, timeout=DEFAULT_TIMEOUT, **kwargs):
+        """풀링된 세션으로 일반 GET (API 검색 등)"""
+        return self.session.get(url, timeout=timeout, **kwargs)
+
+    def download(self, url, dest_path, min_bytes=0, headers=None, timeout=DEFAULT_TIMEOUT):
+        """
+        url을 dest_path로 받습니다. 성공하면 경로, 실패하면 None.
+        min_bytes보다 작은 결과(HTML 에러 페이지 등)는 버립니다.
+        """
+        with self._lock_for(dest_path), _file_lock(dest_path + ".lock"):
+            if os.path.exists(dest_path) and os.path.getsize(dest_path) >= max(1, min_bytes):
+                trace.annotate(cache="hit")
+                return dest_path
+            trace.annotate(cache="miss")
+
+            part_path = dest_path + ".part"
+            offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+            req_headers = dict(headers or {})
+            if offset:
+                req_headers["Range"] = f"bytes={offset}-"
+
+            try:
+                with self.session.get(url, headers=req_headers, stream=True, timeout=timeout) as response:
+                    if response.status_code == 416 and offset:
+                        pass # 이미 끝까지 받은 .part
+                    elif response.status_code == 206 and offset:
+                        self._write(response, part_path, "ab")
+                    elif response.status_code == 200:
+                        offset = 0 # 서버가 Range를 무시하면 처음부터
+                        self._write(response, part_path, "wb")
+                    else:
+                        print(f"❌ 다운로드 실패(HTTP {response.status_code}): {url}")
+                        return None
+
+                    expected = response.headers.get("Content-Length")
+                    if response.status_code in (200, 206) and expected is not None:
+                        if os.path.getsize(part_path) < offset + int(expected):
+                            print(f"⚠️ 다운로드 중단됨 (다음에 이어받기): {url}")
+                            return None
+            except requests.RequestException as e:
+                print(f"❌ 다운로드 네트워크 오류 (다음에 이어받기): {e}")
+                return None
+
+            if os.path.getsize(part_path) < min_bytes:
+                print(f"❌ 다운로드 파일 손상 의심(Too small): {url}")
+                os.remove(part_path)
+                return None
+
+            os.replace(part_path, dest_path)
+            return dest_path
+
+    def _write(self, response, part_path, mode):
+        written = 0
+        with open(part_path, mode) as f:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                if chunk:
+                    f.write(chunk)
+                    written += len(chunk)
+        trace.add("bytes", written)
+
+
+_default_manager = None
+_default_lock = threading.Lock()
+
+
+def get_download_manager():
+    """프로세스 전체에서 공유하는 다운로드 관리자"""
+    global _default_manager
+    with _default_lock:
+        if _default_manager is None:
+            _default_manager = DownloadManager()
+        return _default_manager
@@ -0,0 +1,105 @@
+# executor_module.py
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# 프로바이더별 기본 동시 실행 한도
+# (환경 변수 CONCURRENCY_TTS, CONCURRENCY_IMAGE ... 로 덮어쓸 수 있습니다)
+DEFAULT_PROVIDER_LIMITS = {
+    "tts": 4,     # Google TTS
+    "image": 3,   # Gemini 이미지 (컷 단위)
+    "veo": 2,     # Veo 작업 제출 요청 (상태 확인은 VeoJobManager 전용 스레드, 생성 자체는 서버에서 모든 씬이 동시에 진행)
+    "stock": 4,   # Pexels 검색/다운로드, 효과음
+    "scene": 8,   # 씬 단위 오케스트레이션 (네트워크 호출은 위 풀에서 실행)
+    "render": 1,  # 최종 렌더링 (CPU를 다 쓰므로 여러 작업이 공유할 때만 의미 있음)
+}
+
+
+def load_provider_limits(overrides=None, getter=os.getenv):
+    """
+    기본 한도 -> 환경 변수(CONCURRENCY_<NAME>) -> overrides 순서로 동시 실행 한도를 결정합니다.
+    """
+    limits = dict(DEFAULT_PROVIDER_LIMITS)
+    for name in limits:
+        value = getter(f"CONCURRENCY_{name.upper()}")
+        if value:
+            try:
+                limits[name] = int(value)
+            except (TypeError, ValueError):
+                print(f"⚠️ 잘못된 동시 실행 한도 무시: CONCURRENCY_{name.upper()}={value}")
+    if overrides:
+        for name, value in overrides.items():
+            if value:
+                limits[name] = int(value)
+    return {name: max(1, value) for name, value in limits.items()}
+
+
+class ProviderPool:
+    """
+    [Fan-out] 프로바이더마다 별도의 스레드 풀을 두어 동시 호출 수를 제한합니다.
+    풀이 분리되어 있으므로 'scene' 작업 안에서 'image' 작업 결과를 기다려도 교착 상태가 생기지 않습니다.
+    """
+
+    def __init__(self, limits=None, initializer=None):
+        self.limits = load_provider_limits(limits)
+        self._initializer = initializer
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def _get_pool(self, provider):
+        with self._lock:
+            pool = self._pools.get(provider)
+            if pool is None:
+                pool = ThreadPoolExecutor(
+                    max_workers=self.limits.get(provider, 1),
+                    thread_name_prefix=f"pool-{provider}",
+                    initializer=self._initializer,
+                )
+                self._pools[provider] = pool
+            return pool
+
+    def submit(self, provider, fn, *args, **kwargs):
+        """provider 풀에 작업을 넣고 Future를 반환합니다."""
+        return self._get_pool(provider).submit(fn, *args, **kwargs)
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools.clear()
+        for pool in pools:
+            pool.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # 예외로 빠져나갈 때는 아직 시작 안 한 작업을 버립니다.
+        self.shutdown(wait=True, cancel_futures=exc_type is not None)
+        return False
+
+
+def split_future(future, count):
+    """
+    리스트를 돌려주는 Future 하나를 원소별 Future count개로 나눕니다. (일괄 요청 결과를 씬별로 나눠 줄 때)
+    """
+    parts = [Future() for _ in range(count)]
+
+    def fail(targets, error):
+        for part in targets:
+            if not part.cancelled(): # 받는 쪽이 먼저 취소한 조각은 건너뜀
+                part.set_exception(error)
+
+    def distribute(done):
+        try:
+            results = list(done.result())
+        except Exception as e:
+            fail(parts, e)
+            return
+        for part, result in zip(parts, results):
+            if not part.cancelled():
+                part.set_result(result)
+        # 결과가 모자라면 남은 조각이 영원히 기다리지 않도록 오류로 끝냄
+        fail(parts[len(results):], ValueError(f"일괄 결과가 {len(results)}개뿐입니다 (필요: {count}개)"))
+
+    future.add_done_callback(distribute)
+    return parts
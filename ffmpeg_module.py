@@ -0,0 +1,193 @@
+# ffmpeg_module.py
+import os
+import subprocess
+import tempfile
+
+import trace_module as trace
+from audio_module import mix_soundtrack
+from motion_module import choose_effect
+from render_module import subtitle_style
+from subtitle_module import save_caption_sprites
+
+
+def get_ffmpeg_binary():
+    """MoviePy와 같은 ffmpeg 바이너리(imageio-ffmpeg)를 우선 사용합니다."""
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return "ffmpeg"
+
+
+def zoompan_exprs(effect, n_frames, strength=0.04):
+    """
+    [Ken Burns] motion_module과 같은 효과/이징(smoothstep)을 zoompan 수식으로 옮깁니다.
+    """
+    p = f"(on/{max(1, n_frames - 1)})"
+    eased = f"({p}*{p}*(3-2*{p}))"
+    if effect == 'zoom_in':
+        zoom = f"1+{strength}*{eased}"
+    elif effect == 'zoom_out':
+        zoom = f"1+{strength}*(1-{eased})"
+    else:
+        zoom = f"{1 + strength}"
+
+    x = "(iw-iw/zoom)/2"
+    y = "(ih-ih/zoom)/2"
+    if effect == 'pan_left':
+        x = f"(iw-iw/zoom)*(1-{eased})"
+    elif effect == 'pan_right':
+        x = f"(iw-iw/zoom)*{eased}"
+    elif effect == 'pan_up':
+        y = f"(ih-ih/zoom)*(1-{eased})"
+    elif effect == 'pan_down':
+        y = f"(ih-ih/zoom)*{eased}"
+    return zoom, x, y
+
+
+class FilterGraph:
+    """입력 파일 목록과 filter_complex 체인을 함께 쌓아 가는 도우미"""
+
+    def __init__(self):
+        self.input_args = []
+        self.chains = []
+        self._n_inputs = 0
+        self._n_labels = 0
+
+    def add_input(self, path, *pre_args):
+        self.input_args += [*pre_args, "-i", path]
+        self._n_inputs += 1
+        return self._n_inputs - 1
+
+    def label(self, prefix):
+        self._n_labels += 1
+        return f"{prefix}{self._n_labels}"
+
+    def add(self, chain):
+        self.chains.append(chain)
+
+    def script(self):
+        return ";\n".join(self.chains)
+
+
+def _image_cut(graph, path, duration, size, fps, seed, motion=True):
+    w, h = size
+    n_frames = max(1, int(round(duration * fps)))
+    if not motion:
+        # [Draft] 모션 없이 정지 화면: 출력 크기로 한 번만 스케일하고 프레임 복제
+        idx = graph.add_input(path, "-loop", "1", "-t", f"{duration:.3f}")
+        out = graph.label("cut")
+        graph.add(
+            f"[{idx}:v]scale={w}:{h}:force_original_aspect_ratio=increase,crop={w}:{h},fps={fps},"
+            f"setsar=1,format=yuv420p[{out}]"
+        )
+        return out
+    zoom, x, y = zoompan_exprs(choose_effect(seed), n_frames)
+    idx = graph.add_input(path)
+    out = graph.label("cut")
+    # 2배 해상도에서 zoompan (정수 좌표 떨림 완화) -> 출력 크기로 바로 내보냄
+    graph.add(
+        f"[{idx}:v]scale={w * 2}:{h * 2}:force_original_aspect_ratio=increase,crop={w * 2}:{h * 2},"
+        f"zoompan=z='{zoom}':x='{x}':y='{y}':d={n_frames}:s={w}x{h}:fps={fps},"
+        f"setsar=1,format=yuv420p[{out}]"
+    )
+    return out
+
+
+def _video_cut(graph, path, duration, size, fps):
+    w, h = size
+    idx = graph.add_input(path, "-stream_loop", "-1", "-t", f"{duration:.3f}")
+    out = graph.label("cut")
+    graph.add(
+        f"[{idx}:v]scale={w}:{h}:force_original_aspect_ratio=increase,crop={w}:{h},fps={fps},"
+        f"setsar=1,format=yuv420p,trim=duration={duration:.3f},setpts=PTS-STARTPTS[{out}]"
+    )
+    return out
+
+
+def _scene(graph, spec, settings, workdir):
+    size, fps = settings["size"], settings["fps"]
+    duration = spec["duration"]
+
+    # 1. 영상: 컷(이미지 zoompan 또는 스톡/Veo) -> 이어붙이기 -> 길이 고정
+    if spec["kind"] in ("stock", "veo"):
+        cuts = [_video_cut(graph, spec["paths"][0], duration, size, fps)]
+    else:
+        cut_duration = duration / len(spec["paths"])
+        cuts = [
+            _image_cut(graph, path, cut_duration, size, fps, seed=os.path.basename(path), motion=settings.get("motion", True))
+            for path in spec["paths"]
+        ]
+    video = graph.label("sv")
+    graph.add(
+        "".join(f"[{c}]" for c in cuts) + f"concat=n={len(cuts)}:v=1:a=0,"
+        f"tpad=stop_mode=clone:stop_duration={duration:.3f},trim=duration={duration:.3f},setpts=PTS-STARTPTS[{video}]"
+    )
+
+    # 2. 자막: 스프라이트 PNG를 overlay (긴 내레이션은 묶음마다 보이는 구간만 enable)
+    if spec.get("subtitle"):
+        with trace.span("subtitle", "render", scene=spec["seq"]):
+            cues = save_caption_sprites(
+                spec["subtitle"], size, settings.get("font_path"), out_prefix=os.path.join(workdir, f"sub_{spec['seq']}"),
+                **subtitle_style(size), duration=duration, max_lines=settings.get("caption_lines", 0),
+            )
+        for i, (start, end, sprite_path, x, y) in enumerate(cues):
+            sub_idx = graph.add_input(sprite_path)
+            if len(cues) == 1:
+                enable = ""
+            elif i == len(cues) - 1:
+                enable = f":enable='gte(t,{start:.3f})'"
+            else:
+                enable = f":enable='gte(t,{start:.3f})*lt(t,{end:.3f})'"
+            subtitled = graph.label("sv")
+            graph.add(f"[{video}][{sub_idx}:v]overlay=x={x}:y={y}:eof_action=repeat{enable}[{subtitled}]")
+            video = subtitled
+
+    # 3. 트랜지션: 씬 시작 페이드 인
+    faded = graph.label("sv")
+    graph.add(f"[{video}]fade=t=in:st=0:d={settings['fade_in']}[{faded}]")
+
+    return faded
+
+
+def compile_filtergraph(timeline, settings, workdir):
+    """
+    [Backend: ffmpeg] 타임라인(씬 목록)의 영상을 filter_complex 하나로 컴파일합니다.
+    zoompan/scale/crop(모션), overlay(자막), fade(트랜지션)만 사용하고,
+    오디오는 audio_module이 미리 믹싱한 사운드트랙 WAV를 그대로 씁니다.
+    """
+    graph = FilterGraph()
+    videos = [_scene(graph, spec, settings, workdir) for spec in timeline]
+    graph.add("".join(f"[{v}]" for v in videos) + f"concat=n={len(videos)}:v=1:a=0[vout]")
+    return graph
+
+
+def render_ffmpeg(timeline, settings, output_path):
+    """
+    [Backend: ffmpeg] 컴파일한 그래프를 네이티브 ffmpeg 프로세스 하나로 실행합니다.
+    """
+    if not timeline:
+        raise RuntimeError("합성할 씬이 없습니다.")
+    with tempfile.TemporaryDirectory(prefix="ffgraph_") as workdir:
+        soundtrack_path = mix_soundtrack(timeline, settings, os.path.join(workdir, "soundtrack.wav"))
+        graph = compile_filtergraph(timeline, settings, workdir)
+        audio_idx = graph.add_input(soundtrack_path)
+        script_path = os.path.join(workdir, "graph.txt")
+        with open(script_path, "w", encoding="utf-8") as f:
+            f.write(graph.script())
+
+        cmd = [
+            get_ffmpeg_binary(), "-y", "-hide_banner", "-loglevel", "error",
+            *graph.input_args,
+            "-filter_complex_script", script_path,
+            "-map", "[vout]", "-map", f"{audio_idx}:a",
+            "-r", str(settings["fps"]), "-c:v", settings["codec"], "-preset", settings["preset"], "-crf", str(settings["crf"]),
+            "-pix_fmt", "yuv420p", "-c:a", settings["audio_codec"],
+            output_path,
+        ]
+        # 모션(zoompan)/자막(overlay)은 필터그래프 안에서 함께 처리되므로 구간 하나로 기록
+        with trace.span("encode", "render", scenes=len(timeline)):
+            result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg 오류 (code {result.returncode}): {result.stderr[-1000:]}")
+    return output_path
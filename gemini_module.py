@@ -1,15 +1,14 @@
 # gemini_module.py
 import os
 import json
-import google.generativeai as genai
 from dotenv import load_dotenv
+from client_module import get_default_registry
 
 # 환경 변수 로드
 load_dotenv()
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 
 # 기존 generate_script_json 함수를 지우고 이걸로 붙여넣으세요
-def generate_script_json(topic, num_scenes=3):
+def generate_script_json(topic, num_scenes=3, clients=None):
     try:
         # 키 확인용 (키 앞 4자리만 출력해봄)
         api_key = os.getenv("GOOGLE_API_KEY")
@@ -17,11 +16,11 @@ def generate_script_json(topic, num_scenes=3):
             st.error("❌ GOOGLE_API_KEY가 없습니다. Secrets 설정을 확인하세요.")
             return None
         
-        # 모델 설정
-        genai.configure(api_key=api_key)
+        # 모델 설정 (configure는 레지스트리가 키당 한 번만 호출)
+        genai_sdk = (clients or get_default_registry()).legacy_genai(api_key)
         
         # ⚠️ 모델 이름 변경: 'gemini-1.5-flash'가 가장 빠르고 에러가 적습니다.
-        model = genai.GenerativeModel('gemini-2.5-flash') 
+        model = genai_sdk.GenerativeModel('gemini-2.5-flash') 
         
         prompt = f"""
         YouTube Short Script for topic: '{topic}'.
@@ -0,0 +1,407 @@
+# job_module.py
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+
+from manifest_module import DEFAULT_JOBS_DIR
+
+DEFAULT_DB_PATH = os.getenv("JOB_DB_PATH") or os.path.join(DEFAULT_JOBS_DIR, "queue.sqlite3")
+JOB_STATES = ("queued", "running", "done", "failed", "cancelled")
+FINISHED_STATES = ("done", "failed", "cancelled")
+STALE_SECONDS = 300 # 이 시간 동안 heartbeat가 없으면 죽은 워커로 보고 다시 대기열로
+HEARTBEAT_SECONDS = 30 # 작업 중에는 진행 보고와 별개로 이 주기마다 heartbeat (긴 렌더링 구간 대비)
+REQUEUE_CHECK_SECONDS = 60 # 워커가 이 주기마다 죽은 작업을 찾아 다시 대기열에 넣음
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    result TEXT,
+    error TEXT,
+    worker TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    heartbeat_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_state_created ON jobs (state, created_at);
+CREATE TABLE IF NOT EXISTS job_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    at REAL NOT NULL,
+    message TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS job_events_job ON job_events (job_id, id);
+CREATE TABLE IF NOT EXISTS job_previews (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    at REAL NOT NULL,
+    PRIMARY KEY (job_id, seq)
+);
+"""
+
+
+def new_job_id():
+    return uuid.uuid4().hex[:12]
+
+
+class JobCancelled(Exception):
+    """사용자가 실행 중인 작업을 취소했을 때 진행 보고 시점에 발생합니다."""
+
+
+class JobQueue:
+    """
+    [Queue] SQLite 기반 영구 작업 대기열. UI는 submit/get/events만, 워커 프로세스는 claim/report/finish만 씁니다.
+    프로세스마다 연결을 따로 열고, 상태 변경은 BEGIN IMMEDIATE 트랜잭션으로 처리해 여러 워커가 같은 작업을 가져가지 않습니다.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or DEFAULT_DB_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL") # 폴링(읽기)이 워커 쓰기를 막지 않도록
+        return _Connection(conn)
+
+    def submit(self, payload, job_id=None):
+        """작업을 대기열에 넣고 작업 ID를 돌려줍니다."""
+        job_id = job_id or new_job_id()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, state, payload, created_at) VALUES (?, 'queued', ?, ?)",
+                (job_id, json.dumps(payload, ensure_ascii=False), time.time()),
+            )
+        return job_id
+
+    def get(self, job_id):
+        """작업 상태 dict (없으면 None). payload/result는 JSON을 풀어서 돌려줍니다."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row_to_job(row) if row else None
+
+    def list(self, limit=20, states=None):
+        query, args = "SELECT * FROM jobs", []
+        if states:
+            query += f" WHERE state IN ({','.join('?' * len(states))})"
+            args.extend(states)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        args.append(limit)
+        with self._connect() as conn:
+            return [_row_to_job(row) for row in conn.execute(query, args)]
+
+    def position(self, job_id):
+        """대기 중인 작업 앞에 몇 개가 있는지 (대기 중이 아니면 0)"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE state = 'queued' AND created_at < "
+                "(SELECT created_at FROM jobs WHERE id = ? AND state = 'queued')", (job_id,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def events(self, job_id, after_id=0):
+        """진행 메시지 목록 [(event_id, message), ...] - after_id 이후 것만"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, message FROM job_events WHERE job_id = ? AND id > ? ORDER BY id", (job_id, after_id)
+            ).fetchall()
+        return [(row["id"], row["message"]) for row in rows]
+
+    def add_preview(self, job_id, seq, path):
+        """씬 하나의 미리보기 영상 경로를 기록합니다. (같은 씬을 다시 인코딩하면 덮어씀)"""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO job_previews (job_id, seq, path, at) VALUES (?, ?, ?, ?)",
+                (job_id, seq, path, time.time()),
+            )
+
+    def previews(self, job_id):
+        """씬 미리보기 목록 [(seq, path), ...] - 씬 순서대로"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT seq, path FROM job_previews WHERE job_id = ? ORDER BY seq", (job_id,)).fetchall()
+        return [(row["seq"], row["path"]) for row in rows]
+
+    def claim(self, worker_id):
+        """가장 오래 기다린 작업 하나를 running으로 바꿔 가져옵니다. 없으면 None."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE state = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET state = 'running', worker = ?, attempts = attempts + 1, "
+                "started_at = ?, heartbeat_at = ? WHERE id = ?",
+                (worker_id, now, now, row["id"]),
+            )
+            conn.execute("COMMIT")
+        return self.get(row["id"])
+
+    def report(self, job_id, fraction=None, message=None):
+        """
+        진행률/메시지를 기록하고 heartbeat를 갱신합니다.
+        취소가 요청된 작업이면 JobCancelled를 발생시켜 워커가 작업을 멈추게 합니다.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            if fraction is not None:
+                conn.execute("UPDATE jobs SET progress = ?, heartbeat_at = ? WHERE id = ?", (fraction, now, job_id))
+            else:
+                conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (now, job_id))
+            if message:
+                conn.execute("UPDATE jobs SET message = ? WHERE id = ?", (message, job_id))
+                conn.execute("INSERT INTO job_events (job_id, at, message) VALUES (?, ?, ?)", (job_id, now, message))
+            cancel = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if cancel and cancel[0]:
+            raise JobCancelled(job_id)
+
+    def heartbeat(self, job_id):
+        """진행 보고 없이 살아 있다는 표시만 갱신합니다. (취소 확인은 report에서)"""
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND state = 'running'", (time.time(), job_id))
+
+    def finish(self, job_id, result):
+        self._close(job_id, "done", result=json.dumps(result, ensure_ascii=False), progress=1.0)
+
+    def fail(self, job_id, error):
+        self._close(job_id, "failed", error=str(error))
+
+    def mark_cancelled(self, job_id):
+        self._close(job_id, "cancelled")
+
+    def _close(self, job_id, state, result=None, error=None, progress=None):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET state = ?, result = ?, error = ?, progress = COALESCE(?, progress), "
+                "finished_at = ? WHERE id = ?",
+                (state, result, error, progress, time.time(), job_id),
+            )
+
+    def cancel(self, job_id):
+        """대기 중이면 바로 취소, 실행 중이면 다음 진행 보고 때 멈추도록 표시합니다."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE jobs SET state = 'cancelled', finished_at = ? WHERE id = ? AND state = 'queued'",
+                (time.time(), job_id),
+            )
+            conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND state = 'running'", (job_id,))
+            conn.execute("COMMIT")
+
+    def requeue_stale(self, stale_seconds=STALE_SECONDS, max_attempts=3):
+        """
+        heartbeat가 끊긴 running 작업(워커 프로세스가 죽은 경우)을 다시 대기열에 넣습니다.
+        매니페스트 덕분에 다시 실행해도 이미 만든 씬 자산/세그먼트는 재사용됩니다.
+        """
+        cutoff = time.time() - stale_seconds
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE jobs SET state = 'failed', error = '워커가 반복해서 중단됨', finished_at = ? "
+                "WHERE state = 'running' AND heartbeat_at < ? AND attempts >= ?",
+                (time.time(), cutoff, max_attempts),
+            )
+            count = conn.execute(
+                "UPDATE jobs SET state = 'queued', worker = NULL WHERE state = 'running' AND heartbeat_at < ?",
+                (cutoff,),
+            ).rowcount
+            conn.execute("COMMIT")
+        return count
+
+
+class _Connection:
+    """sqlite3 연결을 with 블록이 끝날 때 닫도록 감쌉니다. (기본 sqlite3 with는 commit만 하고 닫지 않음)"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __enter__(self):
+        return self._conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and self._conn.in_transaction:
+            self._conn.execute("ROLLBACK")
+        self._conn.close()
+        return False
+
+
+def _row_to_job(row):
+    job = dict(row)
+    job["payload"] = json.loads(job["payload"]) if job["payload"] else None
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+
+def _default_handler(payload, progress, log, preview):
+    from pipeline_module import run_job
+    return run_job(payload, progress=progress, log=log, preview=preview)
+
+
+def _beat(queue, job_id, stop, interval):
+    """작업이 끝날 때(stop)까지 interval마다 heartbeat를 남기는 스레드 본체"""
+    while not stop.wait(interval):
+        try:
+            queue.heartbeat(job_id)
+        except Exception as e: # DB가 잠깐 잠겨 있어도 다음 주기에 다시 시도
+            print(f"[{job_id}] heartbeat 실패: {e}")
+
+
+def run_worker(db_path=None, worker_id=None, poll_interval=1.0, parent_pid=None, handler=None, max_jobs=None,
+               env=None, secrets=None):
+    """
+    [Worker] 대기열에서 작업을 하나씩 꺼내 실행하는 루프. parent_pid가 주어지면 부모(Streamlit 서버)가 죽을 때 같이 끝납니다.
+    handler(payload, progress, log, preview) -> 결과 dict (기본: pipeline_module.run_job)
+    env: 워커 환경 변수에 더할 서버 설정 키 (DB에는 저장하지 않음)
+    secrets: 작업 ID -> 그 작업에만 쓸 키 (WorkerGroup이 넘기는 공유 dict). 있으면 payload["secrets"]로 핸들러에 넘깁니다.
+    """
+    os.environ.update(env or {})
+    queue = JobQueue(db_path)
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    handler = handler or _default_handler
+    next_requeue = 0.0
+    done = 0
+    while max_jobs is None or done < max_jobs:
+        if parent_pid and os.getppid() != parent_pid:
+            return
+        if time.time() >= next_requeue: # 다른 워커가 죽어도 재시작을 기다리지 않고 이어받음
+            queue.requeue_stale()
+            next_requeue = time.time() + REQUEUE_CHECK_SECONDS
+        job = queue.claim(worker_id)
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+
+        job_id = job["id"]
+        payload = job["payload"]
+        job_secrets = secrets.get(job_id) if secrets is not None else None
+        if job_secrets:
+            payload = dict(payload, secrets=dict(job_secrets))
+
+        def progress(fraction=None, message=None):
+            queue.report(job_id, fraction, message)
+
+        def log(message):
+            print(f"[{job_id}] {message}")
+            queue.report(job_id, None, f"⚠️ {message}")
+
+        def preview(seq, path):
+            queue.add_preview(job_id, seq, path)
+
+        stop_beat = threading.Event()
+        beat = threading.Thread(target=_beat, args=(queue, job_id, stop_beat, HEARTBEAT_SECONDS),
+                                name=f"heartbeat-{job_id}", daemon=True)
+        beat.start()
+        try:
+            result = handler(payload, progress, log, preview)
+            queue.finish(job_id, result)
+        except JobCancelled:
+            queue.mark_cancelled(job_id)
+        except Exception as e:
+            traceback.print_exc()
+            queue.fail(job_id, e)
+        finally:
+            stop_beat.set()
+            beat.join()
+            if job_secrets:
+                secrets.pop(job_id, None) # 끝난 작업의 키는 바로 버림 (워커가 죽으면 남겨 둬서 이어받은 워커가 씀)
+        done += 1
+
+
+def start_workers(count=2, db_path=None, handler=None, env=None, secrets=None):
+    """
+    워커 프로세스 count개를 띄웁니다. 씬 병렬 렌더링이 자식 프로세스를 또 만들기 때문에 daemon이 아닌 프로세스로 띄우고,
+    부모 PID를 넘겨 부모가 끝나면 스스로 종료하게 합니다.
+    handler: 모듈 수준 함수여야 합니다 (spawn으로 자식 프로세스에 넘어감). 부하 테스트의 재생 핸들러 등.
+    env: 워커에만 넘길 환경 변수 (서버 설정의 키 등), secrets: 작업별 키 공유 dict (run_worker 참고)
+    워커끼리 API 속도 한도를 나눠 쓰도록 RATE_LIMIT_PROCESSES를 워커 수로 넘깁니다. (따로 지정돼 있으면 그 값)
+    """
+    ctx = multiprocessing.get_context("spawn")
+    env = dict(env or {})
+    if not os.getenv("RATE_LIMIT_PROCESSES"):
+        env.setdefault("RATE_LIMIT_PROCESSES", str(count))
+    processes = []
+    for i in range(count):
+        process = ctx.Process(
+            target=run_worker, name=f"job-worker-{i}",
+            kwargs={"db_path": db_path, "parent_pid": os.getpid(), "handler": handler, "env": env, "secrets": secrets},
+        )
+        process.start()
+        processes.append(process)
+    return processes
+
+
+class WorkerGroup:
+    """
+    [Worker] 서버 프로세스의 워커 묶음. 처음 한 번만 띄우고, 세션마다 다른 키(사이드바에 직접 입력한 키)는
+    submit()으로 그 작업에만 넘깁니다. 키는 DB에 저장하지 않고 프로세스 간 공유 dict(메모리)로만 전달합니다.
+    """
+
+    def __init__(self, count=2, db_path=None, handler=None):
+        self.count = count
+        self.db_path = db_path
+        self.handler = handler
+        self.processes = []
+        self._manager = None
+        self._secrets = None
+        self._lock = threading.Lock()
+
+    def ensure(self, env=None):
+        """워커가 떠 있게 합니다. env(서버 설정의 키)는 처음 띄울 때만 쓰고, 값이 달라도 다시 띄우지 않습니다."""
+        with self._lock:
+            if self.count <= 0 or self.processes:
+                return self.processes
+            self._manager = multiprocessing.get_context("spawn").Manager()
+            self._secrets = self._manager.dict()
+            env = {name: value for name, value in (env or {}).items() if value}
+            self.processes = start_workers(self.count, self.db_path, self.handler, env=env, secrets=self._secrets)
+            return self.processes
+
+    def submit(self, queue, payload, secrets=None):
+        """
+        작업을 대기열에 넣고 작업 ID를 돌려줍니다. secrets(설정 이름 -> 값)는 이 작업을 가져간 워커만 받습니다.
+        워커를 이 묶음이 띄우지 않았으면(JOB_WORKERS=0, 별도 워커 서버) 넘길 수 없으므로 서버 설정의 키를 씁니다.
+        """
+        job_id = new_job_id()
+        secrets = {name: value for name, value in (secrets or {}).items() if value}
+        with self._lock:
+            if secrets and self._secrets is not None:
+                self._secrets[job_id] = secrets # 워커가 가져가기 전에 넣어 둠
+        return queue.submit(payload, job_id=job_id)
+
+
+if __name__ == "__main__":
+    # 별도 워커 서버로 실행: python job_module.py --workers 4
+    parser = argparse.ArgumentParser(description="영상 생성 작업 워커")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("JOB_WORKERS", "2")))
+    parser.add_argument("--db", default=None)
+    args = parser.parse_args()
+
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+
+    workers = start_workers(args.workers, args.db)
+    print(f"🏭 작업 워커 {len(workers)}개 실행 중 (DB: {args.db or DEFAULT_DB_PATH})")
+    for worker in workers:
+        worker.join()
@@ -0,0 +1,515 @@
+# loadtest_module.py
+import argparse
+import hashlib
+import itertools
+import json
+import math
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import trace_module as trace
+from bench_module import PATCHED_FUNCTIONS, FakeProviders, _tree_rss_bytes, make_fixtures, patched
+from download_module import get_download_manager
+from job_module import FINISHED_STATES, JobQueue, start_workers
+from manifest_module import JobManifest
+
+DEFAULT_LOADTEST_DIR = os.path.join(tempfile.gettempdir(), "aigongjang_loadtest")
+REPLAY_URL_ENV = "LOADTEST_REPLAY_URL" # 워커 프로세스가 재생 서버 주소를 받는 환경 변수
+REPLAY_DIR_ENV = "LOADTEST_REPLAY_DIR"
+VEO_FUNCTIONS = ("start_video_veo", "poll_video_veo") # 제출~완료를 generate_video_veo 호출 하나로 녹화/재생
+
+
+# --- 1. 녹화: 실제(또는 벤치마크 가짜) 프로바이더 응답을 파일로 저장 ---
+class Recorder:
+    """
+    [Record] 프로바이더 함수 호출마다 (걸린 시간, 결과)를 기록합니다.
+    결과 파일(PNG/MP3/MP4)은 내용 해시 이름으로 files/에 복사하고, 목록은 index.json에 남깁니다.
+    """
+
+    def __init__(self, recording_dir):
+        self.recording_dir = recording_dir
+        self.files_dir = os.path.join(recording_dir, "files")
+        os.makedirs(self.files_dir, exist_ok=True)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def _store(self, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        name = hashlib.sha256(data).hexdigest()[:24] + os.path.splitext(path)[1]
+        dest = os.path.join(self.files_dir, name)
+        if not os.path.exists(dest):
+            with open(dest, "wb") as f:
+                f.write(data)
+        return name
+
+    def add(self, fn_name, latency, result):
+        entry = {"fn": fn_name, "latency": round(latency, 4), "kind": "json", "value": None, "files": []}
+        if result is None:
+            entry["kind"] = "none"
+        elif isinstance(result, str) and os.path.isfile(result):
+            entry.update(kind="path", files=[self._store(result)])
+        elif isinstance(result, list) and result and all(isinstance(p, str) and os.path.isfile(p) for p in result):
+            entry.update(kind="paths", files=[self._store(p) for p in result])
+        else:
+            entry["value"] = result
+        with self._lock:
+            self.calls.append(entry)
+
+    def wrap(self, fn_name, fn):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            result = fn(*args, **kwargs)
+            self.add(fn_name, time.perf_counter() - start, result)
+            return result
+        return wrapper
+
+    def wrap_veo(self, start, poll):
+        """Veo 제출(start)부터 폴링으로 완료를 확인할 때까지를 generate_video_veo 한 번으로 녹화합니다."""
+        def start_wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            handle = start(*args, **kwargs)
+            handle["_recorded_start"] = started
+            return handle
+
+        def poll_wrapper(*args, **kwargs):
+            done, path = poll(*args, **kwargs)
+            handle = args[1]
+            if done and not handle.get("_recorded"):
+                handle["_recorded"] = True
+                self.add("generate_video_veo", time.perf_counter() - handle["_recorded_start"], path)
+            return done, path
+
+        return start_wrapper, poll_wrapper
+
+    def save(self):
+        path = os.path.join(self.recording_dir, "index.json")
+        with self._lock:
+            data = {"recorded_at": time.time(), "calls": list(self.calls)}
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(path + ".tmp", path)
+        return path
+
+
+def record_session(recording_dir, topic, num_scenes=4, genre_key=None, settings=None, source="live", log=print):
+    """
+    [Record] 작업 하나를 끝까지 실행하면서 프로바이더 응답을 녹화합니다. (API 할당량은 이때 한 번만 씀)
+    source="bench"면 실제 API 대신 벤치마크 가짜 프로바이더를 녹화합니다. (키 없이 하네스 자체를 점검할 때)
+    """
+    import pipeline_module as pipeline
+
+    recorder = Recorder(recording_dir)
+    if source == "bench":
+        fakes = FakeProviders(make_fixtures(os.path.join(recording_dir, "fixtures")))
+        originals = {name: getattr(fakes, name) for name in PATCHED_FUNCTIONS}
+    else:
+        originals = {name: getattr(pipeline, name) for name in PATCHED_FUNCTIONS}
+    replacements = {name: recorder.wrap(name, fn) for name, fn in originals.items() if name not in VEO_FUNCTIONS}
+    replacements.update(zip(VEO_FUNCTIONS, recorder.wrap_veo(*(originals[name] for name in VEO_FUNCTIONS))))
+    with patched(pipeline, replacements):
+        cfg = pipeline.make_job_settings(**(settings or {}))
+        genre_key = genre_key or "📰 정보/뉴스 (Info)"
+        script = pipeline.generate_script_json(cfg, topic, num_scenes, genre_key, log=log)
+        if not script or not script.get("scenes"):
+            raise RuntimeError("기획안 생성 실패 - 녹화를 중단합니다.")
+        result = pipeline.run_pipeline(
+            cfg, script.get("video_title") or topic, script["scenes"], f"record_{uuid.uuid4().hex[:8]}",
+            log=log, output_dir=recording_dir,
+        )
+    path = recorder.save()
+    log(f"📼 녹화 완료: 호출 {len(recorder.calls)}개 -> {path} (영상: {result['output_path']})")
+    return path
+
+
+# --- 2. 재생 서버: 녹화한 응답을 녹화 당시 지연으로 돌려주는 로컬 대역 서버 ---
+class ReplayServer:
+    """
+    [Replay] 녹화본을 HTTP로 재생하는 로컬 서버.
+    GET /call/<함수> -> 녹화된 지연(x latency_scale)만큼 기다렸다가 {"kind", "value", "files"} JSON
+    GET /files/<이름> -> 녹화된 결과 파일
+    같은 함수의 녹화가 여러 개면 돌아가며 씁니다.
+    """
+
+    def __init__(self, recording_dir, latency_scale=1.0, host="127.0.0.1", port=0, seed=0):
+        with open(os.path.join(recording_dir, "index.json"), encoding="utf-8") as f:
+            calls = json.load(f)["calls"]
+        self.recording_dir = recording_dir
+        self.latency_scale = latency_scale
+        self._entries = {}
+        for entry in calls:
+            self._entries.setdefault(entry["fn"], []).append(entry)
+        rng = random.Random(seed)
+        self._cycles = {}
+        for name, entries in self._entries.items():
+            rng.shuffle(entries)
+            self._cycles[name] = itertools.cycle(entries)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="replay-server", daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def next_entry(self, fn_name):
+        with self._lock:
+            self.requests += 1
+            cycle = self._cycles.get(fn_name)
+            return next(cycle) if cycle else None
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass # 요청마다 stderr에 찍지 않음
+
+            def _send(self, status, body=b"", content_type="application/json"):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                parts = parsed.path.strip("/").split("/", 1)
+                if len(parts) == 2 and parts[0] == "call":
+                    entry = server.next_entry(parts[1])
+                    if entry is None:
+                        return self._send(404, b'{"error": "not recorded"}')
+                    time.sleep(entry["latency"] * server.latency_scale)
+                    body = {"kind": entry["kind"], "value": entry["value"], "files": entry["files"]}
+                    return self._send(200, json.dumps(body, ensure_ascii=False).encode("utf-8"))
+                if len(parts) == 2 and parts[0] == "files":
+                    path = os.path.join(server.recording_dir, "files", os.path.basename(parts[1]))
+                    if not os.path.exists(path):
+                        return self._send(404)
+                    with open(path, "rb") as f:
+                        return self._send(200, f.read(), "application/octet-stream")
+                self._send(404)
+
+        return Handler
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class ReplayClient:
+    """
+    [Replay] pipeline_module 프로바이더 함수와 같은 모양으로 재생 서버를 호출합니다.
+    결과 파일은 replay_dir에 한 번만 받아 두고 이후에는 로컬 경로를 돌려줍니다.
+    """
+
+    def __init__(self, base_url, replay_dir):
+        self.base_url = base_url.rstrip("/")
+        self.replay_dir = replay_dir
+        os.makedirs(replay_dir, exist_ok=True)
+        self._veo_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="replay-veo")
+
+    def _call(self, fn_name, count=None):
+        downloader = get_download_manager()
+        response = downloader.get(f"{self.base_url}/call/{fn_name}", timeout=(5, 600))
+        response.raise_for_status()
+        entry = response.json()
+        trace.add("bytes", len(response.content))
+        paths = [
+            downloader.download(f"{self.base_url}/files/{name}", os.path.join(self.replay_dir, name))
+            for name in entry["files"]
+        ]
+        if entry["kind"] == "path":
+            return paths[0]
+        if entry["kind"] == "paths":
+            # 일괄 TTS는 녹화 때와 씬 개수가 다를 수 있으므로 돌아가며 채움
+            return [paths[i % len(paths)] for i in range(count or len(paths))]
+        return entry["value"]
+
+    def generate_script_json(self, cfg, topic, num_scenes, genre_key, log=print):
+        return self._call("generate_script_json")
+
+    def generate_image_google(self, cfg, prompt, ref_image_path=None, log=print):
+        return self._call("generate_image_google")
+
+    def generate_audio(self, cfg, text, log=print):
+        return self._call("generate_audio")
+
+    def generate_audio_for_scenes(self, cfg, texts, log=print):
+        return self._call("generate_audio_for_scenes", count=len(texts))
+
+    def start_video_veo(self, cfg, prompt, log=print):
+        # 서버가 녹화된 생성 시간만큼 응답을 늦추므로, 제출은 바로 돌려주고 응답은 별도 스레드에서 기다림
+        return {"future": self._veo_pool.submit(self._call, "generate_video_veo")}
+
+    def poll_video_veo(self, cfg, handle, log=print):
+        future = handle["future"]
+        return (True, future.result()) if future.done() else (False, None)
+
+    def download_pexels_video(self, cfg, query, log=print):
+        return self._call("download_pexels_video")
+
+    def get_sfx_path(self, sfx_name):
+        return self._call("get_sfx_path") if sfx_name and sfx_name != "None" else None
+
+    def get_bgm_path(self, mood_key):
+        return self._call("get_bgm_path")
+
+    def get_korean_font(self):
+        return self._call("get_korean_font")
+
+    def functions(self):
+        """pipeline_module에 바꿔 끼울 함수들 (트레이스 구간 이름은 실제 함수와 같게)"""
+        return {name: trace.traced(span_name, "replay")(getattr(self, name)) for name, span_name in PATCHED_FUNCTIONS.items()}
+
+
+def replay_handler(payload, progress, log, preview):
+    """[Worker] 재생 서버를 프로바이더로 써서 작업을 실행하는 job_module 핸들러 (워커 프로세스에서 실행)"""
+    import pipeline_module as pipeline
+
+    client = ReplayClient(os.environ[REPLAY_URL_ENV], os.environ[REPLAY_DIR_ENV])
+    with patched(pipeline, client.functions()):
+        return pipeline.run_job(payload, progress=progress, log=log, preview=preview)
+
+
+# --- 3. 부하 실행: 가상 세션 N개가 Step 1 -> Step 2 -> 렌더링을 반복 ---
+def _cpu_times():
+    """/proc/stat 전체 CPU (busy, total) jiffies - 리눅스 전용"""
+    with open("/proc/stat") as f:
+        values = [int(v) for v in f.readline().split()[1:]]
+    idle = values[3] + (values[4] if len(values) > 4 else 0) # idle + iowait
+    return sum(values) - idle, sum(values)
+
+
+class SaturationSampler:
+    """
+    [LoadTest] 시스템 CPU 사용률과 (이 프로세스 + 워커 + 렌더링 자식) 메모리를 주기적으로 샘플링합니다.
+    """
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.enabled = os.path.exists("/proc/stat")
+        self.cpu = []
+        self.rss = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="saturation-sampler", daemon=True)
+
+    def _run(self):
+        last = _cpu_times()
+        pid = os.getpid()
+        while not self._stop.wait(self.interval):
+            now = _cpu_times()
+            busy, total = now[0] - last[0], now[1] - last[1]
+            last = now
+            if total:
+                self.cpu.append(busy / total)
+            self.rss.append(_tree_rss_bytes(pid))
+
+    def __enter__(self):
+        if self.enabled:
+            self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.enabled:
+            self._stop.set()
+            self._thread.join()
+        return False
+
+    def summary(self):
+        if not self.cpu:
+            return {"cpu_mean": None, "cpu_p95": None, "rss_peak_mb": None, "rss_mean_mb": None}
+        return {
+            "cpu_mean": round(statistics.mean(self.cpu), 3),
+            "cpu_p95": round(percentile(self.cpu, 95), 3),
+            "rss_peak_mb": round(max(self.rss) / 1e6, 1),
+            "rss_mean_mb": round(statistics.mean(self.rss) / 1e6, 1),
+        }
+
+
+def percentile(values, pct):
+    """최근접 순위(nearest-rank) 백분위수"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def run_session(session_id, queue, client, options, log=print):
+    """
+    [Session] 사용자 한 명: Step 1(기획안 생성) -> Step 2(대본 검토 시간) -> 작업 제출 -> 완료까지 폴링.
+    options["videos_per_session"]번 반복하고, 영상마다 기록 dict를 돌려줍니다.
+    """
+    records = []
+    rng = random.Random(session_id)
+    for n in range(options.get("videos_per_session", 1)):
+        record = {"session": session_id, "video": n, "status": "failed", "error": None}
+        start = time.time()
+        try:
+            # 모듈 함수를 바꿔 끼우면 세션 스레드끼리 겹치므로 재생 클라이언트를 직접 호출
+            script = client.generate_script_json(None, f"부하 테스트 {session_id}-{n}", options.get("num_scenes", 4), None)
+            record["script_seconds"] = time.time() - start
+
+            # Step 2: 사용자가 대본을 읽고 고치는 시간 (지수 분포)
+            think = rng.expovariate(1 / options["think_seconds"]) if options.get("think_seconds") else 0.0
+            time.sleep(think)
+            record["think_seconds"] = think
+
+            manifest_id = f"load_{session_id}_{n}_{uuid.uuid4().hex[:6]}"
+            job_id = queue.submit({
+                "title": script.get("video_title") or "loadtest", "scenes": script["scenes"],
+                "manifest_id": manifest_id, "settings": options.get("settings", {}),
+            })
+            while True:
+                job = queue.get(job_id)
+                if job["state"] in FINISHED_STATES:
+                    break
+                time.sleep(options.get("poll_seconds", 1.0))
+
+            record.update(
+                status=job["state"], error=job["error"],
+                queue_seconds=(job["started_at"] or job["finished_at"]) - job["created_at"],
+                job_seconds=job["finished_at"] - job["created_at"],
+                session_seconds=time.time() - start,
+            )
+            result = job["result"] or {}
+            if not options.get("keep_outputs"):
+                if result.get("output_path") and os.path.exists(result["output_path"]):
+                    os.remove(result["output_path"])
+                manifest = JobManifest(manifest_id)
+                shutil.rmtree(manifest.segment_dir, ignore_errors=True)
+                if os.path.exists(manifest.path):
+                    os.remove(manifest.path)
+        except Exception as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+        records.append(record)
+        log(f"  [세션 {session_id}] 영상 {n + 1}: {record['status']} "
+            f"({record.get('job_seconds', 0):.0f}초, 대기 {record.get('queue_seconds', 0):.0f}초) {record['error'] or ''}")
+    return records
+
+
+def summarize_level(sessions, records, wall_seconds, sampler):
+    done = [r for r in records if r["status"] == "done"]
+    job_times = [r["job_seconds"] for r in done]
+    queue_times = [r["queue_seconds"] for r in done]
+    level = {
+        "sessions": sessions,
+        "videos": len(records),
+        "done": len(done),
+        "failed": len(records) - len(done),
+        "wall_seconds": round(wall_seconds, 1),
+        "throughput_per_hour": round(len(done) / wall_seconds * 3600, 2) if wall_seconds else None,
+        "job_p50": round(percentile(job_times, 50), 2) if job_times else None,
+        "job_p95": round(percentile(job_times, 95), 2) if job_times else None,
+        "queue_p50": round(percentile(queue_times, 50), 2) if queue_times else None,
+        "queue_p95": round(percentile(queue_times, 95), 2) if queue_times else None,
+    }
+    level.update(sampler.summary())
+    return level
+
+
+def run_load_test(recording_dir, levels=(1, 2, 4), workers=2, options=None, db_path=None, log=print):
+    """
+    [LoadTest] 재생 서버 + 작업 워커 workers개를 띄우고, 동시 세션 수를 levels 순서로 올리며 측정합니다.
+    반환: {"levels": [{sessions, throughput_per_hour, job_p50, job_p95, cpu_mean, rss_peak_mb, ...}], ...}
+    """
+    options = dict(options or {})
+    options.setdefault("think_seconds", 10.0)
+    # 지연을 줄여 재생할 때는 Veo 폴링 주기도 같은 비율로
+    options["settings"] = dict(options.get("settings") or {})
+    options["settings"].setdefault("veo_poll_seconds", 10 * options.get("latency_scale", 1.0))
+    work_dir = options.get("work_dir") or os.path.join(DEFAULT_LOADTEST_DIR, uuid.uuid4().hex[:8])
+    os.makedirs(work_dir, exist_ok=True)
+    db_path = db_path or os.path.join(work_dir, "queue.sqlite3")
+
+    server = ReplayServer(recording_dir, latency_scale=options.get("latency_scale", 1.0)).start()
+    os.environ[REPLAY_URL_ENV] = server.url
+    os.environ[REPLAY_DIR_ENV] = os.path.join(work_dir, "replay_files")
+    queue = JobQueue(db_path)
+    client = ReplayClient(server.url, os.environ[REPLAY_DIR_ENV])
+    processes = start_workers(workers, db_path, handler=replay_handler)
+    report = {"recording": os.path.abspath(recording_dir), "workers": workers, "cpu_count": os.cpu_count(),
+              "options": {k: v for k, v in options.items() if k != "work_dir"}, "levels": []}
+    log(f"🚦 부하 테스트: 재생 서버 {server.url}, 워커 {workers}개, 동시 세션 {list(levels)}")
+    try:
+        for sessions in levels:
+            log(f"👥 동시 세션 {sessions}개")
+            with SaturationSampler() as sampler, ThreadPoolExecutor(max_workers=sessions, thread_name_prefix="session") as pool:
+                start = time.time()
+                futures = [pool.submit(run_session, i, queue, client, options, log) for i in range(sessions)]
+                records = [record for future in futures for record in future.result()]
+                wall = time.time() - start
+            level = summarize_level(sessions, records, wall, sampler)
+            report["levels"].append(level)
+            log(f"  => {level['throughput_per_hour']}개/시간, p50 {level['job_p50']}초, p95 {level['job_p95']}초, "
+                f"CPU {level['cpu_mean']} (p95 {level['cpu_p95']}), 메모리 최대 {level['rss_peak_mb']}MB")
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+        server.stop()
+    report["replay_requests"] = server.requests
+    return report
+
+
+if __name__ == "__main__":
+    # 1) 녹화 (실제 API, 한 번만): python loadtest_module.py record --topic "라면 끓이는 법" --scenes 4
+    # 2) 부하 실행:               python loadtest_module.py run --levels 1 2 4 8 --workers 2
+    parser = argparse.ArgumentParser(description="녹화/재생 기반 다중 세션 부하 테스트")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    rec = sub.add_parser("record", help="실제 프로바이더 응답을 녹화")
+    rec.add_argument("--recording", default=os.path.join(DEFAULT_LOADTEST_DIR, "recording"))
+    rec.add_argument("--topic", default="라면 맛있게 끓이는 법")
+    rec.add_argument("--scenes", type=int, default=4)
+    rec.add_argument("--source", choices=["live", "bench"], default="live", help="bench: API 없이 가짜 프로바이더를 녹화")
+
+    run = sub.add_parser("run", help="녹화본을 재생하며 동시 세션 부하 실행")
+    run.add_argument("--recording", default=os.path.join(DEFAULT_LOADTEST_DIR, "recording"))
+    run.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4])
+    run.add_argument("--workers", type=int, default=int(os.getenv("JOB_WORKERS", "2")))
+    run.add_argument("--videos-per-session", type=int, default=1)
+    run.add_argument("--scenes", type=int, default=4)
+    run.add_argument("--think", type=float, default=10.0, help="Step 2 대본 검토 시간 평균 (초)")
+    run.add_argument("--latency-scale", type=float, default=1.0, help="녹화된 지연에 곱할 값")
+    run.add_argument("--backend", default="parallel", choices=["moviepy", "ffmpeg", "parallel"])
+    run.add_argument("--profile", default="final")
+    run.add_argument("--output", default="loadtest_results.json")
+    run.add_argument("--keep-outputs", action="store_true")
+    args = parser.parse_args()
+
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+
+    if args.command == "record":
+        record_session(args.recording, args.topic, args.scenes, source=args.source)
+    else:
+        result = run_load_test(args.recording, args.levels, args.workers, {
+            "videos_per_session": args.videos_per_session, "num_scenes": args.scenes,
+            "think_seconds": args.think, "latency_scale": args.latency_scale, "keep_outputs": args.keep_outputs,
+            "settings": {"render_backend": args.backend, "render_profile": args.profile},
+        })
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"📄 결과 저장: {args.output}")
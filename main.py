@@ -1,15 +1,30 @@
 # main.py
+import argparse
+import csv
+import json
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
 from gemini_module import generate_script_json
-from nano_module import generate_image
+from nano_module import submit_images
 from tts_module import generate_audio
+from client_module import get_default_registry
+from executor_module import ProviderPool, load_provider_limits
+from render_module import RENDER_PROFILES
+import pipeline_module as pipeline
+import trace_module as trace
 from moviepy.editor import *
 
+# 프로세스 전역 클라이언트 레지스트리 (모든 씬이 같은 연결/인증 정보를 공유)
+CLIENTS = get_default_registry()
+
 def create_video_poc(topic):
     print(f"🚀 프로젝트 시작: 주제 - '{topic}'")
+    CLIENTS.warm_up(gemini_key=os.getenv("GOOGLE_API_KEY"))
     
     # 1. 기획 단계 (Gemini)
-    script_data = generate_script_json(topic, num_scenes=3) # PoC니까 3개만!
+    script_data = generate_script_json(topic, num_scenes=3, clients=CLIENTS) # PoC니까 3개만!
     if not script_data: return
 
     video_title = script_data.get("video_title", "output_video")
@@ -19,20 +34,20 @@ def create_video_poc(topic):
     
     # 2. 자산 생성 루프 (이미지 & 오디오)
     print("\n--- 🛠️ 자산 생성 시작 ---")
-    for scene in scenes:
+    # 이미지는 Fal 큐에 한꺼번에 제출 -> 오디오를 만드는 동안 서버에서 동시에 생성됨 (씬 수와 무관하게 한 번 기다림)
+    image_futures = submit_images([(scene["visual_prompt"], f"{scene['seq']:03d}.png") for scene in scenes])
+    for scene, image_future in zip(scenes, image_futures):
         seq = scene["seq"]
         narrative = scene["narrative"]
-        visual_prompt = scene["visual_prompt"]
         
         # 파일명 정의 (001.png, 001.mp3 등)
         base_filename = f"{seq:03d}"
-        image_filename = f"{base_filename}.png"
         audio_filename = f"{base_filename}.mp3"
         
-        # a. 이미지 생성
-        image_path = generate_image(visual_prompt, image_filename)
-        # b. 오디오 생성
-        audio_path = generate_audio(narrative, audio_filename)
+        # a. 오디오 생성
+        audio_path = generate_audio(narrative, audio_filename, clients=CLIENTS)
+        # b. 이미지 결과 (이미 제출해 둔 작업)
+        image_path = image_future.result()
         
         if image_path and audio_path:
             # 3. 클립 생성 (이미지 + 오디오 결합)
@@ -56,8 +71,164 @@ def create_video_poc(topic):
     else:
         print("❌ 생성된 클립이 없습니다. 영상을 만들 수 없습니다.")
 
+# --- 일괄 생산 (Batch): 주제 목록 파일 -> 영상 여러 개 ---
+# 입력 컬럼: topic(필수), genre, ratio, voice, style, bgm, num_scenes
+# genre/style/bgm은 "Info", "Webtoon", "Study"처럼 괄호 안 영어 키워드로 적어도 됩니다.
+
+def load_topics(path):
+    """CSV(헤더 포함) 또는 JSONL 파일에서 작업 목록을 읽습니다. topic이 빈 줄은 건너뜁니다."""
+    with open(path, encoding="utf-8-sig") as f:
+        if path.lower().endswith((".jsonl", ".json")):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = list(csv.DictReader(f))
+    return [row for row in rows if (row.get("topic") or "").strip()]
+
+def batch_settings(row, render_backend, render_profile="final", profile_render=False):
+    """입력 한 줄 -> 파이프라인 설정 dict"""
+    style_key = pipeline.resolve_choice(pipeline.STYLE_PROMPTS, row.get("style"))
+    return pipeline.make_job_settings(
+        aspect_ratio="9:16" if "9:16" in str(row.get("ratio") or "") else "16:9",
+        voice_name=row.get("voice") or None,
+        video_style=pipeline.STYLE_PROMPTS[style_key] if style_key else None,
+        bgm_mood=pipeline.resolve_choice(pipeline.BGM_URLS, row.get("bgm")),
+        render_backend=render_backend,
+        render_profile=row.get("profile") or render_profile,
+        profile_render=profile_render,
+    )
+
+def run_batch_job(index, row, output_dir, pool, render_backend, batch_name, render_profile="final", profile_render=False):
+    """
+    작업 한 개: 기획(Gemini) -> 파이프라인(공유 풀) -> 결과 기록 dict. 실패해도 예외를 올리지 않고 기록만 남깁니다.
+    """
+    topic = row["topic"].strip()
+    genre_key = pipeline.resolve_choice(pipeline.GENRE_SETTINGS, row.get("genre"), "📰 정보/뉴스 (Info)")
+    record = {"index": index, "topic": topic, "genre": genre_key, "ratio": row.get("ratio") or "16:9",
+              "voice": row.get("voice"), "status": "failed", "title": None, "output_path": None,
+              "error": None, "timings": {}, "started_at": time.time()}
+    tag = f"[{index:03d}]"
+
+    def progress(fraction=None, message=None):
+        if message:
+            print(f"{tag} {message.strip()}")
+
+    def log(message):
+        print(f"{tag} ⚠️ {message}")
+
+    try:
+        cfg = batch_settings(row, render_backend, render_profile, profile_render)
+        script_start = time.time()
+        script_data = pipeline.generate_script_json(cfg, topic, int(row.get("num_scenes") or 4), genre_key, log=log)
+        record["timings"]["script"] = time.time() - script_start
+        if not script_data or not script_data.get("scenes"):
+            raise RuntimeError("기획안 생성 실패")
+
+        record["title"] = script_data.get("video_title") or topic
+        # 같은 입력 파일/줄이면 같은 매니페스트 -> 다시 돌려도 만든 씬은 재사용
+        result = pipeline.run_pipeline(
+            cfg, record["title"], script_data["scenes"], f"{batch_name}_{index:03d}",
+            progress=progress, log=log, output_dir=output_dir, pool=pool,
+        )
+        record["timings"]["assets"] = result["assets_seconds"]
+        record["timings"]["render"] = result["render_seconds"]
+        record.update(output_path=result["output_path"], scenes=result["scenes"], backend=result["backend"])
+        record["status"] = "done" if result["output_path"] else "failed"
+        if not result["output_path"]:
+            record["error"] = "생성된 씬이 없음"
+    except Exception as e:
+        record["error"] = str(e)
+    record["finished_at"] = time.time()
+    record["timings"]["total"] = record["finished_at"] - record["started_at"]
+    print(f"{tag} {'✅' if record['status'] == 'done' else '❌'} {topic} ({record['timings']['total']:.0f}초) {record['error'] or record['output_path']}")
+    return record
+
+def write_results(path, summary):
+    """결과 매니페스트를 원자적으로 저장 (중간에 죽어도 마지막으로 끝난 작업까지 남음)"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+def run_batch(input_path, output_dir="batch_output", max_jobs=2, limits=None, render_backend="parallel", resume=False,
+              render_profile="final", trace_enabled=False, profile_render=False):
+    """
+    [Batch] 주제 목록을 한꺼번에 생산합니다. 작업 max_jobs개가 동시에 돌고,
+    모든 작업이 프로바이더별 풀 하나를 공유하므로 TTS/이미지/Veo/렌더링 동시 실행 한도는 전체 기준입니다.
+    trace_enabled: 모든 작업의 단계별 구간을 트레이스 하나({batch_name}_trace.trace.json)로 저장
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    rows = load_topics(input_path)
+    batch_name = "batch_" + "".join(c for c in os.path.splitext(os.path.basename(input_path))[0] if c.isalnum())
+    results_path = os.path.join(output_dir, f"{batch_name}_results.json")
+
+    previous = {}
+    if resume and os.path.exists(results_path):
+        with open(results_path, encoding="utf-8") as f:
+            previous = {job["index"]: job for job in json.load(f).get("jobs", [])}
+
+    summary = {"input": os.path.abspath(input_path), "started_at": time.time(),
+               "limits": load_provider_limits(limits), "max_jobs": max_jobs, "jobs": []}
+    records = {}
+    todo = []
+    for index, row in enumerate(rows, start=1):
+        done = previous.get(index)
+        if done and done.get("status") == "done" and done.get("output_path") and os.path.exists(done["output_path"]):
+            records[index] = done # 이미 끝난 작업은 건너뜀 (--resume)
+        else:
+            todo.append((index, row))
+
+    print(f"🏭 일괄 생산 시작: {len(todo)}개 작업 (건너뜀 {len(records)}개), 동시 {max_jobs}개, 한도 {summary['limits']}")
+    CLIENTS.warm_up(gemini_key=os.getenv("GOOGLE_API_KEY"), tts_json=os.getenv("GOOGLE_APPLICATION_CREDENTIALS_JSON"))
+    tracer = trace.Tracer(batch_name) if trace_enabled else None
+    with trace.activate(tracer) if tracer else nullcontext(), \
+            ProviderPool(limits) as pool, ThreadPoolExecutor(max_workers=max_jobs, thread_name_prefix="batch-job") as jobs:
+        futures = [
+            jobs.submit(run_batch_job, index, row, output_dir, pool, render_backend, batch_name, render_profile, profile_render)
+            for index, row in todo
+        ]
+        for future in as_completed(futures):
+            record = future.result()
+            records[record["index"]] = record
+            summary["jobs"] = [records[i] for i in sorted(records)]
+            write_results(results_path, summary)
+
+    if tracer:
+        summary["trace"] = tracer.export(os.path.join(output_dir, f"{batch_name}_trace"))
+        summary["stage_totals"] = tracer.summary()
+    summary["finished_at"] = time.time()
+    summary["elapsed"] = summary["finished_at"] - summary["started_at"]
+    summary["jobs"] = [records[i] for i in sorted(records)]
+    write_results(results_path, summary)
+    done_count = sum(1 for job in summary["jobs"] if job["status"] == "done")
+    print(f"\n📦 완료 {done_count}/{len(summary['jobs'])}개, {summary['elapsed']:.0f}초 -> {results_path}")
+    return summary
+
+def parse_limits(items):
+    """["tts=4", "image=2"] -> {"tts": 4, "image": 2}"""
+    limits = {}
+    for item in items or []:
+        name, _, value = item.partition("=")
+        limits[name.strip()] = int(value)
+    return limits
+
 # 실행!
 if __name__ == "__main__":
-    # 원하는 주제를 입력하고 실행해보세요!
-    topic_input = input("영상 주제를 입력하세요 (예: 라면 맛있게 끓이는 법): ")
-    create_video_poc(topic_input)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="AI 영상 공장 (CLI)")
+    parser.add_argument("--batch", help="주제 목록 파일 (.csv 또는 .jsonl)")
+    parser.add_argument("--output-dir", default="batch_output")
+    parser.add_argument("--jobs", type=int, default=2, help="동시에 진행할 영상 수")
+    parser.add_argument("--limit", action="append", metavar="PROVIDER=N", help="프로바이더별 전체 동시 실행 한도 (예: --limit image=3 --limit render=1)")
+    parser.add_argument("--backend", default="parallel", choices=["moviepy", "ffmpeg", "parallel"])
+    parser.add_argument("--profile", default="final", choices=list(RENDER_PROFILES), help="draft: 360p/12fps 미리보기, final: 원본 해상도")
+    parser.add_argument("--trace", action="store_true", help="단계별 트레이스 저장 (chrome://tracing / ui.perfetto.dev)")
+    parser.add_argument("--profile-render", action="store_true", help="작업마다 렌더링 단계 cProfile 저장")
+    parser.add_argument("--resume", action="store_true", help="결과 매니페스트에서 이미 끝난 작업은 건너뜀")
+    args = parser.parse_args()
+
+    if args.batch:
+        run_batch(args.batch, args.output_dir, args.jobs, parse_limits(args.limit), args.backend, args.resume, args.profile,
+                  args.trace, args.profile_render)
+    else:
+        # 원하는 주제를 입력하고 실행해보세요!
+        topic_input = input("영상 주제를 입력하세요 (예: 라면 맛있게 끓이는 법): ")
+        create_video_poc(topic_input)
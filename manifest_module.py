@@ -0,0 +1,84 @@
+# manifest_module.py
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+DEFAULT_JOBS_DIR = os.getenv("JOBS_DIR") or os.path.join(tempfile.gettempdir(), "aigongjang_jobs")
+
+
+def scene_fingerprint(scene, voice, style, character, aspect_ratio):
+    """
+    [Fingerprint] 씬 결과물에 영향을 주는 입력(대본, 그림 묘사, 효과음, 성우, 화풍, 캐릭터, 비율)의 해시.
+    값이 같으면 이전 실행의 자산/세그먼트를 그대로 재사용할 수 있습니다.
+    """
+    parts = {
+        "narrative": scene.get("narrative", "").strip(),
+        "visual_prompt": scene.get("visual_prompt", "").strip(),
+        "sound_effect": scene.get("sound_effect"),
+        "voice": voice,
+        "style": style,
+        "character": character,
+        "aspect_ratio": aspect_ratio,
+    }
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class JobManifest:
+    """
+    [Manifest] 작업(job)별로 씬 지문 -> 생성된 자산 경로를 JSON 파일에 기록합니다.
+    """
+
+    def __init__(self, job_id, jobs_dir=None):
+        self.job_id = job_id
+        self.jobs_dir = jobs_dir or DEFAULT_JOBS_DIR
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        self.path = os.path.join(self.jobs_dir, f"{job_id}.json")
+        self.data = {"job_id": job_id, "scenes": {}}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    self.data = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                print(f"⚠️ 매니페스트 손상, 새로 시작합니다: {self.path}")
+
+    @property
+    def segment_dir(self):
+        """씬 세그먼트 보관 위치 (재렌더링 시 변경 없는 씬은 그대로 재사용)"""
+        path = os.path.join(self.jobs_dir, f"{self.job_id}_segments")
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def reusable_assets(self, seq, fingerprint):
+        """지문이 같고 파일이 아직 남아 있으면 이전 자산 dict, 아니면 None."""
+        entry = self.data["scenes"].get(str(seq))
+        if not entry or entry.get("fingerprint") != fingerprint:
+            return None
+        assets = entry.get("assets") or {}
+        files = [assets.get("audio_path"), *assets.get("paths", [])]
+        if assets.get("sfx_path"):
+            files.append(assets["sfx_path"])
+        if not assets.get("paths") or not all(p and os.path.exists(p) for p in files):
+            return None
+        return assets
+
+    def record_assets(self, seq, fingerprint, assets):
+        keep = ("kind", "paths", "audio_path", "sfx_path", "visual_prompt")
+        self.data["scenes"][str(seq)] = {
+            "fingerprint": fingerprint,
+            "assets": {k: assets.get(k) for k in keep},
+            "updated_at": time.time(),
+        }
+
+    def forget_missing(self, seqs):
+        """대본에서 빠진 씬 기록은 지웁니다."""
+        keep = {str(s) for s in seqs}
+        self.data["scenes"] = {k: v for k, v in self.data["scenes"].items() if k in keep}
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
@@ -1,54 +1,122 @@
 # nano_module.py
 import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 import fal_client
-import requests
 from dotenv import load_dotenv
+from cache_module import get_default_cache, make_key
+from download_module import get_download_manager
+from ratelimit_module import get_rate_limiters
 
 load_dotenv()
 
-def generate_image(prompt, filename, output_dir="assets/images"):
-    """
-    프롬프트를 받아 이미지를 생성하고 지정된 경로에 저장하는 함수
-    """
-    # 저장 경로 생성
-    os.makedirs(output_dir, exist_ok=True)
-    filepath = os.path.join(output_dir, filename)
-    
-    # 이미 존재하면 스킵 (PoC용)
-    if os.path.exists(filepath):
-        print(f"⏭️ 이미지 스킵: {filename} (이미 존재함)")
-        return filepath
+MODEL_ID = "fal-ai/flux/dev" # *참고: 실제 모델 경로는 Fal.ai 사이트에서 확인 필요
+IMAGE_SIZE = "landscape_16_9" # 유튜브 비율
+DEFAULT_SEED = 42 # ✨ 일관성을 위한 시드 고정!
+DEFAULT_STEPS = 30 # 퀄리티 조절 (높을수록 고퀄/느림)
+MAX_WAITERS = 16 # 결과를 동시에 기다리는 스레드 수 (생성 자체는 Fal 큐에서 진행)
+RESULT_MODEL = MODEL_ID + ":result" # 결과 대기는 제출과 다른 리미터 (오래 걸리는 대기가 제출 자리를 막지 않게)
+
+_waiter = None
+_waiter_lock = threading.Lock()
+
+
+def _get_waiter():
+    """Fal 큐 결과 대기 + 다운로드용 공유 스레드 풀"""
+    global _waiter
+    with _waiter_lock:
+        if _waiter is None:
+            _waiter = ThreadPoolExecutor(max_workers=MAX_WAITERS, thread_name_prefix="fal-wait")
+        return _waiter
 
-    print(f"🎨 나노바나나: 이미지 생성 중... ({filename})")
-    
+
+def image_cache_key(prompt, seed=DEFAULT_SEED, steps=DEFAULT_STEPS):
+    return make_key("image", prompt=prompt, model=MODEL_ID, aspect_ratio=IMAGE_SIZE, seed=seed, steps=steps)
+
+
+def _collect(handler, cache_key, filepath, filename):
+    """큐에 들어간 작업이 끝나길 기다렸다가 결과 URL을 공유 세션(커넥션 풀)으로 받아 캐시에 저장"""
     try:
-        # 1. Fal.ai API 호출 (Flux Dev 모델 사용 예시)
-        # *참고: 실제 모델 경로는 Fal.ai 사이트에서 확인 필요 (예: "fal-ai/flux/dev")
-        handler = fal_client.submit(
-            "fal-ai/flux/dev",  # 모델 ID (변경될 수 있음)
-            arguments={
-                "prompt": prompt,
-                "image_size": "landscape_16_9", # 유튜브 비율
-                "seed": 42, # ✨ 일관성을 위한 시드 고정!
-                "num_inference_steps": 30, # 퀄리티 조절 (높을수록 고퀄/느림)
-            }
-        )
-        
-        # 2. 결과 대기 및 이미지 URL 획득
-        result = handler.get()
+        result = get_rate_limiters().call("fal", RESULT_MODEL, handler.get)
         image_url = result['images'][0]['url']
-        
-        # 3. 이미지 다운로드 및 저장
-        response = requests.get(image_url)
-        if response.status_code == 200:
-            with open(filepath, 'wb') as f:
-                f.write(response.content)
-            print(f"✅ 이미지 저장 완료: {filepath}")
-            return filepath
-        else:
-            print(f"❌ 이미지 다운로드 실패: {response.status_code}")
+        response = get_download_manager().get(image_url)
+        if response.status_code != 200:
+            print(f"❌ 이미지 다운로드 실패: {response.status_code} ({filename})")
             return None
-            
+        cached_path = get_default_cache().put_bytes(cache_key, response.content, ".png")
+        get_default_cache().materialize(cached_path, filepath)
+        print(f"✅ 이미지 저장 완료: {filepath}")
+        return filepath
+    except Exception as e:
+        print(f"❌ 나노바나나 오류: {e} ({filename})")
+        return None
+
+
+def _link(done, future, filepath):
+    """먼저 받은 결과를 이 파일명으로도 꺼내 둠 (같은 프롬프트가 여러 씬에 있는 경우)"""
+    try:
+        future.set_result(get_default_cache().materialize(done.result(), filepath) if done.result() else None)
     except Exception as e:
-        print(f"❌ 나노바나나 오류: {e}")
-        return None
\ No newline at end of file
+        print(f"❌ 이미지 저장 실패: {e}")
+        future.set_result(None)
+
+
+def submit_images(jobs, output_dir="assets/images", seed=DEFAULT_SEED, steps=DEFAULT_STEPS):
+    """
+    [Batch] [(프롬프트, 파일명)] 목록을 Fal 큐에 한꺼번에 제출하고 파일마다 Future(경로 또는 None)를 돌려줍니다.
+    생성은 Fal 쪽에서 동시에 진행되므로 씬이 N개여도 대기 시간은 이미지 한 장 정도입니다.
+    같은 프롬프트는 한 번만 제출하고, 캐시에 있으면 바로 끝난 Future를 돌려줍니다.
+    제출과 결과 대기는 "fal" 리미터를 거칩니다.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    cache = get_default_cache()
+    submitted = {} # 캐시 키 -> (핸들, 첫 파일 경로)
+    futures = []
+    for prompt, filename in jobs:
+        filepath = os.path.join(output_dir, filename)
+        cache_key = image_cache_key(prompt, seed, steps)
+        future = Future()
+        futures.append(future)
+
+        # 같은 프롬프트로 만든 적이 있으면 캐시에서 꺼내 씀 (파일명과 무관)
+        cached_path = cache.get(cache_key, ".png")
+        if cached_path:
+            print(f"⏭️ 이미지 스킵: {filename} (캐시 적중)")
+            future.set_result(cache.materialize(cached_path, filepath))
+            continue
+
+        if cache_key not in submitted:
+            print(f"🎨 나노바나나: 이미지 생성 요청... ({filename})")
+            try:
+                # 429/503은 "fal" 한도 안에서 백오프 후 다시 제출
+                handler = get_rate_limiters().call(
+                    "fal", MODEL_ID, fal_client.submit,
+                    MODEL_ID,
+                    arguments={
+                        "prompt": prompt,
+                        "image_size": IMAGE_SIZE,
+                        "seed": seed,
+                        "num_inference_steps": steps,
+                    }
+                )
+            except Exception as e:
+                print(f"❌ 나노바나나 오류: {e} ({filename})")
+                future.set_result(None)
+                continue
+            submitted[cache_key] = _get_waiter().submit(_collect, handler, cache_key, filepath, filename)
+        submitted[cache_key].add_done_callback(lambda done, future=future, filepath=filepath: _link(done, future, filepath))
+    return futures
+
+
+def generate_images(jobs, output_dir="assets/images", seed=DEFAULT_SEED, steps=DEFAULT_STEPS):
+    """
+    [Batch] 여러 이미지를 한꺼번에 만들고 입력 순서대로 경로 목록(실패는 None)을 돌려줍니다.
+    """
+    return [future.result() for future in submit_images(jobs, output_dir, seed, steps)]
+
+
+def generate_image(prompt, filename, output_dir="assets/images", seed=DEFAULT_SEED, steps=DEFAULT_STEPS):
+    """
+    프롬프트를 받아 이미지를 생성하고 지정된 경로에 저장하는 함수
+    """
+    return generate_images([(prompt, filename)], output_dir, seed, steps)[0]
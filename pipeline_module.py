@@ -0,0 +1,898 @@
+# pipeline_module.py
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import as_completed, wait
+from contextlib import nullcontext
+
+from audio_module import get_pcm_library
+from cache_module import get_default_cache, make_key
+from client_module import get_default_registry
+from download_module import get_download_manager
+from executor_module import ProviderPool, split_future
+from manifest_module import JobManifest, scene_fingerprint
+from ratelimit_module import RetryExhausted, get_rate_limiters
+from render_module import (
+    make_render_settings, probe_video, render_scene_preview, render_timeline, scene_audio_duration, segment_process_pool, submit_encode,
+)
+from tts_module import generate_audio_batch
+from veo_module import VeoJobManager
+import trace_module as trace
+
+# --- [데이터 사전] 화풍 / 장르 / BGM / 효과음 (UI와 작업 워커가 같이 씀) ---
+
+# 1. 화풍 (Style) 매핑: 사용자가 선택하면 -> 전문 프롬프트로 변환
+STYLE_PROMPTS = {
+    "📸 실사: 시네마틱 (Cinematic)": "Cinematic shot, 4k, hyper-realistic, shallow depth of field, dramatic lighting, shot on Sony A7R",
+    "📸 실사: 인스타 감성 (Aesthetic)": "Polaroid style, film grain, soft natural lighting, candid shot, aesthetic, VSCO filter",
+    "🎨 2D: 웹툰/만화 (Webtoon)": "Korean webtoon style, cel shaded, vibrant colors, clean lines, anime style, manhwa",
+    "🎨 3D: 픽사 스타일 (3D Animation)": "Disney Pixar style 3D render, cute, soft texture, volumetric lighting, Unreal Engine 5",
+    "🖌️ 예술: 수채화 (Watercolor)": "Watercolor painting, soft brush strokes, pastel colors, artistic, dreamy",
+    "🌃 사이버펑크 (Cyberpunk)": "Cyberpunk, neon lights, futuristic, dark atmosphere, glowing effects"
+}
+
+# 2. 장르별 최적화 설정
+GENRE_SETTINGS = {
+    "📰 정보/뉴스 (Info)": {
+        "persona": "Professional Journalist",
+        "max_chars": 250, # 58초 꽉 채움
+        "structure": "Hook (Shocking Fact) -> Body (3 Key Facts) -> Outro (Conclusion)",
+        "tone": "Objective, clear, analytical, trustworthy",
+        "pacing": "Fast and informative"
+    },
+    "👄 썰/스토리 (Story)": {
+        "persona": "Friendly Storyteller",
+        "max_chars": 210, # 연기할 시간 확보
+        "structure": "Hook (Emotional Reaction) -> Body (Situation & Crisis) -> Outro (Twist/Ending)",
+        "tone": "Casual, emotional, conversational (use '음슴체' or slang)",
+        "pacing": "Dynamic with pauses for emphasis"
+    },
+    "🛍️ 리뷰/후기 (Review)": {
+        "persona": "Sharp Product Reviewer",
+        "max_chars": 180, # 제품 보여줄 시간 확보
+        "structure": "Hook (Result first) -> Body (Pros & Cons) -> Outro (Final Rating)",
+        "tone": "Honest, direct, trendy, critical",
+        "pacing": "Moderate, focus on visuals"
+    },
+    "🕯️ 감성/동기부여 (Motivation)": {
+        "persona": "Life Coach & Poet",
+        "max_chars": 150, # 여백의 미
+        "structure": "Hook (Deep Question) -> Body (Insight/Advice) -> Outro (Call to Action)",
+        "tone": "Soft, warm, inspiring, calm",
+        "pacing": "Slow, leaving space for music"
+    }
+}
+
+# 3. BGM 매핑: 사용자가 선택하면 -> 무료 음원 URL로 변환
+# (실제 운영 시에는 저작권 확인된 S3 링크나 Pexels/Youtube Audio Library 파일 권장)
+BGM_URLS = {
+    "🔇 없음 (Mute)": None,
+    "☕ Lo-fi / 칠합 (Study)": "https://cdn.pixabay.com/download/audio/2022/05/27/audio_1808fbf07a.mp3",
+    "🌞 어쿠스틱 / 브이로그 (Daily)": "https://cdn.pixabay.com/download/audio/2022/03/24/audio_c8c8a73467.mp3", # 임시 URL (실제론 다른 파일 추천)
+    "🏢 코퍼레이트 / 뉴스 (Info)": "https://cdn.pixabay.com/download/audio/2022/03/10/audio_c3d0b26f58.mp3",
+    "🎬 시네마틱 / 웅장함 (Epic)": "https://cdn.pixabay.com/download/audio/2022/03/15/audio_736862b691.mp3",
+    "🤪 펑키 / 예능 (Fun)": "https://cdn.pixabay.com/download/audio/2022/03/24/audio_823e8396d6.mp3"
+}
+
+# 4. 효과음 URL 매핑 (접근이 더 원활한 GitHub 소스 등으로 대체 권장)
+# 아래는 예시용 URL이며, 실제 서비스시 본인의 S3나 호스팅 URL을 넣는 것이 가장 안전합니다.
+SFX_LIBRARY = {
+    "Whoosh (전환)": "https://cdn.pixabay.com/download/audio/2022/03/24/audio_c8c8a73467.mp3", # Pixabay Free
+    "Ding (정답/아이디어)": "https://cdn.pixabay.com/download/audio/2022/03/15/audio_736862b691.mp3",
+    "Camera (찰칵)": "https://cdn.pixabay.com/download/audio/2022/03/10/audio_c3d0b26f58.mp3",
+    "Pop (등장)": "https://cdn.pixabay.com/download/audio/2022/03/10/audio_c8c8a73467.mp3", # 임시 대체
+    "Keyboard (타자)": "https://cdn.pixabay.com/download/audio/2022/03/24/audio_823e8396d6.mp3"
+}
+
+FONT_URL = "https://github.com/google/fonts/raw/main/ofl/nanumgothic/NanumGothic-Bold.ttf"
+VEO_MODEL = "veo-3.1-generate-preview"
+VEO_SECONDS = 6
+
+# 작업 설정 기본값 (UI 사이드바 기본 선택과 동일)
+JOB_DEFAULTS = {
+    "character_desc": "20대 한국인 남성, 짧은 검은 머리, 안경, wearing 네이비 정장, 파란 넥타이. Distinctive feature: 스마트워치",
+    "video_style": STYLE_PROMPTS["🎨 2D: 웹툰/만화 (Webtoon)"],
+    "voice_name": "ko-KR-Standard-C",
+    "aspect_ratio": "16:9",
+    "bgm_mood": "☕ Lo-fi / 칠합 (Study)",
+    "use_subtitles": True,
+    "use_tts_batch": True,
+    "render_backend": "parallel",
+    "render_profile": "final",
+    "provider_limits": None,
+    "trace": False,          # 단계별 트레이스 저장 (Chrome trace / JSON lines)
+    "profile_render": False, # 렌더링 단계 cProfile
+    "veo_poll_seconds": 10,  # Veo 작업 상태 확인 주기 (초)
+    "veo_deadline": 300,     # 작업 시작 후 이 시간(초) 안에 안 끝난 Veo는 AI 이미지로 대체
+}
+
+# 키는 작업 대기열(DB)에 저장하지 않고 워커가 자기 환경 변수에서 읽습니다.
+SECRET_ENV = {
+    "gemini_key": "GOOGLE_API_KEY",
+    "tts_key_path": "GOOGLE_APPLICATION_CREDENTIALS",
+    "tts_key_json": "GOOGLE_APPLICATION_CREDENTIALS_JSON",
+    "pexels_key": "PEXELS_API_KEY",
+}
+
+
+def make_job_settings(**values):
+    """
+    [Headless] 파이프라인 설정 dict. 빠진 값은 기본값, 키는 환경 변수로 채웁니다.
+    Streamlit 전역 변수(사이드바 값) 대신 이 dict 하나를 모든 생성 함수에 넘깁니다.
+    """
+    cfg = dict(JOB_DEFAULTS)
+    cfg.update({k: v for k, v in values.items() if v is not None})
+    for name, env_name in SECRET_ENV.items():
+        if not cfg.get(name):
+            cfg[name] = os.getenv(env_name)
+    if cfg.get("tts_key_path") and not os.path.exists(cfg["tts_key_path"]):
+        cfg["tts_key_path"] = None
+    cfg["is_shorts"] = "9:16" in cfg["aspect_ratio"]
+    cfg["size"] = (720, 1280) if cfg["is_shorts"] else (1280, 720)
+    return cfg
+
+
+def resolve_choice(table, value, default=None):
+    """
+    표 키를 전체 이름 또는 괄호 안 영어 키워드로 찾습니다. (CSV 등에서 "Info", "Webtoon"처럼 짧게 적을 수 있게)
+    예: resolve_choice(GENRE_SETTINGS, "story") -> "👄 썰/스토리 (Story)"
+    """
+    if not value:
+        return default
+    if value in table:
+        return value
+    for key in table:
+        if f"({value.strip().lower()})" in key.lower():
+            return key
+    return default
+
+
+def public_settings(cfg):
+    """대기열에 저장해도 되는 설정 (키 제외)"""
+    return {k: v for k, v in cfg.items() if k not in SECRET_ENV}
+
+
+# --- 프로바이더 호출 (모두 자산 캐시를 먼저 확인) ---
+
+@trace.traced("script", "gemini")
+def generate_script_json(cfg, topic, num_scenes, genre_key, log=print):
+    """
+    [Final Fix] 컷 쪼개기('||') 지시사항 추가 + Gemini 2.5 Flash 적용
+    """
+    from google.genai import types
+
+    if not cfg["gemini_key"]:
+        log("API 키가 없습니다.")
+        return None
+
+    settings = GENRE_SETTINGS.get(genre_key, GENRE_SETTINGS["📰 정보/뉴스 (Info)"])
+
+    try:
+        client = get_default_registry().genai_client(cfg["gemini_key"])
+        model_id = "gemini-2.5-flash" # 최신 모델
+
+        prompt_text = f"""
+        You are a {settings['persona']} specialized in creating viral YouTube Shorts.
+        Create a script for the topic: '{topic}'
+
+        [GENRE SPECIFIC RULES]
+        - **Genre**: {genre_key}
+        - **Tone**: {settings['tone']}
+        - **Structure Strategy**: Follow {settings['structure']}
+        - **Length Constraint**: Keep the Korean narrative STRICTLY under **{settings['max_chars']} characters** (including spaces). This is critical for video pacing.
+
+        [CONSTRAINT - SCENE COUNT]
+        Generate exactly {num_scenes} scenes.
+
+        [VISUAL RULES]
+        1. "visual_prompt": **KOREAN (한국어)**.
+        2. **Dynamic Cuts (Important)**:
+           - To make the video dynamic, split multiple visual actions in one scene using " || ".
+           - Example: "남자가 커피를 마신다 || 창밖을 바라보는 남자 || 클로즈업 된 커피잔"
+        3. **Stock Video**:
+           - Use `[VIDEO] keyword` for generic scenes (Sky, City, Coffee).
+        4. **Visual Strategy**:
+           - If the genre is 'Review' or 'Info', focus on showing the object/fact clearly.
+           - If the genre is 'Story' or 'Motivation', focus on facial expressions and atmosphere.
+
+        [OUTPUT JSON FORMAT]
+        {{
+          "video_title": "Title in Korean",
+          "scenes": [
+            {{ "seq": 1, "narrative": "Korean script...", "visual_prompt": "Description 1 || Description 2..." }},
+            ...
+          ]
+        }}
+        """
+
+        response = get_rate_limiters().call(
+            "gemini-text", model_id, client.models.generate_content,
+            model=model_id,
+            contents=prompt_text,
+            config=types.GenerateContentConfig(
+                response_mime_type="application/json"
+            )
+        )
+
+        text = response.text.strip()
+
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            # 파싱 실패 시 수동 추출
+            start_idx = text.find('{')
+            end_idx = text.rfind('}') + 1
+            if start_idx != -1 and end_idx != -1:
+                return json.loads(text[start_idx:end_idx])
+            else:
+                return None
+
+    except Exception as e:
+        # 2.5 실패 시 2.0으로 백업
+        if "404" in str(e):
+            log("Gemini 2.5를 찾을 수 없어 2.0으로 재시도합니다.")
+            try:
+                response = get_rate_limiters().call(
+                    "gemini-text", "gemini-2.0-flash-exp", client.models.generate_content,
+                    model="gemini-2.0-flash-exp",
+                    contents=prompt_text,
+                    config=types.GenerateContentConfig(response_mime_type="application/json")
+                )
+                return json.loads(response.text.strip())
+            except Exception:
+                pass
+        log(f"기획 오류: {e}")
+        return None
+
+
+@trace.traced("image", "gemini")
+def generate_image_google(cfg, prompt, ref_image_path=None, log=print):
+    """
+    [Stabilized] Gemini 3 Pro Image: 프로세스 공유 속도 제한(토큰 버킷 + AIMD)으로 호출하고,
+    503/429 과부하는 리미터가 백오프(+지터, Retry-After)로 재시도합니다.
+    """
+    from google.genai import types
+
+    if not cfg["gemini_key"]: return None
+
+    client = get_default_registry().genai_client(cfg["gemini_key"])
+
+    # 모델 설정 (3-pro가 503이 너무 심하면 다른 모델로 바꿔도 캐시 키가 분리됨)
+    model_id = "gemini-3-pro-image-preview"
+
+    # [Cache] 같은 프롬프트 + 모델 + 레퍼런스 이미지면 API 호출 없이 재사용
+    cache = get_default_cache()
+    cache_key = make_key("image", prompt=prompt, model=model_id, image_size="1K", ref_image_path=ref_image_path)
+    cached_path = cache.get(cache_key, ".png")
+    if cached_path: return cached_path
+
+    try:
+        # 1. 프롬프트 구성 (텍스트)
+        contents_parts = [types.Part.from_text(text=prompt + ", consistent character identity, high fidelity")]
+
+        # 2. 레퍼런스 이미지 추가
+        if ref_image_path and os.path.exists(ref_image_path):
+            with open(ref_image_path, "rb") as f:
+                img_data = f.read()
+                contents_parts.append(types.Part.from_bytes(data=img_data, mime_type="image/png"))
+
+        contents = [types.Content(role="user", parts=contents_parts)]
+
+        generate_content_config = types.GenerateContentConfig(
+            response_modalities=["IMAGE"],
+            image_config=types.ImageConfig(image_size="1K"),
+        )
+
+        # API 요청
+        response = get_rate_limiters().call(
+            "gemini-image", model_id, client.models.generate_content,
+            model=model_id,
+            contents=contents,
+            config=generate_content_config,
+        )
+
+        if response.candidates and response.candidates[0].content.parts:
+            for part in response.candidates[0].content.parts:
+                if part.inline_data and part.inline_data.data:
+                    return cache.put_bytes(cache_key, part.inline_data.data, ".png")
+
+        # 여기까지 왔는데 리턴이 안 됐다면 뭔가 이상한 것
+        return None
+
+    except RetryExhausted as e:
+        log(f"❌ 재시도했으나 서버 응답이 없습니다. 나중에 다시 시도해주세요. ({e})")
+        return None
+    except Exception as e:
+        # 다른 치명적인 에러면 그냥 종료
+        log(f"이미지 생성 오류(중단): {e}")
+        return None
+
+
+def voice_gender(voice_name):
+    """성별(Gender)은 목소리 이름에 맞춰 자동 설정"""
+    if "Standard-A" in voice_name or "Standard-B" in voice_name:
+        return "FEMALE"
+    return "MALE"
+
+
+def tts_client(cfg):
+    """인증 (JSON 문자열 -> 키 파일 경로). 파싱된 인증 정보와 클라이언트는 레지스트리에서 재사용"""
+    if cfg["tts_key_json"]:
+        return get_default_registry().tts_client(credentials_json=cfg["tts_key_json"])
+    if cfg["tts_key_path"]:
+        return get_default_registry().tts_client(credentials_path=cfg["tts_key_path"])
+    return None
+
+
+@trace.traced("tts", "tts")
+def generate_audio(cfg, text, log=print):
+    """
+    [Voice] Google TTS: 성우 선택 기능 추가
+    """
+    from google.cloud import texttospeech
+
+    voice_name = cfg["voice_name"]
+    # [Cache] 같은 문장 + 같은 성우면 재사용
+    cache = get_default_cache()
+    cache_key = make_key("audio", prompt=text, model="google-tts-mp3", voice=voice_name)
+    cached_path = cache.get(cache_key, ".mp3")
+    if cached_path: return cached_path
+
+    try:
+        client = tts_client(cfg)
+    except Exception:
+        return None
+    if client is None:
+        return None
+
+    try:
+        input_text = texttospeech.SynthesisInput(text=text)
+
+        # 전달받은 voice_name 적용
+        gender = texttospeech.SsmlVoiceGender[voice_gender(voice_name)]
+
+        voice = texttospeech.VoiceSelectionParams(
+            language_code="ko-KR",
+            name=voice_name,
+            ssml_gender=gender
+        )
+
+        audio_config = texttospeech.AudioConfig(audio_encoding=texttospeech.AudioEncoding.MP3)
+
+        response = get_rate_limiters().call(
+            "tts", voice_name, client.synthesize_speech, input=input_text, voice=voice, audio_config=audio_config
+        )
+        return cache.put_bytes(cache_key, response.audio_content, ".mp3")
+
+    except Exception as e:
+        log(f"🎙️ TTS 오류: {e}")
+        return None
+
+
+@trace.traced("tts_batch", "tts")
+def generate_audio_for_scenes(cfg, texts, log=print):
+    """
+    [Batch] 여러 씬 내레이션을 SSML 하나로 합성해 씬별 파일로 나눕니다. (요청 수 최소화)
+    한도를 넘거나 실패하면 씬별 generate_audio로 처리합니다.
+    """
+    if not cfg["tts_key_json"] and not cfg["tts_key_path"]:
+        return [None] * len(texts)
+    return generate_audio_batch(
+        texts, cfg["voice_name"], voice_gender(cfg["voice_name"]), clients=get_default_registry(),
+        credentials_json=cfg["tts_key_json"], credentials_path=cfg["tts_key_path"],
+        fallback=lambda text: generate_audio(cfg, text, log=log),
+    )
+
+
+def prepare_library_audio(path):
+    """
+    [PCM Cache] 받은 BGM/효과음을 바로 float32 PCM으로 디코딩해 둡니다. (렌더링 때는 mmap만 하면 됨)
+    실패해도 원본 경로는 그대로 쓰고, 믹싱할 때 다시 디코딩합니다.
+    """
+    if path:
+        try:
+            with trace.span("pcm", "cache"):
+                get_pcm_library().prepare(path)
+        except Exception as e:
+            print(f"⚠️ PCM 캐시 준비 실패(렌더링 때 디코딩합니다): {e}")
+    return path
+
+
+@trace.traced("bgm", "download")
+def get_bgm_path(mood_key):
+    """
+    선택된 BGM 키에 해당하는 URL을 다운로드합니다.
+    """
+    if not mood_key or mood_key == "🔇 없음 (Mute)":
+        return None
+
+    url = BGM_URLS.get(mood_key)
+    if not url: return None
+
+    # 파일명에서 한글 제거 (괄호 안의 영어 키워드만 추출)
+    # 예: "🌞 어쿠스틱 / 브이로그 (Daily)" -> "Daily"
+    if '(' in mood_key:
+        english_key = mood_key.split('(')[-1].replace(')', '').strip()
+    else:
+        english_key = "default"
+
+    # 영문/숫자만 남기기
+    safe_name = "".join(x for x in english_key if x.isalnum())
+    filepath = os.path.join(tempfile.gettempdir(), f"bgm_{safe_name}.mp3")
+
+    # 파일이 있는데 크기가 너무 작으면(1KB 미만) 다시 받음 / HTML 에러페이지(Too small)는 버림
+    return prepare_library_audio(get_download_manager().download(url, filepath, min_bytes=1000))
+
+
+@trace.traced("sfx", "download")
+def get_sfx_path(sfx_name):
+    """
+    [안전 버전] 효과음 다운로드 및 검증
+    """
+    if not sfx_name or sfx_name == "None":
+        return None
+
+    url = SFX_LIBRARY.get(sfx_name)
+    if not url: return None
+
+    # 파일명 안전하게 변환 (한글 제거, 순수 영문/숫자만 남김)
+    # 예: "Pop (등장)" -> "Pop"
+    safe_key = sfx_name.split('(')[0].strip() # 괄호 앞부분만 가져옴
+    safe_name = "".join(x for x in safe_key if x.isalnum())
+    filepath = os.path.join(tempfile.gettempdir(), f"sfx_{safe_name}.mp3")
+
+    # (중요) 파일 내용이 너무 작으면(1KB 미만) 가짜 파일(HTML 에러페이지)일 확률 높음
+    return prepare_library_audio(get_download_manager().download(url, filepath, min_bytes=1000, timeout=(3, 10)))
+
+
+@trace.traced("font", "download")
+def get_korean_font():
+    """
+    한글 폰트(나눔고딕)를 다운로드하여 경로를 반환합니다.
+    """
+    font_path = os.path.join(tempfile.gettempdir(), "NanumGothic-Bold.ttf")
+    return get_download_manager().download(FONT_URL, font_path, min_bytes=10000)
+
+
+@trace.traced("stock", "pexels")
+def download_pexels_video(cfg, query, log=print):
+    """
+    [Ratio Aware] 가로/세로 모드에 맞춰 검색하고 파일 경로만 반환합니다. (병렬 다운로드용)
+    """
+    api_key = cfg["pexels_key"]
+    if not api_key: return None
+
+    headers = {'Authorization': api_key}
+    # 모드에 따라 검색 방향 변경
+    orientation = 'portrait' if cfg["is_shorts"] else 'landscape'
+    params = {'query': query, 'per_page': 1, 'orientation': orientation, 'size': 'medium'}
+
+    try:
+        downloader = get_download_manager()
+        response = downloader.get('https://api.pexels.com/videos/search', headers=headers, params=params, timeout=10)
+        data = response.json()
+        if not data.get('videos'): return None
+
+        video_files = data['videos'][0]['video_files']
+        target_video = min(video_files, key=lambda x: abs(x['width'] - cfg["size"][0]))
+        video_url = target_video['link']
+
+        # 다운로드 및 캐싱 (가로/세로 결과가 섞이지 않도록 방향도 파일명에 포함)
+        safe_name = "".join(x for x in query if x.isalnum())
+        filepath = os.path.join(tempfile.gettempdir(), f"pexels_{safe_name}_{orientation}.mp4")
+
+        return downloader.download(video_url, filepath, min_bytes=1000)
+
+    except Exception as e:
+        log(f"Pexels 다운로드 실패: {e}")
+        return None
+
+
+def veo_request(cfg, prompt):
+    """Veo 요청 내용 (비율, 프롬프트, 캐시 키) - 같은 프롬프트 + 모델 + 비율이면 재사용 (Veo는 특히 비쌈)"""
+    aspect_ratio_val = "9:16" if cfg["is_shorts"] else "16:9"
+    prompt_text = f"Cinematic movie shot, {prompt}, high quality, 4k"
+    cache_key = make_key("veo", prompt=prompt_text, model=VEO_MODEL, aspect_ratio=aspect_ratio_val, seconds=VEO_SECONDS)
+    return aspect_ratio_val, prompt_text, cache_key
+
+
+@trace.traced("veo_start", "veo")
+def start_video_veo(cfg, prompt, log=print):
+    """
+    [Ratio Aware] Veo 생성 작업을 제출하고 폴링용 핸들을 돌려줍니다. (기다리지 않음)
+    캐시에 있거나 키가 없으면 이미 끝난 핸들 {"path": ...}
+    """
+    from google.genai import types
+
+    if not cfg["gemini_key"]: return {"path": None}
+    aspect_ratio_val, prompt_text, cache_key = veo_request(cfg, prompt)
+    cached_path = get_default_cache().get(cache_key, ".mp4")
+    if cached_path: return {"path": cached_path}
+
+    client = get_default_registry().genai_client(cfg["gemini_key"])
+    operation = get_rate_limiters().call(
+        "veo", VEO_MODEL, client.models.generate_videos,
+        model=VEO_MODEL,
+        prompt=prompt_text,
+        config=types.GenerateVideosConfig(
+            aspect_ratio=aspect_ratio_val, # 비율 적용
+            number_of_videos=1,
+            duration_seconds=VEO_SECONDS,
+        ),
+    )
+    return {"operation": operation, "cache_key": cache_key}
+
+
+@trace.traced("veo_poll", "veo")
+def poll_video_veo(cfg, handle, log=print):
+    """
+    [Veo] 작업 상태를 한 번 확인합니다. 반환: (끝났는지, 영상 경로 또는 None)
+    끝났으면 영상을 받아 캐시에 넣습니다.
+    """
+    if "operation" not in handle:
+        return True, handle.get("path")
+    client = get_default_registry().genai_client(cfg["gemini_key"])
+    operation = handle["operation"] = client.operations.get(handle["operation"])
+    if not operation.done:
+        return False, None
+    if operation.error:
+        log(f"Veo Error: {operation.error}")
+        return True, None
+    videos = operation.response.generated_videos if operation.response else None
+    if not videos: # 안전 필터 등으로 결과가 비어 있음
+        return True, None
+    data = client.files.download(file=videos[0].video)
+    return True, get_default_cache().put_bytes(handle["cache_key"], data, ".mp4")
+
+
+def veo_jobs_for(cfg, pool, log=print):
+    """
+    [Veo] 작업 하나에서 쓰는 Veo 작업 관리자. start/poll은 호출 시점의 모듈 함수를 쓰므로 벤치마크/재생용으로 바꿔 끼울 수 있습니다.
+    """
+    return VeoJobManager(
+        pool,
+        start=lambda prompt: start_video_veo(cfg, prompt, log=log),
+        poll=lambda handle: poll_video_veo(cfg, handle, log=log),
+        poll_interval=cfg["veo_poll_seconds"], deadline=cfg["veo_deadline"], log=log,
+    )
+
+
+def veo_prompt(cfg, visual_prompt):
+    return f"{cfg['character_desc']}, {visual_prompt}, {cfg['video_style']}, consistent character"
+
+
+# --- 씬 자산 준비 (Fan-out) ---
+
+def build_anchor_prompt(cfg):
+    """기준 캐릭터(Anchor) 프롬프트: 가장 자세한 묘사 + 정면 얼굴 위주"""
+    return f"A detailed character sheet of {cfg['character_desc']}, {cfg['video_style']}, neutral expression, front view, white background"
+
+
+def prefetch_keys(cfg, scene):
+    """
+    [Prefetch] 씬 하나에서 미리 받을 수 있는 작업의 키. 키에 입력 내용이 그대로 들어가므로
+    대본/그림 묘사/성우/비율이 바뀌면 키가 달라져 미리 받은 결과를 쓰지 않습니다.
+    """
+    keys = {"tts": ("tts", scene['narrative'], cfg["voice_name"])}
+    visual_prompt = scene['visual_prompt'].strip()
+    if visual_prompt.upper().startswith("[VIDEO]"):
+        orientation = 'portrait' if cfg["is_shorts"] else 'landscape'
+        keys["stock"] = ("stock", visual_prompt[7:].strip(), orientation)
+    return keys
+
+
+def fetch_image_cuts(cfg, pool, visual_prompt, anchor_future, log=print):
+    """
+    [Fan-out] '||' 로 쪼갠 컷 이미지를 한 번에 요청하고, 컷 순서대로 경로를 돌려줍니다.
+    """
+    raw_prompts = visual_prompt.split('||')
+    valid_prompts = [p.strip() for p in raw_prompts if p.strip()]
+    if not valid_prompts: valid_prompts = [visual_prompt]
+
+    # 컷 이미지는 기준 캐릭터(Anchor)를 레퍼런스로 쓰므로 앵커 완료를 기다림
+    anchor_image_path = anchor_future.result() if anchor_future else None
+    futures = []
+    for raw_text in valid_prompts:
+        final_prompt = f"{cfg['character_desc']}, {raw_text}, {cfg['video_style']}"
+        futures.append(pool.submit("image", generate_image_google, cfg, final_prompt, ref_image_path=anchor_image_path, log=log))
+    return [f.result() for f in futures if f.result()]
+
+
+def fetch_scene_assets(cfg, pool, scene, audio_future, anchor_future, stock_future=None, veo_jobs=None, log=print):
+    """
+    [Fan-out] 한 씬의 자산(오디오/효과음 + 스톡 -> Veo -> 이미지 컷)을 준비하고 경로만 반환합니다.
+    클립 조립은 호출한 쪽에서 seq 순서대로 진행합니다.
+    stock_future: 미리 받아 둔(Prefetch) 스톡 영상 다운로드가 있으면 그 결과를 씁니다.
+    veo_jobs: 작업 단위 VeoJobManager (미리 제출해 둔 Veo 작업이 있으면 그 결과를 기다림)
+    """
+    with trace.span("scene", "scene", scene=scene['seq']) as span:
+        assets = _fetch_scene_assets(cfg, pool, scene, audio_future, anchor_future, stock_future, veo_jobs, log)
+        span.set(kind=assets["kind"], cuts=len(assets["paths"]))
+    return assets
+
+
+def _fetch_scene_assets(cfg, pool, scene, audio_future, anchor_future, stock_future, veo_jobs, log):
+    idx = scene['seq']
+    visual_prompt = scene['visual_prompt'].strip()
+    assets = {"seq": idx, "scene": scene, "kind": None, "paths": [], "notes": []}
+    sfx_future = pool.submit("stock", get_sfx_path, scene.get('sound_effect'))
+
+    # [전략 1] 스톡 비디오 (태그가 있는 경우 최우선)
+    if visual_prompt.upper().startswith("[VIDEO]"):
+        search_query = visual_prompt[7:].strip()
+        assets["notes"].append(f"    🎥 스톡 비디오 검색: {search_query}")
+        stock_path = (stock_future or pool.submit("stock", download_pexels_video, cfg, search_query, log=log)).result()
+        if stock_path:
+            assets["kind"], assets["paths"] = "stock", [stock_path]
+        else:
+            assets["notes"].append("    ⚠️ 스톡 비디오 실패 -> Veo 생성 시도")
+            visual_prompt = search_query # 태그 떼고 Veo로 넘김
+
+    # [전략 2] Google Veo (진짜 생성형 비디오)
+    if assets["kind"] is None:
+        with trace.span("veo_wait", "veo"):
+            if veo_jobs is not None:
+                veo_path = veo_jobs.submit(veo_prompt(cfg, visual_prompt)).result()
+            else:
+                with veo_jobs_for(cfg, pool, log=log) as jobs:
+                    veo_path = jobs.submit(veo_prompt(cfg, visual_prompt)).result()
+        if veo_path:
+            assets["kind"], assets["paths"] = "veo", [veo_path]
+            assets["notes"].append("    ✅ Veo 생성 성공!")
+
+    # [전략 3] AI 이미지 (Veo 실패 시 백업)
+    if assets["kind"] is None:
+        assets["notes"].append("    🎨 AI 이미지 모드 (백업) 실행")
+        assets["kind"], assets["paths"] = "images", fetch_image_cuts(cfg, pool, visual_prompt, anchor_future, log=log)
+
+    assets["visual_prompt"] = visual_prompt
+    assets["audio_path"] = audio_future.result()
+    assets["sfx_path"] = sfx_future.result()
+    return assets
+
+
+def assemble_scene(cfg, pool, assets, anchor_future, log=print):
+    """
+    [Timeline] 씬 자산 -> 렌더링용 씬 dict (모든 렌더링 백엔드가 같은 형식 사용). 쓸 수 없는 씬이면 None.
+    """
+    with trace.span("assemble", "scene", scene=assets["seq"]):
+        return _assemble_scene(cfg, pool, assets, anchor_future, log)
+
+
+def _assemble_scene(cfg, pool, assets, anchor_future, log):
+    seq = assets["seq"]
+    if not assets["audio_path"]:
+        return None
+
+    # 스톡/Veo 영상이 깨져서 열리지 않으면 이미지 컷으로 백업
+    kind, paths = assets["kind"], assets["paths"]
+    if kind in ("stock", "veo") and not probe_video(paths[0]):
+        log(f"Scene {seq}: 영상 클립 처리 오류 -> AI 이미지로 대체")
+        kind, paths = "images", fetch_image_cuts(cfg, pool, assets["visual_prompt"], anchor_future, log=log)
+    if not paths:
+        return None
+
+    try:
+        duration = scene_audio_duration(assets["audio_path"], assets["sfx_path"])
+    except Exception as e:
+        log(f"Scene {seq} 오디오 로드 실패: {e}")
+        return None
+
+    return {
+        "seq": seq,
+        "duration": duration,
+        "audio_path": assets["audio_path"],
+        "sfx_path": assets["sfx_path"],
+        "kind": kind,
+        "paths": paths,
+        "subtitle": assets["scene"]['narrative'] if cfg["use_subtitles"] else None,
+    }
+
+
+def _print_progress(fraction=None, message=None):
+    if message:
+        print(message)
+
+
+def output_base(cfg, title, manifest_id, output_dir=None):
+    """결과물 경로(확장자 제외): 영상 .mp4, 트레이스 .trace.json/.jsonl, 프로파일 .render.prof가 나란히 생김"""
+    safe_title = "".join([c for c in title if c.isalnum()]).strip() or "output"
+    return os.path.join(output_dir or tempfile.gettempdir(), f"{safe_title}_{manifest_id}_{cfg['render_profile']}")
+
+
+def run_pipeline(cfg, title, scenes, manifest_id, progress=None, log=print, output_dir=None, pool_initializer=None, pool=None, preview=None):
+    """
+    [Headless] 확정된 대본 -> 씬 자산 동시 생성 -> 타임라인 -> 렌더링. Streamlit 없이 실행됩니다.
+    progress(fraction, message): 진행률(0~1, 없으면 None)과 상태 메시지를 받는 콜백
+    pool: 여러 작업이 같이 쓰는 ProviderPool (일괄 실행 시 전역 동시 실행 한도). 없으면 작업마다 새로 만듭니다.
+    preview(seq, path): 씬 하나가 인코딩될 때마다 미리보기 mp4 경로를 받는 콜백 (있을 때만 씬별로 미리 인코딩)
+    cfg["trace"]: 단계별 구간을 기록해 Chrome trace/JSON lines로 저장 (이미 켜진 추적기가 있으면 거기에 기록)
+    cfg["profile_render"]: 렌더링 단계를 cProfile로 기록
+    반환: {"output_path", "backend", "assets_seconds", "render_seconds", "preview_seconds", "scenes", "reused", "anchor_path",
+          "rate_limits", "previews", "trace_paths", "profile_path"}
+    """
+    progress = progress or _print_progress
+    tracer = trace.Tracer(manifest_id) if cfg.get("trace") and not trace.is_active() else None
+    # 미리보기 인코딩과 최종 세그먼트 인코딩이 같은 프로세스 풀을 씀 (미리 인코딩한 세그먼트는 렌더링이 그대로 가져다 씀)
+    with trace.activate(tracer) if tracer else nullcontext(), segment_process_pool() if preview else nullcontext() as encode_pool:
+        with trace.span("job", "job", job=manifest_id, scenes=len(scenes)):
+            result = _run_pipeline(cfg, title, scenes, manifest_id, progress, log, output_dir, pool_initializer, pool, preview, encode_pool)
+    if tracer:
+        result["trace_paths"] = tracer.export(output_base(cfg, title, manifest_id, output_dir))
+        stages = [(name, entry) for name, entry in tracer.summary().items() if name != "job"]
+        slowest = ", ".join(f"{name} {entry['seconds']:.1f}초" for name, entry in stages[:5])
+        progress(None, f"  - 🔬 트레이스 저장: {result['trace_paths']['chrome']} (가장 오래 걸린 단계: {slowest})")
+    return result
+
+
+def _run_pipeline(cfg, title, scenes, manifest_id, progress, log, output_dir, pool_initializer, pool, preview, encode_pool):
+    """run_pipeline 본문 (추적기 설정은 run_pipeline에서)"""
+    result = {"title": title, "output_path": None, "backend": None, "assets_seconds": None, "render_seconds": None,
+              "scenes": 0, "reused": 0, "anchor_path": None, "rate_limits": {}, "previews": {}, "preview_seconds": 0.0,
+              "trace_paths": None, "profile_path": None}
+    shared_pool = pool
+    assets_start = time.time()
+
+    progress(0.0, "🎨 Phase 2: 캐릭터 기준 이미지(Anchor) 생성 중...")
+    # [Step 0] 기준 캐릭터 이미지 생성 (이 이미지가 영상 내내 쓰임)
+    anchor_prompt = build_anchor_prompt(cfg)
+
+    # [Incremental] 씬 지문을 이전 실행 매니페스트와 비교해서, 바뀐 씬만 다시 생성합니다.
+    manifest = JobManifest(manifest_id)
+    fingerprints = {
+        scene['seq']: scene_fingerprint(scene, cfg["voice_name"], cfg["video_style"], cfg["character_desc"], cfg["aspect_ratio"])
+        for scene in scenes
+    }
+    reused_assets = []
+    for scene in scenes:
+        reused = manifest.reusable_assets(scene['seq'], fingerprints[scene['seq']])
+        if reused:
+            reused_assets.append(dict(reused, seq=scene['seq'], scene=scene, notes=[]))
+    reused_seqs = {assets['seq'] for assets in reused_assets}
+    changed_scenes = [scene for scene in scenes if scene['seq'] not in reused_seqs]
+    result["reused"] = len(reused_assets)
+    if reused_assets:
+        progress(None, f"  - ♻️ 변경 없는 씬 {len(reused_assets)}개 재사용, {len(changed_scenes)}개만 새로 생성")
+
+    profile = cfg["render_profile"]
+    backend = cfg["render_backend"]
+    scene_specs = {}
+    preview_futures = []
+
+    # [Fan-out] 앵커 + 모든 씬의 오디오/스톡/Veo/이미지 요청을 한꺼번에 시작하고,
+    # 완료되는 순서대로 씬을 조립(+미리보기 인코딩)한 뒤 seq 순서로 타임라인을 만듭니다.
+    progress(None, f"  - {len(changed_scenes)}개 씬 자산 동시 생성 중...")
+    with nullcontext(shared_pool) if shared_pool else ProviderPool(cfg["provider_limits"], initializer=pool_initializer) as pool, \
+            veo_jobs_for(cfg, pool, log=log) as veo_jobs:
+        # [Veo] 스톡 태그가 없는 씬은 Veo 작업을 지금 전부 제출 (서버에서 동시에 생성, 한 스레드가 폴링)
+        for scene in changed_scenes:
+            visual_prompt = scene['visual_prompt'].strip()
+            if not visual_prompt.upper().startswith("[VIDEO]"):
+                veo_jobs.submit(veo_prompt(cfg, visual_prompt))
+        # 폰트/BGM도 씬 자산과 동시에 받아 둠
+        font_future = pool.submit("stock", get_korean_font)
+        bgm_future = pool.submit("stock", get_bgm_path, cfg["bgm_mood"])
+        # 첫 번째 생성 시에는 레퍼런스가 없으므로 None
+        # (컷 이미지만 앵커를 기다리고, 오디오/스톡/Veo는 바로 시작됨)
+        anchor_future = None
+        if changed_scenes:
+            anchor_future = pool.submit("image", trace.traced("anchor", "stage")(generate_image_google), cfg, anchor_prompt, ref_image_path=None, log=log)
+        # 오디오: 일괄 합성이면 요청 1회 결과를 씬별 Future로 나눠 줌
+        if cfg["use_tts_batch"] and changed_scenes:
+            batch_future = pool.submit("tts", generate_audio_for_scenes, cfg, [scene['narrative'] for scene in changed_scenes], log=log)
+            audio_futures = split_future(batch_future, len(changed_scenes))
+        else:
+            audio_futures = [pool.submit("tts", generate_audio, cfg, scene['narrative'], log=log) for scene in changed_scenes]
+        scene_futures = []
+        for scene, audio_future in zip(changed_scenes, audio_futures):
+            scene_futures.append(pool.submit("scene", fetch_scene_assets, cfg, pool, scene, audio_future, anchor_future, veo_jobs=veo_jobs, log=log))
+
+        korean_font_path = font_future.result()
+        render_settings = make_render_settings(
+            cfg["size"], font_path=korean_font_path, profile=profile,
+            segment_dir=manifest.segment_dir, # 변경 없는 씬 세그먼트 재사용 (프로필이 다르면 키도 다름)
+        )
+        # [Preview] 보여줄 곳(preview 콜백)이 있을 때만 씬이 준비되는 대로 렌더링용 프로세스 풀에서 인코딩합니다.
+        # 씬 세그먼트를 이어붙이는 parallel/moviepy 백엔드는 최종 렌더링과 같은 설정으로 인코딩해 세그먼트를 그대로 재사용하고,
+        # 통째로 다시 인코딩하는 ffmpeg 백엔드는 화면 확인용 draft 미리보기만 만듭니다.
+        reuse_previews = backend in ("parallel", "moviepy")
+        preview_settings = render_settings if reuse_previews else make_render_settings(
+            cfg["size"], font_path=korean_font_path, profile="draft",
+        )
+
+        def on_preview(seq, future):
+            try:
+                path = future.result()
+            except Exception as e:
+                log(f"Scene {seq} 미리보기 인코딩 실패: {e}")
+                return
+            if path:
+                result["previews"][seq] = path
+                if preview:
+                    preview(seq, path)
+
+        def add_scene(assets):
+            spec = assemble_scene(cfg, pool, assets, anchor_future, log=log)
+            if spec is None:
+                return
+            scene_specs[spec['seq']] = spec
+            manifest.record_assets(spec['seq'], fingerprints[spec['seq']], dict(assets, kind=spec["kind"], paths=spec["paths"]))
+            if preview:
+                future = submit_encode(encode_pool, render_scene_preview, spec, preview_settings, manifest.segment_dir)
+                future.add_done_callback(lambda f, seq=spec['seq']: on_preview(seq, f))
+                preview_futures.append(future)
+
+        for assets in reused_assets:
+            add_scene(assets)
+        for done_count, future in enumerate(as_completed(scene_futures), start=1):
+            try:
+                assets = future.result()
+            except Exception as e:
+                log(f"씬 자산 생성 오류: {e}")
+                continue
+            progress(done_count / len(changed_scenes) * 0.5, f"  - Scene {assets['seq']} 자산 준비 완료")
+            for note in assets["notes"]:
+                progress(None, note)
+            add_scene(assets)
+
+        cache_stats = get_default_cache().stats()
+        progress(None, f"  - 💾 자산 캐시: 적중 {cache_stats['hits']} / 미스 {cache_stats['misses']} ({cache_stats['bytes'] / 1e6:.0f}MB 사용 중)")
+        limiters = get_rate_limiters()
+        result["rate_limits"] = limiters.snapshot()
+        if result["rate_limits"]:
+            progress(None, f"  - 🚦 호출 한도: {limiters.summary()}")
+
+        if anchor_future is not None:
+            result["anchor_path"] = anchor_future.result()
+            if not result["anchor_path"]:
+                log("기준 캐릭터 생성 실패. 일관성이 떨어질 수 있습니다.")
+
+        timeline = [scene_specs[seq] for seq in sorted(scene_specs)]
+        manifest.forget_missing(fingerprints)
+        manifest.save()
+        result["assets_seconds"] = time.time() - assets_start
+        render_settings["bgm_path"] = bgm_future.result()
+        if reuse_previews and preview_futures:
+            # 이미 인코딩 중인 세그먼트를 최종 렌더링이 다시 만들지 않도록 끝날 때까지 기다림
+            preview_start = time.time()
+            wait(preview_futures)
+            result["preview_seconds"] = time.time() - preview_start
+        progress(0.6, None)
+
+    # Phase 3: Final Rendering (BGM Mixing 추가)
+    if not timeline:
+        log("생성된 씬이 없습니다. 영상을 만들 수 없습니다.")
+        return result
+
+    progress(None, f"🎬 Phase 3: 영상 합치기 및 BGM 믹싱 중... ({backend}, {profile})")
+    base_path = output_base(cfg, title, manifest_id, output_dir)
+    output_path = base_path + ".mp4"
+
+    render_start = time.time()
+    render_call = [render_timeline, timeline, render_settings, output_path]
+    if cfg.get("profile_render"):
+        result["profile_path"] = base_path + ".render.prof"
+        render_call = [trace.profile_call, result["profile_path"], *render_call]
+    if shared_pool:
+        # 렌더링은 CPU를 다 쓰므로 공유 풀의 'render' 한도만큼만 동시에 진행
+        output_path, used_backend = shared_pool.submit("render", *render_call, backend=backend, log=log, pool=encode_pool).result()
+    else:
+        output_path, used_backend = render_call[0](*render_call[1:], backend=backend, log=log, pool=encode_pool)
+    if result["profile_path"]:
+        progress(None, f"  - 🧪 렌더링 프로파일: {result['profile_path']} (요약: .render.txt)")
+    result.update(output_path=output_path, backend=used_backend, scenes=len(timeline), profile=profile,
+                  render_seconds=time.time() - render_start)
+    progress(1.0, f"  - ⏱️ 렌더링 {result['render_seconds']:.1f}초 ({used_backend}, {len(timeline)}개 씬)")
+    return result
+
+
+def run_job(payload, progress=None, log=print, preview=None):
+    """
+    [Job] 대기열에 저장된 작업 하나를 실행합니다. (job_module 워커가 호출)
+    payload: {"title", "scenes", "manifest_id", "settings"} (+ "secrets": 워커가 메모리로 받은 이 작업의 키)
+    """
+    cfg = make_job_settings(**payload.get("settings", {}), **payload.get("secrets", {}))
+    return run_pipeline(
+        cfg, payload["title"], payload["scenes"], payload["manifest_id"], progress=progress, log=log, preview=preview,
+    )
@@ -0,0 +1,54 @@
+# prefetch_module.py
+import threading
+
+from executor_module import ProviderPool
+
+# 사용자가 대본을 고치는 동안 돌아가는 작업이므로 본 생성보다 한도를 낮게 잡습니다.
+PREFETCH_LIMITS = {"tts": 1, "image": 1, "stock": 2}
+
+
+class Prefetcher:
+    """
+    [Prefetch] 대본이 나오자마자 (앵커, TTS, 스톡 영상) 요청을 미리 시작해 두는 백그라운드 작업 모음.
+    결과를 넘겨주지는 않고 자산 캐시만 채워 둡니다. (생성은 워커 프로세스에서 돌고, 같은 내용이면 캐시에서 바로 가져감)
+    키는 (종류, 입력 내용...) 튜플이라, 생성 버튼을 누를 때 수정된 씬의 작업은 cancel_except로 버려집니다.
+    작업 하나가 키 하나이므로, 여러 씬을 묶은 일괄 요청은 넣지 않습니다. (일부 씬만 취소할 수 없음)
+    """
+
+    def __init__(self, limits=None):
+        self.pool = ProviderPool(limits or PREFETCH_LIMITS)
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key, provider, fn, *args, **kwargs):
+        """같은 키가 이미 있으면 새로 만들지 않고 기존 Future를 돌려줍니다."""
+        with self._lock:
+            future = self._futures.get(key)
+            if future is None:
+                future = self.pool.submit(provider, fn, *args, **kwargs)
+                self._futures[key] = future
+            return future
+
+    def cancel_except(self, keep_keys):
+        """
+        keep_keys에 없는 작업(수정된 씬 등)은 취소합니다.
+        아직 시작 전인 작업만 실제로 취소되며, 이미 실행 중인 작업은 끝까지 돌아 캐시에만 남습니다.
+        """
+        keep_keys = set(keep_keys)
+        with self._lock:
+            dropped = [key for key in self._futures if key not in keep_keys]
+            cancelled = 0
+            for key in dropped:
+                if self._futures.pop(key).cancel():
+                    cancelled += 1
+        return cancelled
+
+    def pending(self):
+        with self._lock:
+            return sum(1 for f in self._futures.values() if not f.done())
+
+    def shutdown(self):
+        """새 기획안이 나오면 이전 작업은 기다리지 않고 버립니다."""
+        with self._lock:
+            self._futures.clear()
+        self.pool.shutdown(wait=False, cancel_futures=True)
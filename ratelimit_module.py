@@ -0,0 +1,275 @@
+# ratelimit_module.py
+import email.utils
+import os
+import random
+import re
+import threading
+import time
+
+import trace_module as trace
+
+# 프로바이더별 기본 한도: 초당 요청(rate), 순간 허용량(burst), 최대 동시 요청(max_concurrency)
+# (환경 변수 RATE_LIMIT_<PROVIDER>="rate,burst,max_concurrency" 로 덮어쓸 수 있습니다. 예: RATE_LIMIT_GEMINI_IMAGE="0.5,2,4")
+# 한도는 API 키 전체 기준입니다. 리미터는 프로세스마다 따로이므로 같은 키를 쓰는 프로세스가 여럿이면
+# RATE_LIMIT_PROCESSES(작업 워커는 start_workers가 워커 수로 설정)로 나눠 씁니다.
+DEFAULT_RATE_LIMITS = {
+    "gemini-text": {"rate": 2.0, "burst": 4, "max_concurrency": 4},
+    "gemini-image": {"rate": 0.5, "burst": 2, "max_concurrency": 4},
+    # Veo는 작업 하나가 씬 수만큼 한꺼번에 제출하므로 burst로 보통 작업(씬 8개)까지는 바로 나가게 하고, 그 뒤로는 10초에 1개
+    "veo": {"rate": 0.1, "burst": 8, "max_concurrency": 2},
+    "tts": {"rate": 5.0, "burst": 10, "max_concurrency": 8},
+    "fal": {"rate": 1.0, "burst": 4, "max_concurrency": 8},
+}
+
+MAX_ATTEMPTS = 5
+BASE_BACKOFF = 1.0  # 첫 재시도 대기 (초), 시도마다 2배
+MAX_BACKOFF = 60.0
+THROTTLE_CODES = {429, 503}
+THROTTLE_WORDS = ("RESOURCE_EXHAUSTED", "UNAVAILABLE", "Too Many Requests", "overloaded")
+GRPC_TO_HTTP = {8: 429, 14: 503} # grpc RESOURCE_EXHAUSTED / UNAVAILABLE
+
+
+class RetryExhausted(Exception):
+    """재시도 한도까지 과부하(429/503)가 계속됐을 때. 마지막 예외를 last_error로 갖습니다."""
+
+    def __init__(self, key, attempts, last_error):
+        super().__init__(f"{key[0]}/{key[1]}: {attempts}번 시도 모두 과부하 ({last_error})")
+        self.last_error = last_error
+
+
+def load_rate_limits(getter=os.getenv, processes=None):
+    """
+    기본값 -> 환경 변수(RATE_LIMIT_<PROVIDER>) 순서로 프로바이더별 한도를 결정하고,
+    processes(기본: RATE_LIMIT_PROCESSES)개 프로세스가 나눠 쓰도록 이 프로세스 몫만 돌려줍니다.
+    """
+    limits = {name: dict(values) for name, values in DEFAULT_RATE_LIMITS.items()}
+    for name, values in limits.items():
+        raw = getter(f"RATE_LIMIT_{name.upper().replace('-', '_')}")
+        if not raw:
+            continue
+        try:
+            rate, burst, concurrency = (raw.split(",") + ["", ""])[:3]
+            rate = float(rate)
+            burst = int(burst or values["burst"])
+            concurrency = int(concurrency or values["max_concurrency"])
+            if rate <= 0 or burst < 1 or concurrency < 1:
+                raise ValueError(raw)
+            values.update(rate=rate, burst=burst, max_concurrency=concurrency)
+        except ValueError:
+            print(f"⚠️ 잘못된 속도 제한 무시: RATE_LIMIT_{name.upper()}={raw}")
+
+    if processes is None:
+        try:
+            processes = int(getter("RATE_LIMIT_PROCESSES") or 1)
+        except ValueError:
+            processes = 1
+    if processes > 1:
+        # 동시 요청/순간 허용량은 최소 1이므로 프로세스 수가 그보다 많으면 그만큼은 넘칠 수 있음 (초당 요청은 정확히 나눔)
+        for values in limits.values():
+            values["rate"] /= processes
+            values["burst"] = max(1, values["burst"] // processes)
+            values["max_concurrency"] = max(1, values["max_concurrency"] // processes)
+    return limits
+
+
+def _status_code(exc):
+    """SDK마다 다른 예외에서 HTTP 상태 코드를 꺼냅니다. (google-genai: code, api_core: code(), requests: response.status_code)"""
+    for attr in ("code", "status_code"):
+        value = getattr(exc, attr, None)
+        if callable(value):
+            try:
+                value = value()
+            except Exception:
+                value = None
+        value = getattr(value, "value", value) # grpc StatusCode enum 등
+        if isinstance(value, tuple): # grpc: (8, 'resource exhausted')
+            value = GRPC_TO_HTTP.get(value[0], value[0])
+        if isinstance(value, int):
+            return value
+    response = getattr(exc, "response", None)
+    return getattr(response, "status_code", None)
+
+
+def _retry_after(exc):
+    """Retry-After 헤더(초 또는 HTTP 날짜)나 Google 오류 본문의 retryDelay("12s")를 초 단위로 돌려줍니다."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("Retry-After") or headers.get("retry-after")
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            parsed = email.utils.parsedate_to_datetime(value)
+            if parsed is not None:
+                return max(0.0, parsed.timestamp() - time.time())
+    match = re.search(r"retry[_ ]?delay['\"]?\s*[:=]\s*['\"]?(\d+(?:\.\d+)?)s", str(exc), re.IGNORECASE)
+    return float(match.group(1)) if match else None
+
+
+def classify_error(exc):
+    """(과부하 여부, Retry-After 초) - 과부하(429/503)만 재시도 대상이고 나머지 오류는 바로 호출자에게 올립니다."""
+    code = _status_code(exc)
+    if code in THROTTLE_CODES:
+        return True, _retry_after(exc)
+    if code is None:
+        text = str(exc)
+        if re.search(r"\b(429|503)\b", text) or any(word in text for word in THROTTLE_WORDS):
+            return True, _retry_after(exc)
+    return False, None
+
+
+class AdaptiveLimiter:
+    """
+    [RateLimit] (프로바이더, 모델) 하나의 호출 한도.
+    - 토큰 버킷: 초당 rate개, 최대 burst개까지 몰아서 허용
+    - AIMD 동시 요청 창: 성공하면 창을 천천히 넓히고(+1/창), 429/503이면 절반으로 줄임
+      (같은 과부하 묶음에 여러 번 줄이지 않도록 한 번 줄인 뒤 cooldown 동안은 유지)
+    - Retry-After를 받으면 이 키의 모든 호출이 그 시간까지 함께 쉼
+    """
+
+    def __init__(self, key, rate, burst, max_concurrency, cooldown=2.0):
+        self.key = key
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.cooldown = cooldown
+        self.window = float(max_concurrency)
+        self.in_flight = 0
+        self.tokens = float(burst)
+        self._last_refill = time.monotonic()
+        self._last_decrease = 0.0
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+        self.metrics = {"calls": 0, "successes": 0, "throttled": 0, "errors": 0,
+                        "wait_seconds": 0.0, "busy_seconds": 0.0, "window_min": float(max_concurrency)}
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def _acquire(self):
+        """동시 요청 창 + 토큰 + 일시 정지(Retry-After)를 모두 만족할 때까지 기다립니다."""
+        start = time.monotonic()
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = 0.0
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif self.in_flight >= max(1, int(self.window)):
+                    wait = None # 다른 호출이 끝나면 notify
+                elif self.tokens < 1:
+                    wait = (1 - self.tokens) / self.rate
+                else:
+                    self.tokens -= 1
+                    self.in_flight += 1
+                    self.metrics["calls"] += 1
+                    self.metrics["wait_seconds"] += now - start
+                    trace.add("limiter_wait_s", now - start)
+                    return
+                self._cond.wait(wait)
+
+    def _release(self, outcome, busy, retry_after=None):
+        """outcome: "ok" | "throttled" | "error" """
+        with self._cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            self.metrics["busy_seconds"] += busy
+            if outcome == "error":
+                self.metrics["errors"] += 1
+            elif outcome == "throttled":
+                self.metrics["throttled"] += 1
+                if now - self._last_decrease > self.cooldown:
+                    self.window = max(1.0, self.window / 2)
+                    self._last_decrease = now
+                    self.metrics["window_min"] = min(self.metrics["window_min"], self.window)
+                if retry_after:
+                    self._paused_until = max(self._paused_until, now + retry_after)
+            else:
+                self.metrics["successes"] += 1
+                self.window = min(self.max_concurrency, self.window + 1.0 / max(1.0, self.window))
+            self._cond.notify_all()
+
+    def call(self, fn, *args, max_attempts=MAX_ATTEMPTS, **kwargs):
+        """
+        fn(*args, **kwargs)를 한도 안에서 호출합니다. 429/503은 지수 백오프(+지터) 후 재시도하고,
+        다른 예외는 그대로 올립니다. 끝까지 과부하면 RetryExhausted.
+        """
+        last_error = None
+        for attempt in range(max_attempts):
+            self._acquire()
+            started = time.monotonic()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                throttled, retry_after = classify_error(e)
+                self._release("throttled" if throttled else "error", time.monotonic() - started, retry_after)
+                if not throttled:
+                    raise
+                last_error = e
+                trace.add("retries")
+                if attempt + 1 < max_attempts:
+                    # Full jitter: 동시에 실패한 호출들이 같은 순간에 다시 몰리지 않게
+                    backoff = random.uniform(0, min(MAX_BACKOFF, BASE_BACKOFF * 2 ** attempt))
+                    delay = max(backoff, retry_after or 0)
+                    print(f"⚠️ {self.key[0]} 과부하 ({_status_code(e) or '429/503'}). {delay:.1f}초 후 재시도... ({attempt + 1}/{max_attempts})")
+                    time.sleep(delay)
+                continue
+            self._release("ok", time.monotonic() - started)
+            return result
+        raise RetryExhausted(self.key, max_attempts, last_error)
+
+    def snapshot(self):
+        with self._cond:
+            data = dict(self.metrics)
+            data.update(window=round(self.window, 2), in_flight=self.in_flight, rate=self.rate)
+        return data
+
+
+class RateLimiterRegistry:
+    """[RateLimit] 프로세스 전체에서 (프로바이더, 모델)별 리미터를 하나씩만 만들어 공유합니다."""
+
+    def __init__(self, limits=None):
+        self.limits = limits or load_rate_limits()
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def get(self, provider, model=None):
+        key = (provider, model or "default")
+        with self._lock:
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                values = self.limits.get(provider) or {"rate": 1.0, "burst": 2, "max_concurrency": 2}
+                limiter = AdaptiveLimiter(key, values["rate"], values["burst"], values["max_concurrency"])
+                self._limiters[key] = limiter
+            return limiter
+
+    def call(self, provider, model, fn, *args, **kwargs):
+        return self.get(provider, model).call(fn, *args, **kwargs)
+
+    def snapshot(self):
+        """{"provider/model": 지표 dict} - 진행 로그/벤치마크 결과에 그대로 넣을 수 있음"""
+        with self._lock:
+            limiters = list(self._limiters.values())
+        return {f"{l.key[0]}/{l.key[1]}": l.snapshot() for l in limiters}
+
+    def summary(self):
+        """한 줄 요약 (예: gemini-image/...: 12회, 과부하 3, 창 2.5)"""
+        parts = []
+        for name, data in self.snapshot().items():
+            parts.append(f"{name}: {data['successes']}/{data['calls']}회, 과부하 {data['throttled']}, 창 {data['window']}")
+        return " | ".join(parts)
+
+
+_default_registry = None
+_default_lock = threading.Lock()
+
+
+def get_rate_limiters():
+    """프로세스 전역 리미터 레지스트리"""
+    global _default_registry
+    with _default_lock:
+        if _default_registry is None:
+            _default_registry = RateLimiterRegistry()
+        return _default_registry
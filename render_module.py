@@ -0,0 +1,499 @@
+# render_module.py
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import subprocess
+import tempfile
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
+
+import PIL.Image
+
+import trace_module as trace
+from audio_module import SAMPLE_RATE, mix_soundtrack, scene_audio_array
+from motion_module import apply_ken_burns
+from subtitle_module import build_overlay
+
+# Pillow 패치 (MoviePy 1.x resize 호환성). MoviePy는 실제로 조립하는 함수 안에서만 불러옵니다. (UI 프로세스는 로드하지 않음)
+if not hasattr(PIL.Image, 'ANTIALIAS'):
+    PIL.Image.ANTIALIAS = PIL.Image.LANCZOS
+
+# 렌더링 기본값 (두 백엔드가 같은 값을 사용)
+RENDER_DEFAULTS = {
+    "fps": 24,
+    "codec": "libx264",
+    "audio_codec": "aac",
+    "preset": "ultrafast",
+    "fade_in": 0.5,        # 씬 시작 페이드 인 (초)
+    "sfx_volume": 0.6,     # 효과음 볼륨
+    "bgm_volume": 0.15,    # 배경음악 15% (은은하게)
+    "bgm_fadeout": 2,      # 끝날 때 2초간 서서히 작아짐
+    "duck_gain": 0.45,     # 내레이션이 나오는 동안 BGM 배율 (1.0이면 덕킹 끔)
+    "duck_threshold": 0.02, # 내레이션으로 보는 크기 (RMS, 약 -34dBFS)
+    "duck_attack": 0.05,   # BGM이 줄어드는 시간 (초)
+    "duck_release": 0.4,   # 말이 끝난 뒤 BGM이 돌아오기까지 (초)
+    "caption_lines": 2,    # 자막을 한 번에 보여줄 최대 줄 수 (넘치면 나눠서 차례로, 0이면 한 번에 전부)
+}
+
+RENDER_BACKENDS = ["moviepy", "ffmpeg", "parallel"]
+
+# 렌더링 프로필: 출력 해상도(짧은 변 px, None이면 원본), fps, 인코더 프리셋/화질(crf), 모션 여부
+# draft는 컷/호흡 확인용 미리보기라 모든 단계(스케일, 모션, 자막)를 작은 해상도에서 처리합니다.
+RENDER_PROFILES = {
+    "draft": {"short_side": 360, "fps": 12, "preset": "ultrafast", "crf": 30, "motion": False},
+    "final": {"short_side": None, "fps": 24, "preset": "ultrafast", "crf": 23, "motion": True},
+}
+BASE_SHORT_SIDE = 720 # 자막 크기 등 픽셀 값의 기준 해상도 (1280x720 / 720x1280)
+
+
+def profile_size(size, short_side=None):
+    """짧은 변이 short_side가 되도록 비율을 유지해 줄입니다. (코덱 요구사항에 맞춰 짝수로)"""
+    w, h = size
+    if not short_side or short_side >= min(w, h):
+        return (w, h)
+    scale = short_side / min(w, h)
+    return (int(round(w * scale / 2)) * 2, int(round(h * scale / 2)) * 2)
+
+
+def make_render_settings(size, font_path=None, bgm_path=None, profile="final", **overrides):
+    """
+    렌더링 설정 dict. 타임라인(씬 목록)과 함께 어느 백엔드에든 그대로 넘길 수 있습니다.
+    profile: RENDER_PROFILES 이름 (draft / final)
+    """
+    values = dict(RENDER_PROFILES.get(profile) or RENDER_PROFILES["final"])
+    settings = dict(RENDER_DEFAULTS)
+    settings.update({
+        "profile": profile, "size": profile_size(size, values.pop("short_side")),
+        "font_path": font_path, "bgm_path": bgm_path,
+    })
+    settings.update(values)
+    settings.update(overrides)
+    return settings
+
+
+def subtitle_style(size):
+    """
+    [Ratio Aware] 세로(쇼츠)면 폰트를 키우고, 줄바꿈을 자주 하고, 바닥에서 더 띄웁니다. (댓글창 가림 방지)
+    픽셀 값은 720 기준이라 draft 같은 작은 해상도에서는 같은 비율로 줄입니다.
+    """
+    w, h = size
+    is_portrait = h > w
+    scale = min(w, h) / BASE_SHORT_SIDE
+    return {
+        "font_size": max(10, round((50 if is_portrait else 40) * scale)),
+        "wrap_width": 20 if is_portrait else 35,
+        "margin_bottom": round((250 if is_portrait else 100) * scale),
+        "stroke_width": max(1, round(3 * scale)),
+    }
+
+
+def scene_audio_duration(audio_path, sfx_path=None):
+    """씬 길이 = 내레이션과 효과음 중 긴 쪽"""
+    from moviepy.editor import AudioFileClip
+    durations = []
+    for path in (audio_path, sfx_path):
+        if path and os.path.exists(path):
+            try:
+                clip = AudioFileClip(path)
+                durations.append(clip.duration)
+                clip.close()
+            except Exception:
+                if path == audio_path:
+                    raise
+    return max(durations)
+
+
+def probe_video(path):
+    """영상 파일을 열 수 있는지 확인합니다. (Veo/스톡 -> 이미지 백업 판단용)"""
+    from moviepy.editor import VideoFileClip
+    try:
+        clip = VideoFileClip(path)
+        ok = clip.duration > 0
+        clip.close()
+        return ok
+    except Exception:
+        return False
+
+
+# --- MoviePy 백엔드 ---
+def resize_and_crop(clip, target_w, target_h):
+    """
+    비율 유지하며 꽉 차게 리사이즈한 뒤 중앙 크롭합니다.
+    """
+    clip_ratio = clip.w / clip.h
+    target_ratio = target_w / target_h
+
+    if clip_ratio > target_ratio: # 영상이 더 납작함 -> 높이 기준 리사이즈
+        clip = clip.resize(height=target_h)
+    else: # 영상이 더 길쭉함 -> 너비 기준 리사이즈
+        clip = clip.resize(width=target_w)
+
+    # 중앙 크롭
+    return clip.crop(width=target_w, height=target_h, x_center=clip.w/2, y_center=clip.h/2)
+
+
+def apply_random_motion(clip, size, seed=None, fps=24):
+    """
+    [Motion] 줌인, 줌아웃, 좌우/상하 패닝 중 하나를 적용합니다. (seed가 같으면 같은 효과)
+    """
+    moving_clip = apply_ken_burns(clip, size, seed=seed, fps=fps)
+    if moving_clip is None: # OpenCV 미설치 시 정지 화면
+        return resize_and_crop(clip, *size)
+    return moving_clip
+
+
+def _opened(sources, clip):
+    """원본 파일을 여는 클립(ffmpeg 리더 프로세스 보유)을 닫을 목록에 등록합니다."""
+    if sources is not None:
+        sources.append(clip)
+    return clip
+
+
+def load_video_clip(filepath, duration, size, sources=None):
+    """
+    [Ratio Aware] 스톡/Veo 영상을 길이에 맞추고(Loop or Cut) 화면 꽉 차게 크롭합니다.
+    """
+    from moviepy.editor import VideoFileClip, concatenate_videoclips
+    # 소리가 있을 수 있으므로 제거 (TTS 사용 위해)
+    clip = _opened(sources, VideoFileClip(filepath)).without_audio()
+
+    if clip.duration < duration:
+        loop_count = int(duration // clip.duration) + 2
+        clip = concatenate_videoclips([clip] * loop_count)
+
+    clip = clip.subclip(0, duration)
+    return resize_and_crop(clip, *size)
+
+
+def build_image_clip(image_paths, duration, size, fps=24, motion=True, sources=None):
+    """
+    [Assemble] 컷 이미지들을 씬 길이에 맞춰 나누고 모션을 적용해 이어붙입니다. (motion=False면 정지 화면)
+    """
+    if not image_paths: return None
+    from moviepy.editor import ImageClip, concatenate_videoclips
+    clip_duration = duration / len(image_paths)
+    scene_sub_clips = []
+    for img_path in image_paths:
+        try:
+            # [핵심] 원본 이미지에서 바로 화면 크기로 (크롭 + 모션을 한 번에)
+            # 같은 이미지는 항상 같은 모션이 나오도록 파일명(캐시 키)을 시드로 사용
+            # (여기서는 이동 경로만 계산하고, 프레임별 비용은 encode 구간의 motion_s로 기록됨)
+            with trace.span("motion", "render", motion=motion):
+                sub_clip = _opened(sources, ImageClip(img_path)).set_duration(clip_duration)
+                if motion:
+                    sub_clip = apply_random_motion(sub_clip, size, seed=os.path.basename(img_path), fps=fps)
+                else:
+                    sub_clip = resize_and_crop(sub_clip, *size)
+            scene_sub_clips.append(sub_clip)
+        except Exception as e:
+            print(f"컷 이미지 처리 오류: {e}")
+    if not scene_sub_clips: return None
+    return concatenate_videoclips(scene_sub_clips, method="compose")
+
+
+def add_subtitle_overlay(clip, text, size, font_path, max_lines=0):
+    """
+    [Ratio Aware] 글자 영역만 미리 그려두고 매 프레임 그 영역만 섞습니다. (전체 화면 합성 X)
+    긴 내레이션은 max_lines줄씩 나눠 씬 길이 안에서 차례로 보여줍니다.
+    """
+    try:
+        with trace.span("subtitle", "render"):
+            overlay = build_overlay(text, size, font_path, **subtitle_style(size), duration=clip.duration, max_lines=max_lines)
+        return overlay.apply(clip)
+    except Exception as e:
+        print(f"자막 생성 오류: {e}")
+        return clip
+
+
+def build_scene_clip(spec, settings, sources=None):
+    """
+    [Assemble] 타임라인의 씬 하나를 MoviePy 클립으로 조립합니다. (오디오 + 자막 + 트랜지션)
+    sources에 연 원본 클립을 모아 두므로 다 쓰면 닫아야 합니다. (scene_clip 사용)
+    """
+    from moviepy.audio.AudioClip import AudioArrayClip
+    size = settings["size"]
+    duration = spec["duration"]
+
+    # 1. 오디오 + 효과음: 한 번 디코딩해 PCM 배열로 믹싱 (인코딩 중에는 배열을 잘라 쓰기만 함)
+    audio_clip = AudioArrayClip(scene_audio_array(spec, settings), fps=SAMPLE_RATE)
+
+    # 2. 시각 자산 (스톡 / Veo / 이미지 컷)
+    if spec["kind"] in ("stock", "veo"):
+        clip = load_video_clip(spec["paths"][0], duration, size, sources=sources)
+    else:
+        clip = build_image_clip(spec["paths"], duration, size, fps=settings["fps"], motion=settings.get("motion", True), sources=sources)
+    if clip is None:
+        return None
+
+    clip = clip.set_audio(audio_clip)
+    if spec.get("subtitle"):
+        clip = add_subtitle_overlay(clip, spec["subtitle"], size, settings.get("font_path"), settings.get("caption_lines", 0))
+    return clip.fadein(settings["fade_in"])
+
+
+@contextmanager
+def scene_clip(spec, settings):
+    """
+    [Lifecycle] 씬 하나의 원본(오디오/영상/이미지)을 열어 클립을 만들고, 블록이 끝나면 전부 닫습니다.
+    합성 클립의 close()는 안쪽 리더를 닫지 않으므로 연 클립을 직접 모아서 닫습니다.
+    """
+    sources = []
+    try:
+        yield build_scene_clip(spec, settings, sources)
+    finally:
+        for source in sources:
+            try:
+                source.close()
+            except Exception:
+                pass
+
+
+def render_moviepy(timeline, settings, output_path, log=print):
+    """
+    [Backend: moviepy] 씬을 하나씩 열어 파이썬에서 프레임 합성 -> 세그먼트 인코딩 -> 닫기를 반복합니다.
+    한 번에 한 씬의 원본만 열려 있으므로 씬이 50개를 넘어도 메모리/파일 핸들이 늘지 않습니다.
+    세그먼트는 스트림 복사로 이어붙이고 사운드트랙은 마지막 오디오 패스에서 한 번에 믹싱합니다.
+    """
+    specs = [frame_aligned(spec, settings["fps"]) for spec in timeline]
+    with tempfile.TemporaryDirectory(prefix="segments_") as workdir:
+        segment_dir = settings.get("segment_dir") or workdir
+        segments = []
+        for spec in specs:
+            path = segment_file(spec, settings, segment_dir)
+            try:
+                if os.path.exists(path) or render_scene_segment(spec, settings, path):
+                    segments.append((spec, path))
+            except Exception as e:
+                log(f"Scene {spec['seq']} 합성 실패: {e}")
+        if not segments:
+            raise RuntimeError("합성된 씬이 없습니다.")
+        return join_segments(segments, output_path, settings, workdir)
+
+
+# --- 씬 병렬 백엔드 (씬별 세그먼트 -> concat 스트림 복사 -> BGM 오디오 패스) ---
+# 세그먼트 결과에 영향을 주는 렌더링 설정
+SEGMENT_SETTING_KEYS = ("size", "fps", "codec", "preset", "crf", "motion", "fade_in", "sfx_volume", "font_path", "caption_lines")
+
+
+def segment_key(spec, settings):
+    """
+    [Incremental] 씬 내용(자산 경로는 캐시 해시라 내용과 같음, 길이, 자막) + 렌더링 설정의 해시.
+    키가 같으면 이전에 인코딩한 세그먼트를 그대로 씁니다.
+    """
+    payload = {
+        "scene": {k: spec.get(k) for k in ("duration", "audio_path", "sfx_path", "kind", "paths", "subtitle")},
+        "settings": {k: settings.get(k) for k in SEGMENT_SETTING_KEYS},
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def frame_aligned(spec, fps):
+    """세그먼트 경계에서 영상/오디오 길이가 어긋나지 않도록 씬 길이를 프레임 단위로 맞춤"""
+    return dict(spec, duration=math.ceil(spec["duration"] * fps) / fps)
+
+
+def segment_file(spec, settings, segment_dir):
+    return os.path.join(segment_dir, f"seg_{segment_key(spec, settings)}.mkv")
+
+
+def render_scene_segment(spec, settings, segment_path):
+    """
+    [Worker] 씬 하나를 중간 세그먼트(.mkv)로 인코딩합니다. 프로세스 풀에서 실행됩니다.
+    모든 세그먼트가 같은 코덱 파라미터를 쓰므로 나중에 재인코딩 없이 이어붙일 수 있습니다.
+    오디오는 무손실 PCM으로 두고 마지막 패스에서 한 번만 AAC로 인코딩합니다.
+    """
+    with trace.span("encode", "render", scene=spec["seq"]), scene_clip(spec, settings) as clip:
+        if clip is None:
+            return None
+        # 임시 이름으로 인코딩 후 rename (중간에 끊긴 세그먼트를 재사용하지 않도록)
+        # 같은 세그먼트를 동시에 만들어도(미리보기와 최종 렌더링 등) 서로의 임시 파일을 건드리지 않도록 매번 고유한 이름
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(segment_path) or ".", suffix=".part.mkv")
+        os.close(fd)
+        try:
+            clip.write_videofile(
+                tmp_path, fps=settings["fps"], codec=settings["codec"], preset=settings["preset"],
+                audio_codec="pcm_s16le", audio_fps=44100, threads=settings.get("segment_threads", 1),
+                ffmpeg_params=["-pix_fmt", "yuv420p", "-crf", str(settings["crf"])], logger=None,
+            )
+            os.replace(tmp_path, segment_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        trace.add("bytes", os.path.getsize(segment_path))
+    return segment_path
+
+
+def render_scene_preview(spec, settings, segment_dir):
+    """
+    [Preview] 씬 하나가 준비되는 즉시 세그먼트로 인코딩하고, 브라우저에서 재생되는 mp4(AAC)로 리먹스합니다.
+    세그먼트는 render_parallel과 같은 키/경로를 쓰므로 설정(프로필)이 같으면 최종 렌더링이 다시 인코딩하지 않고 가져다 씁니다.
+    반환: 미리보기 mp4 경로 (실패 시 None)
+    """
+    from ffmpeg_module import get_ffmpeg_binary
+
+    spec = frame_aligned(spec, settings["fps"])
+    segment_path = segment_file(spec, settings, segment_dir)
+    preview_path = segment_path[:-len(".mkv")] + "_preview.mp4"
+    with trace.span("preview", "render", scene=spec["seq"]) as span:
+        if os.path.exists(preview_path):
+            span.set(cache="hit")
+            return preview_path
+        if not os.path.exists(segment_path) and not render_scene_segment(spec, settings, segment_path):
+            return None
+        # 영상은 복사, 오디오(PCM)만 AAC로 - 씬 길이와 상관없이 거의 즉시 끝남
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(preview_path) or ".", suffix=".part.mp4")
+        os.close(fd)
+        cmd = [
+            get_ffmpeg_binary(), "-y", "-hide_banner", "-loglevel", "error", "-i", segment_path,
+            "-c:v", "copy", "-c:a", settings["audio_codec"], "-movflags", "+faststart", tmp_path,
+        ]
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True)
+            if result.returncode != 0:
+                raise RuntimeError(f"미리보기 변환 실패: {result.stderr[-1000:]}")
+            os.replace(tmp_path, preview_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    return preview_path
+
+
+def concat_segments(segment_paths, output_path, workdir):
+    """ffmpeg concat demuxer로 세그먼트를 스트림 복사(-c copy)해서 이어붙입니다."""
+    from ffmpeg_module import get_ffmpeg_binary
+
+    list_path = os.path.join(workdir, "segments.txt")
+    with open(list_path, "w", encoding="utf-8") as f:
+        for path in segment_paths:
+            f.write("file '{}'\n".format(path.replace("'", "'\\''")))
+    cmd = [
+        get_ffmpeg_binary(), "-y", "-hide_banner", "-loglevel", "error",
+        "-f", "concat", "-safe", "0", "-i", list_path, "-c", "copy", output_path,
+    ]
+    with trace.span("concat", "render", segments=len(segment_paths)):
+        result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"세그먼트 이어붙이기 실패: {result.stderr[-1000:]}")
+    return output_path
+
+
+def finalize_audio(joined_path, output_path, settings, timeline, workdir):
+    """
+    [Audio Pass] 사운드트랙(내레이션 + 효과음 + BGM 반복/볼륨/덕킹/페이드 아웃)을 NumPy로 한 번에 믹싱한 WAV를 만들고,
+    영상은 복사만 한 채 그 WAV를 AAC로 인코딩해 먹싱합니다.
+    """
+    from ffmpeg_module import get_ffmpeg_binary
+
+    soundtrack_path = mix_soundtrack(timeline, settings, os.path.join(workdir, "soundtrack.wav"))
+    cmd = [
+        get_ffmpeg_binary(), "-y", "-hide_banner", "-loglevel", "error", "-i", joined_path, "-i", soundtrack_path,
+        "-map", "0:v", "-map", "1:a", "-c:v", "copy", "-c:a", settings["audio_codec"], "-movflags", "+faststart", output_path,
+    ]
+    with trace.span("mux", "render"):
+        result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"오디오 패스 실패: {result.stderr[-1000:]}")
+    return output_path
+
+
+def join_segments(segments, output_path, settings, workdir):
+    """[(spec, 세그먼트 경로)]를 스트림 복사로 이어붙이고 오디오 패스(사운드트랙 믹싱 + AAC)로 마무리합니다."""
+    joined_path = os.path.join(workdir, "joined.mkv")
+    concat_segments([path for _, path in segments], joined_path, workdir)
+    return finalize_audio(joined_path, output_path, settings, [spec for spec, _ in segments], workdir)
+
+
+def segment_process_pool(workers=None):
+    """[Worker] 세그먼트 인코딩용 프로세스 풀 (코어 수만큼)"""
+    ctx = multiprocessing.get_context("spawn") # 스레드가 많은 Streamlit 프로세스에서 fork 회피
+    return ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1, mp_context=ctx)
+
+
+def submit_encode(pool, fn, *args):
+    """
+    [Worker] 인코딩 작업을 프로세스 풀에 넣고 결과 Future를 돌려줍니다.
+    추적 중이면 워커 프로세스의 구간도 받아 같은 타임라인에 합칩니다.
+    """
+    if not trace.is_active():
+        return pool.submit(fn, *args)
+    tracer = trace.get_tracer()
+    future = Future()
+
+    def unwrap(done):
+        try:
+            result, spans = done.result()
+        except Exception as e:
+            future.set_exception(e)
+            return
+        tracer.extend(spans)
+        future.set_result(result)
+
+    pool.submit(trace.run_traced, fn, *args).add_done_callback(unwrap)
+    return future
+
+
+def render_parallel(timeline, settings, output_path, workers=None, log=print, pool=None):
+    """
+    [Backend: parallel] 씬마다 별도 프로세스에서 세그먼트를 인코딩한 뒤 스트림 복사로 합칩니다.
+    코어 수만큼 씬을 동시에 인코딩하므로 씬이 많을수록 빨라집니다.
+    settings["segment_dir"]가 있으면 세그먼트를 그곳에 보관하고, 내용이 같은 씬(이전 실행, 씬별 미리보기)은 다시 인코딩하지 않습니다.
+    pool: 씬별 미리보기를 인코딩한 프로세스 풀 (없으면 이번 렌더링용 풀을 만들고 끝나면 닫음)
+    """
+    specs = [frame_aligned(spec, settings["fps"]) for spec in timeline]
+    workers = workers or settings.get("workers") or os.cpu_count() or 1
+
+    with tempfile.TemporaryDirectory(prefix="segments_") as workdir:
+        segment_dir = settings.get("segment_dir") or workdir
+        paths = [segment_file(spec, settings, segment_dir) for spec in specs]
+        reused = sum(1 for path in paths if os.path.exists(path))
+        if reused:
+            log(f"♻️ 변경 없는 씬 {reused}개는 이전 세그먼트를 재사용합니다.")
+        # 내용이 같은 씬(같은 세그먼트 경로)은 한 번만 인코딩하고 결과를 함께 씀
+        todo = {}
+        for spec, path in zip(specs, paths):
+            if not os.path.exists(path):
+                todo.setdefault(path, spec)
+        todo = [(spec, path) for path, spec in todo.items()]
+
+        failed = set()
+        if todo:
+            with nullcontext(pool) if pool else segment_process_pool(min(workers, len(todo))) as encode_pool:
+                futures = [(spec, path, submit_encode(encode_pool, render_scene_segment, spec, settings, path)) for spec, path in todo]
+                for spec, path, future in futures:
+                    try:
+                        if not future.result():
+                            failed.add(path)
+                    except Exception as e:
+                        log(f"Scene {spec['seq']} 세그먼트 인코딩 실패: {e}")
+                        failed.add(path)
+
+        segments = [(spec, path) for spec, path in zip(specs, paths) if path not in failed]
+        if not segments:
+            raise RuntimeError("인코딩된 세그먼트가 없습니다.")
+        return join_segments(segments, output_path, settings, workdir)
+
+
+def render_timeline(timeline, settings, output_path, backend="moviepy", log=print, pool=None):
+    """
+    선택한 백엔드로 렌더링합니다. ffmpeg 백엔드가 실패하면 MoviePy로 다시 렌더링합니다.
+    실제로 사용된 백엔드 이름을 함께 돌려줍니다.
+    pool: parallel 백엔드가 세그먼트 인코딩에 쓸 프로세스 풀 (segment_process_pool)
+    """
+    if backend == "ffmpeg":
+        from ffmpeg_module import render_ffmpeg
+        try:
+            with trace.span("render", "render", backend="ffmpeg", scenes=len(timeline)):
+                return render_ffmpeg(timeline, settings, output_path), "ffmpeg"
+        except Exception as e:
+            log(f"ffmpeg 렌더링 실패 -> MoviePy로 재시도합니다: {e}")
+    elif backend == "parallel":
+        try:
+            with trace.span("render", "render", backend="parallel", scenes=len(timeline)):
+                return render_parallel(timeline, settings, output_path, log=log, pool=pool), "parallel"
+        except Exception as e:
+            log(f"병렬 렌더링 실패 -> MoviePy로 재시도합니다: {e}")
+    with trace.span("render", "render", backend="moviepy", scenes=len(timeline)):
+        return render_moviepy(timeline, settings, output_path, log=log), "moviepy"
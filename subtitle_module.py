@@ -0,0 +1,231 @@
+# subtitle_module.py
+import textwrap
+import threading
+import time
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+import trace_module as trace
+
+LINE_SPACING = 4 # 줄 사이 간격 (Pillow multiline_text 기본값과 같음)
+_font_lock = threading.Lock() # FreeType 글꼴 객체는 스레드끼리 공유하면 안전하지 않음
+
+
+@lru_cache(maxsize=32)
+def load_font(font_path, font_size):
+    """(경로, 크기)마다 한 번만 TTF를 읽습니다."""
+    try:
+        if font_path:
+            return ImageFont.truetype(font_path, font_size)
+    except Exception:
+        pass
+    return ImageFont.load_default()
+
+
+@lru_cache(maxsize=1024)
+def wrap_lines(text, wrap_width):
+    return tuple(textwrap.wrap(text, width=wrap_width)) or ("",)
+
+
+def caption_chunks(text, wrap_width, max_lines=0):
+    """
+    [Caption] 줄바꿈한 자막을 max_lines줄씩 묶습니다. (0이면 나누지 않음)
+    반환: [(줄 tuple, 글자 수)] - 글자 수는 화면에 머무는 시간 배분용
+    """
+    lines = wrap_lines(text, wrap_width)
+    step = max_lines if max_lines and max_lines > 0 else len(lines)
+    chunks = [lines[i:i + step] for i in range(0, len(lines), step)]
+    return [(chunk, max(1, sum(len(line.replace(" ", "")) for line in chunk))) for chunk in chunks]
+
+
+def timed_chunks(text, duration, wrap_width, max_lines=0):
+    """
+    [Caption] 씬 길이를 글자 수 비율로 나눠 자막 묶음마다 (시작, 끝, 줄 tuple)을 돌려줍니다.
+    내레이션 속도가 대체로 일정하므로 글자 수에 비례해 보여주면 말과 거의 맞습니다.
+    """
+    chunks = caption_chunks(text, wrap_width, max_lines)
+    total = sum(weight for _, weight in chunks)
+    timed, start = [], 0.0
+    for i, (lines, weight) in enumerate(chunks):
+        end = duration if i == len(chunks) - 1 else start + duration * weight / total
+        timed.append((start, end, lines))
+        start = end
+    return timed
+
+
+@lru_cache(maxsize=2048)
+def render_line_image(line, font_path, font_size, stroke_width=3):
+    """
+    [Sprite] 자막 한 줄(테두리 포함)을 RGBA 이미지로 그립니다. 높이는 글꼴 기준으로 고정이라 줄을 그대로 쌓을 수 있습니다.
+    같은 줄(반복되는 문구, 묶음끼리 겹치는 줄)은 다시 그리지 않습니다.
+    """
+    font = load_font(font_path, font_size)
+    with _font_lock:
+        left, _, right, bottom = font.getbbox(line or " ", stroke_width=stroke_width)
+        if hasattr(font, "getmetrics"):
+            ascent, descent = font.getmetrics()
+            height = ascent + descent + 2 * stroke_width
+        else: # 비트맵 기본 글꼴
+            height = bottom + stroke_width
+        image = Image.new('RGBA', (max(1, right - left), height), (255, 255, 255, 0))
+        ImageDraw.Draw(image).text(
+            (-left, stroke_width), line, font=font, fill="white",
+            stroke_width=stroke_width, stroke_fill="black",
+        )
+    return image
+
+
+@lru_cache(maxsize=512)
+def render_sprite_image(lines, font_path, font_size, stroke_width=3):
+    """
+    [Sprite] 줄 이미지들을 가운데 정렬로 쌓아 자막 글자 영역만 딱 맞는 RGBA 이미지를 만듭니다.
+    lines: 줄 tuple (wrap_lines / caption_chunks 결과)
+    """
+    images = [render_line_image(line, font_path, font_size, stroke_width) for line in lines]
+    width = max(image.width for image in images)
+    height = sum(image.height for image in images) + LINE_SPACING * (len(images) - 1)
+    sprite = Image.new('RGBA', (width, height), (255, 255, 255, 0))
+    y = 0
+    for image in images:
+        sprite.paste(image, ((width - image.width) // 2, y))
+        y += image.height + LINE_SPACING
+    return sprite
+
+
+@lru_cache(maxsize=512)
+def render_text_sprite(lines, font_path, font_size, stroke_width=3):
+    """
+    [Sprite] 스프라이트를 (RGB, 1-알파) 배열로 돌려줍니다.
+    알파는 미리 곱해 둔 형태(premultiplied)이므로 프레임마다 곱셈 한 번만 하면 됩니다. (캐시된 배열이므로 읽기 전용)
+    """
+    rgba = np.asarray(render_sprite_image(lines, font_path, font_size, stroke_width), dtype=np.float32)
+    alpha = rgba[:, :, 3:4] / 255.0
+    premultiplied = rgba[:, :, :3] * alpha
+    premultiplied.flags.writeable = False
+    inv_alpha = 1.0 - alpha
+    inv_alpha.flags.writeable = False
+    return premultiplied, inv_alpha
+
+
+def sprite_position(sprite_size, frame_size, margin_bottom):
+    """가운데 정렬 + 하단 여백 위치 (x, y)"""
+    sprite_w, sprite_h = sprite_size
+    w, h = frame_size
+    return (w - sprite_w) / 2, h - sprite_h - margin_bottom
+
+
+def is_static_clip(clip):
+    """정지 화면(ImageClip)은 매 프레임 같은 배열을 돌려주므로 그 배열에 바로 쓰면 안 됩니다."""
+    return not hasattr(clip, "reader") and getattr(clip, "img", None) is not None
+
+
+class SubtitleOverlay:
+    """
+    [Overlay] 미리 그린 자막 스프라이트를 프레임의 해당 영역에만 섞습니다.
+    전체 화면 RGBA 합성(CompositeVideoClip) 대신 글자 박스 크기만큼만 연산합니다.
+    """
+
+    def __init__(self, premultiplied, inv_alpha, x, y):
+        self.premultiplied = premultiplied
+        self.inv_alpha = inv_alpha
+        self.x = int(x)
+        self.y = int(y)
+
+    @property
+    def size(self):
+        return self.premultiplied.shape[1], self.premultiplied.shape[0]
+
+    def blend(self, frame, in_place=False):
+        """in_place: 프레임마다 새로 만든 배열(warpAffine/합성 결과)이면 복사하지 않고 그 자리에 씁니다."""
+        started = time.perf_counter()
+        out = self._blend(frame, in_place)
+        trace.add("subtitle_s", time.perf_counter() - started) # 인코딩 구간에 프레임별 자막 합성 비용 누적
+        return out
+
+    def _blend(self, frame, in_place):
+        h, w = frame.shape[:2]
+        sw, sh = self.size
+        # 화면 밖으로 나가는 부분은 잘라냄
+        x0, y0 = max(0, self.x), max(0, self.y)
+        x1, y1 = min(w, self.x + sw), min(h, self.y + sh)
+        if x0 >= x1 or y0 >= y1:
+            return frame
+        sx0, sy0 = x0 - self.x, y0 - self.y
+        sx1, sy1 = sx0 + (x1 - x0), sy0 + (y1 - y0)
+
+        # 공유 프레임(정지 화면)이나 읽기 전용 프레임(디코더)만 복사하고, 나머지는 글자 영역만 그 자리에서 덮어씀
+        out = frame if in_place and frame.flags.writeable else np.array(frame, copy=True)
+        region = out[y0:y1, x0:x1, :3].astype(np.float32)
+        region *= self.inv_alpha[sy0:sy1, sx0:sx1]
+        region += self.premultiplied[sy0:sy1, sx0:sx1]
+        out[y0:y1, x0:x1, :3] = region.astype(np.uint8)
+        return out
+
+    def apply(self, clip):
+        in_place = not is_static_clip(clip)
+        return clip.fl_image(lambda frame: self.blend(frame, in_place))
+
+
+class TimedSubtitle:
+    """
+    [Overlay] 자막 묶음마다 (시작, 끝, SubtitleOverlay)를 두고 프레임 시각에 맞는 것만 섞습니다.
+    """
+
+    def __init__(self, cues):
+        self.cues = cues
+
+    def overlay_at(self, t):
+        for start, end, overlay in self.cues:
+            if start <= t < end:
+                return overlay
+        return self.cues[-1][2] # 마지막 프레임(t == 씬 길이)은 마지막 묶음
+
+    def apply(self, clip):
+        if len(self.cues) == 1: # 묶음이 하나면 시각 확인 없이 전 구간
+            return self.cues[0][2].apply(clip)
+
+        in_place = not is_static_clip(clip)
+
+        def blend_at(get_frame, t):
+            return self.overlay_at(t).blend(get_frame(t), in_place)
+
+        return clip.fl(blend_at, apply_to=[])
+
+
+def caption_cues(text, frame_size, font_path, font_size, wrap_width, margin_bottom, stroke_width=3, duration=None, max_lines=0):
+    """[(시작, 끝, 줄 tuple, x, y)] - duration이 없으면 나누지 않고 씬 전체(끝 = inf)"""
+    if duration is None:
+        duration, max_lines = float("inf"), 0
+    cues = []
+    for start, end, lines in timed_chunks(text, duration, wrap_width, max_lines):
+        sprite = render_sprite_image(lines, font_path, font_size, stroke_width)
+        x, y = sprite_position(sprite.size, frame_size, margin_bottom)
+        cues.append((start, end, lines, int(x), int(y)))
+    return cues
+
+
+def build_overlay(text, frame_size, font_path, font_size, wrap_width, margin_bottom, stroke_width=3, duration=None, max_lines=0):
+    """
+    화면 크기 기준 가운데 정렬 + 하단 여백 위치에 놓인 자막 오버레이를 만듭니다.
+    duration과 max_lines를 주면 긴 내레이션을 max_lines줄씩 나눠 시간 순서로 보여줍니다.
+    """
+    cues = []
+    for start, end, lines, x, y in caption_cues(text, frame_size, font_path, font_size, wrap_width, margin_bottom, stroke_width, duration, max_lines):
+        premultiplied, inv_alpha = render_text_sprite(lines, font_path, font_size, stroke_width)
+        cues.append((start, end, SubtitleOverlay(premultiplied, inv_alpha, x, y)))
+    return TimedSubtitle(cues)
+
+
+def save_caption_sprites(text, frame_size, font_path, font_size, wrap_width, margin_bottom, out_prefix, stroke_width=3, duration=None, max_lines=0):
+    """
+    [ffmpeg] overlay 필터용으로 자막 묶음마다 스프라이트 PNG를 저장합니다.
+    반환: [(시작, 끝, png 경로, x, y)] - 묶음이 하나면 끝은 씬 길이 (또는 inf)
+    """
+    saved = []
+    for i, (start, end, lines, x, y) in enumerate(caption_cues(text, frame_size, font_path, font_size, wrap_width, margin_bottom, stroke_width, duration, max_lines)):
+        path = f"{out_prefix}_{i}.png"
+        render_sprite_image(lines, font_path, font_size, stroke_width).save(path)
+        saved.append((start, end, path, x, y))
+    return saved
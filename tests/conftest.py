@@ -0,0 +1,6 @@
+# tests/conftest.py
+import os
+import sys
+
+# 모듈이 저장소 최상위에 평평하게 있으므로 테스트에서 바로 import 할 수 있게 경로 추가
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
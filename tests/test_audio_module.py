@@ -0,0 +1,105 @@
+# tests/test_audio_module.py
+import wave
+
+import numpy as np
+import pytest
+
+from audio_module import CHANNELS, PcmLoader, ducking_gain, mix_soundtrack, scene_offsets
+
+RATE = 1000 # 테스트용 낮은 샘플레이트 (20ms 창 = 20샘플)
+SETTINGS = {
+    "sfx_volume": 0.5, "bgm_volume": 0.2, "bgm_fadeout": 0.5,
+    "duck_gain": 0.45, "duck_threshold": 0.02, "duck_attack": 0.05, "duck_release": 0.4,
+}
+
+
+def tone(seconds, value):
+    return np.full((int(seconds * RATE), CHANNELS), value, dtype=np.float32)
+
+
+def read_wav(path):
+    with wave.open(path, "rb") as f:
+        assert f.getframerate() == RATE and f.getnchannels() == CHANNELS
+        data = np.frombuffer(f.readframes(f.getnframes()), dtype="<i2")
+    return data.reshape(-1, CHANNELS).astype(np.float32) / 32767
+
+
+@pytest.fixture
+def loader(tmp_path):
+    """디코딩 없이 미리 넣어 둔 PCM을 돌려주는 로더 (효과음/BGM은 파일이 있어야 섞이므로 빈 파일을 만듦)"""
+    pcm_loader = PcmLoader(RATE)
+
+    def add(name, pcm):
+        path = tmp_path / name
+        path.write_bytes(b"")
+        pcm_loader._pcm[str(path)] = pcm
+        return str(path)
+
+    pcm_loader.add = add
+    return pcm_loader
+
+
+def test_ducking_gain_off_and_silence():
+    level = np.zeros(RATE, dtype=np.float32)
+    assert ducking_gain(level, dict(SETTINGS, duck_gain=1.0), RATE) is None
+    assert np.allclose(ducking_gain(level, SETTINGS, RATE), 1.0)
+
+
+def test_ducking_gain_dips_during_speech_and_recovers_after_release():
+    level = np.zeros(3 * RATE, dtype=np.float32)
+    level[RATE:2 * RATE] = 0.5 # 1초~2초 내레이션
+    gain = ducking_gain(level, SETTINGS, RATE)
+
+    assert gain.shape == level.shape
+    assert np.allclose(gain[:RATE - 100], 1.0)
+    assert np.allclose(gain[RATE + 100:2 * RATE], SETTINGS["duck_gain"])
+    assert np.allclose(gain[2 * RATE:2 * RATE + 300], SETTINGS["duck_gain"]) # release 동안 유지
+    assert np.allclose(gain[int(2.5 * RATE):], 1.0)
+    assert gain.min() >= SETTINGS["duck_gain"] - 1e-6 and gain.max() <= 1.0 + 1e-6
+
+
+def test_ducking_gain_ignores_level_below_threshold():
+    level = np.full(RATE, SETTINGS["duck_threshold"] / 2, dtype=np.float32)
+    assert np.allclose(ducking_gain(level, SETTINGS, RATE), 1.0)
+
+
+def test_scene_offsets_do_not_drift():
+    offsets = scene_offsets([{"duration": 1 / 3}] * 30, RATE)
+    assert offsets[0][0] == 0
+    assert all(a + n == b for (a, n), (b, _) in zip(offsets, offsets[1:]))
+    assert sum(n for _, n in offsets) == 10 * RATE
+
+
+def test_mix_soundtrack_places_scenes_and_sfx(tmp_path, loader):
+    timeline = [
+        {"duration": 1.0, "audio_path": loader.add("a.wav", tone(1.5, 0.1)), # 씬보다 길면 잘림
+         "sfx_path": loader.add("boom.wav", tone(0.2, 0.4))},
+        {"duration": 1.0, "audio_path": loader.add("b.wav", tone(0.5, 0.3))},   # 짧으면 뒤는 무음
+    ]
+    mix = read_wav(mix_soundtrack(timeline, SETTINGS, str(tmp_path / "out.wav"), loader=loader))
+
+    assert mix.shape == (2 * RATE, CHANNELS)
+    assert np.allclose(mix[:200], 0.1 + 0.4 * SETTINGS["sfx_volume"], atol=1e-3)
+    assert np.allclose(mix[200:RATE], 0.1, atol=1e-3)
+    assert np.allclose(mix[RATE:RATE + 500], 0.3, atol=1e-3)
+    assert np.allclose(mix[RATE + 500:], 0.0, atol=1e-3)
+
+
+def test_mix_soundtrack_loops_ducks_and_fades_bgm(tmp_path, loader):
+    timeline = [{"duration": 3.0, "audio_path": loader.add("voice.wav", np.concatenate([tone(1.0, 0.0), tone(0.5, 0.3)]))}]
+    settings = dict(SETTINGS, bgm_path=loader.add("bgm.wav", tone(0.7, 0.5))) # 영상보다 짧은 BGM은 반복
+    mix = read_wav(mix_soundtrack(timeline, settings, str(tmp_path / "out.wav"), loader=loader))
+
+    bgm = 0.5 * settings["bgm_volume"]
+    assert np.allclose(mix[:900], bgm, atol=1e-3)                                   # 말하기 전: 원래 볼륨
+    assert np.allclose(mix[1100:1500], 0.3 + bgm * settings["duck_gain"], atol=1e-3) # 말하는 중: 덕킹
+    assert np.allclose(mix[2000:2400], bgm, atol=1e-3)                               # release 후 복귀 (반복된 BGM)
+    assert abs(mix[-1]).max() < 1e-3                                                 # 페이드 아웃
+    assert np.all(np.diff(mix[2500:, 0]) <= 1e-4)
+
+
+def test_mix_soundtrack_without_bgm_file_keeps_voice(tmp_path, loader):
+    timeline = [{"duration": 0.5, "audio_path": loader.add("voice.wav", tone(0.5, 0.2))}]
+    settings = dict(SETTINGS, bgm_path=str(tmp_path / "missing.mp3"))
+    mix = read_wav(mix_soundtrack(timeline, settings, str(tmp_path / "out.wav"), loader=loader))
+    assert np.allclose(mix, 0.2, atol=1e-3)
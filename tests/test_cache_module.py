@@ -0,0 +1,90 @@
+# tests/test_cache_module.py
+import os
+
+import pytest
+
+import cache_module
+from cache_module import AssetCache, make_key
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return AssetCache(str(tmp_path / "cache"), max_mb=1)
+
+
+def test_make_key_is_stable_and_content_addressed(tmp_path):
+    ref = tmp_path / "ref.png"
+    ref.write_bytes(b"face")
+    key = make_key("image", prompt="cat", model="m", aspect_ratio="16:9", ref_image_path=str(ref))
+    assert key == make_key("image", prompt="cat", model="m", aspect_ratio="16:9", ref_image_path=str(ref))
+
+    copy = tmp_path / "other_name.png" # 파일명이 달라도 내용이 같으면 같은 키
+    copy.write_bytes(b"face")
+    assert key == make_key("image", prompt="cat", model="m", aspect_ratio="16:9", ref_image_path=str(copy))
+
+    ref.write_bytes(b"another face")
+    assert key != make_key("image", prompt="cat", model="m", aspect_ratio="16:9", ref_image_path=str(ref))
+    assert key != make_key("image", prompt="dog", model="m", aspect_ratio="16:9", ref_image_path=str(copy))
+    assert make_key("image", prompt="cat", seed=1) != make_key("image", prompt="cat", seed=2)
+
+
+def test_put_then_get(cache):
+    assert cache.get("ab" * 32, ".png") is None
+    path = cache.put_bytes("ab" * 32, b"png-bytes", ".png")
+    assert cache.get("ab" * 32, ".png") == path
+    with open(path, "rb") as f:
+        assert f.read() == b"png-bytes"
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_put_is_atomic_when_write_fails(cache, monkeypatch):
+    key = "cd" * 32
+    cache.put_bytes(key, b"old", ".mp3")
+
+    def broken_replace(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(cache_module.os, "replace", broken_replace)
+    with pytest.raises(OSError):
+        cache.put_bytes(key, b"new", ".mp3")
+    monkeypatch.undo()
+
+    with open(cache.get(key, ".mp3"), "rb") as f:
+        assert f.read() == b"old" # 실패한 쓰기는 기존 파일을 건드리지 않음
+    leftovers = [name for _, _, files in os.walk(cache.cache_dir) for name in files if name.endswith(".tmp")]
+    assert leftovers == []
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = AssetCache(str(tmp_path / "cache"), max_mb=2.5 / 1024) # 2.5KB
+    keys = [f"{i:02d}" * 32 for i in range(3)]
+    cache.put_bytes(keys[0], b"0" * 1024, ".bin")
+    cache.put_bytes(keys[1], b"1" * 1024, ".bin")
+    assert cache.get(keys[0], ".bin") # 0번을 최근 사용으로
+    cache.put_bytes(keys[2], b"2" * 1024, ".bin")
+
+    assert cache.get(keys[1], ".bin") is None
+    assert cache.get(keys[0], ".bin") and cache.get(keys[2], ".bin")
+    assert cache.stats()["bytes"] <= cache.max_bytes
+
+
+def test_lru_order_survives_restart(tmp_path):
+    cache = AssetCache(str(tmp_path / "cache"), max_mb=2.5 / 1024)
+    old, new = "aa" * 32, "bb" * 32
+    os.utime(cache.put_bytes(old, b"a" * 1024, ".bin"), (1, 1))
+    cache.put_bytes(new, b"b" * 1024, ".bin")
+
+    restarted = AssetCache(cache.cache_dir, max_mb=2.5 / 1024)
+    restarted.put_bytes("cc" * 32, b"c" * 1024, ".bin")
+    assert restarted.get(old, ".bin") is None
+    assert restarted.get(new, ".bin")
+
+
+def test_materialize_links_or_copies(cache, tmp_path):
+    path = cache.put_bytes("ee" * 32, b"clip", ".mp4")
+    dest = tmp_path / "out" / "001.mp4"
+    dest.parent.mkdir()
+    dest.write_bytes(b"stale")
+    assert cache.materialize(path, str(dest)) == str(dest)
+    assert dest.read_bytes() == b"clip"
+    assert cache.materialize(path, path) == path
@@ -0,0 +1,159 @@
+# tests/test_download_module.py
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import download_module
+from download_module import DownloadManager
+
+DATA = bytes(range(256)) * 64 # 16KB
+
+
+class FileServer:
+    """Range를 지원하는 로컬 HTTP 서버. mode로 Range 무시/중간 끊김/에러 응답을 흉내냅니다."""
+
+    def __init__(self):
+        self.mode = "normal"
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append(self.headers.get("Range"))
+                if server.mode == "error":
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                start = 0
+                if self.headers.get("Range") and server.mode != "ignore_range":
+                    start = int(self.headers["Range"].split("=")[1].rstrip("-"))
+                    if start >= len(DATA):
+                        self.send_response(416)
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    self.send_response(206)
+                else:
+                    self.send_response(200)
+                body = DATA[start:]
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if server.mode == "truncate": # 절반만 보내고 연결을 끊음
+                    self.wfile.write(body[:len(body) // 2])
+                    self.close_connection = True
+                    return
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/clip.mp4"
+        threading.Thread(target=self.httpd.serve_forever, args=(0.05,), daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    srv = FileServer()
+    yield srv
+    srv.close()
+
+
+@pytest.fixture
+def manager():
+    return DownloadManager(retries=0)
+
+
+def test_download_writes_file_and_removes_part(server, manager, tmp_path):
+    dest = str(tmp_path / "clip.mp4")
+    assert manager.download(server.url, dest) == dest
+    with open(dest, "rb") as f:
+        assert f.read() == DATA
+    assert not os.path.exists(dest + ".part")
+    assert server.requests == [None]
+
+
+def test_existing_file_is_not_downloaded_again(server, manager, tmp_path):
+    dest = tmp_path / "clip.mp4"
+    dest.write_bytes(DATA)
+    assert manager.download(server.url, str(dest)) == str(dest)
+    assert server.requests == []
+
+
+def test_resumes_from_part_with_range(server, manager, tmp_path):
+    dest = str(tmp_path / "clip.mp4")
+    with open(dest + ".part", "wb") as f:
+        f.write(DATA[:5000])
+    assert manager.download(server.url, dest) == dest
+    assert server.requests == ["bytes=5000-"]
+    with open(dest, "rb") as f:
+        assert f.read() == DATA
+
+
+def test_restarts_when_server_ignores_range(server, manager, tmp_path):
+    server.mode = "ignore_range"
+    dest = str(tmp_path / "clip.mp4")
+    with open(dest + ".part", "wb") as f:
+        f.write(b"garbage")
+    assert manager.download(server.url, dest) == dest
+    with open(dest, "rb") as f:
+        assert f.read() == DATA
+
+
+def test_complete_part_is_renamed_on_416(server, manager, tmp_path):
+    dest = str(tmp_path / "clip.mp4")
+    with open(dest + ".part", "wb") as f:
+        f.write(DATA)
+    assert manager.download(server.url, dest) == dest
+    with open(dest, "rb") as f:
+        assert f.read() == DATA
+
+
+def test_interrupted_download_keeps_part_and_resumes(server, manager, tmp_path, monkeypatch):
+    monkeypatch.setattr(download_module, "CHUNK_SIZE", 1024) # 끊기기 전 받은 조각이 .part에 남도록
+    dest = str(tmp_path / "clip.mp4")
+    server.mode = "truncate"
+    assert manager.download(server.url, dest) is None
+    assert not os.path.exists(dest)
+    kept = os.path.getsize(dest + ".part")
+    assert 0 < kept < len(DATA)
+
+    server.mode = "normal"
+    assert manager.download(server.url, dest) == dest
+    assert server.requests[-1] == f"bytes={kept}-"
+    with open(dest, "rb") as f:
+        assert f.read() == DATA
+
+
+def test_http_error_and_too_small_results_are_rejected(server, manager, tmp_path):
+    dest = str(tmp_path / "clip.mp4")
+    server.mode = "error"
+    assert manager.download(server.url, dest) is None
+
+    server.mode = "normal"
+    assert manager.download(server.url, dest, min_bytes=len(DATA) + 1) is None
+    assert not os.path.exists(dest) and not os.path.exists(dest + ".part")
+
+
+@pytest.mark.skipif(download_module.fcntl is None, reason="flock 없음")
+def test_waits_for_lock_held_by_another_process(server, manager, tmp_path):
+    dest = str(tmp_path / "clip.mp4")
+    # 다른 프로세스가 같은 파일을 받는 중인 상황: 별도 파일 핸들로 flock을 잡아 둠
+    with open(dest + ".lock", "a") as other:
+        download_module.fcntl.flock(other, download_module.fcntl.LOCK_EX)
+        worker = threading.Thread(target=manager.download, args=(server.url, dest))
+        worker.start()
+        time.sleep(0.3)
+        assert server.requests == []
+        download_module.fcntl.flock(other, download_module.fcntl.LOCK_UN)
+    worker.join(timeout=5)
+    with open(dest, "rb") as f:
+        assert f.read() == DATA
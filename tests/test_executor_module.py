@@ -0,0 +1,52 @@
+# tests/test_executor_module.py
+from concurrent.futures import Future
+
+import pytest
+
+from executor_module import split_future
+
+
+def test_split_future_distributes_results_in_order():
+    batch = Future()
+    parts = split_future(batch, 3)
+    assert not any(p.done() for p in parts)
+    batch.set_result(["a", "b", "c"])
+    assert [p.result(timeout=1) for p in parts] == ["a", "b", "c"]
+
+
+def test_split_future_propagates_batch_error_to_every_part():
+    batch = Future()
+    parts = split_future(batch, 2)
+    batch.set_exception(RuntimeError("quota"))
+    for part in parts:
+        with pytest.raises(RuntimeError, match="quota"):
+            part.result(timeout=1)
+
+
+def test_split_future_fails_parts_missing_from_short_result():
+    batch = Future()
+    parts = split_future(batch, 3)
+    batch.set_result(("a",))
+    assert parts[0].result(timeout=1) == "a"
+    for part in parts[1:]:
+        with pytest.raises(ValueError):
+            part.result(timeout=1)
+
+
+def test_split_future_fails_parts_when_result_is_not_a_list():
+    batch = Future()
+    parts = split_future(batch, 2)
+    batch.set_result(None)
+    for part in parts:
+        with pytest.raises(TypeError):
+            part.result(timeout=1)
+
+
+def test_split_future_skips_parts_cancelled_by_the_caller():
+    batch = Future()
+    parts = split_future(batch, 3)
+    assert parts[1].cancel()
+    batch.set_result(["a", "b", "c"])
+    assert parts[0].result(timeout=1) == "a"
+    assert parts[1].cancelled()
+    assert parts[2].result(timeout=1) == "c"
@@ -0,0 +1,118 @@
+# tests/test_job_module.py
+import json
+import time
+
+import pytest
+
+from job_module import JobCancelled, JobQueue, WorkerGroup, run_worker
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "queue.sqlite3"))
+
+
+def set_heartbeat(queue, job_id, at):
+    with queue._connect() as conn:
+        conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (at, job_id))
+
+
+def test_claim_takes_oldest_queued_job_once(queue):
+    first = queue.submit({"n": 1})
+    second = queue.submit({"n": 2})
+
+    job = queue.claim("w1")
+    assert job["id"] == first
+    assert job["state"] == "running" and job["worker"] == "w1" and job["attempts"] == 1
+    assert job["payload"] == {"n": 1}
+    assert queue.claim("w2")["id"] == second
+    assert queue.claim("w3") is None
+
+
+def test_position_counts_jobs_ahead(queue):
+    ids = [queue.submit({}) for _ in range(3)]
+    assert [queue.position(job_id) for job_id in ids] == [0, 1, 2]
+
+
+def test_requeue_stale_returns_dead_workers_job(queue):
+    job_id = queue.submit({})
+    queue.claim("dead")
+    set_heartbeat(queue, job_id, time.time() - 1000)
+
+    assert queue.requeue_stale(stale_seconds=300) == 1
+    job = queue.get(job_id)
+    assert job["state"] == "queued" and job["worker"] is None
+    assert queue.claim("w2")["attempts"] == 2
+
+
+def test_requeue_stale_leaves_live_jobs(queue):
+    job_id = queue.submit({})
+    queue.claim("w1")
+    set_heartbeat(queue, job_id, time.time() - 1000)
+    queue.heartbeat(job_id)
+
+    assert queue.requeue_stale(stale_seconds=300) == 0
+    assert queue.get(job_id)["state"] == "running"
+
+
+def test_requeue_stale_fails_job_after_max_attempts(queue):
+    job_id = queue.submit({})
+    for _ in range(3):
+        queue.claim("w")
+        set_heartbeat(queue, job_id, time.time() - 1000)
+        queue.requeue_stale(stale_seconds=300, max_attempts=3)
+    job = queue.get(job_id)
+    assert job["state"] == "failed" and job["attempts"] == 3
+
+
+def test_cancel_queued_and_running(queue):
+    queued = queue.submit({})
+    running = queue.submit({})
+    queue.cancel(queued)
+    assert queue.get(queued)["state"] == "cancelled"
+
+    assert queue.claim("w")["id"] == running # 취소된 작업은 건너뜀
+    queue.cancel(running)
+    with pytest.raises(JobCancelled):
+        queue.report(running, 0.5, "진행 중")
+
+
+def test_report_and_finish(queue):
+    job_id = queue.submit({})
+    queue.claim("w")
+    queue.report(job_id, 0.5, "절반")
+    queue.finish(job_id, {"output_path": "out.mp4"})
+
+    job = queue.get(job_id)
+    assert job["state"] == "done" and job["progress"] == 1.0
+    assert job["result"] == {"output_path": "out.mp4"}
+    assert [message for _, message in queue.events(job_id)] == ["절반"]
+
+
+def test_worker_hands_secrets_only_to_their_job(queue):
+    secrets = {}
+    typed = queue.submit({"n": 1})
+    secrets[typed] = {"pexels_key": "typed-key"}
+    queue.submit({"n": 2})
+    seen = {}
+
+    def handler(payload, progress, log, preview):
+        seen[payload["n"]] = payload.get("secrets")
+        return {}
+
+    run_worker(queue.db_path, handler=handler, max_jobs=2, poll_interval=0.01, secrets=secrets)
+    assert seen == {1: {"pexels_key": "typed-key"}, 2: None}
+    assert secrets == {} # 끝난 작업의 키는 남기지 않음
+    assert queue.get(typed)["payload"] == {"n": 1}
+
+
+def test_worker_group_submit_keeps_secrets_out_of_the_queue(queue):
+    group = WorkerGroup(count=0)
+    assert group.ensure({"PEXELS_API_KEY": "server-key"}) == []
+    job_id = group.submit(queue, {"n": 1}, secrets={"pexels_key": "typed-key"})
+    assert queue.get(job_id)["payload"] == {"n": 1} # 워커를 띄우지 않았으면 넘길 곳이 없어 버림
+
+    group._secrets = {} # 워커를 띄운 뒤의 상태 (실제로는 Manager 공유 dict)
+    job_id = group.submit(queue, {"n": 2}, secrets={"pexels_key": "typed-key", "gemini_key": None})
+    assert group._secrets == {job_id: {"pexels_key": "typed-key"}}
+    assert "typed-key" not in json.dumps(queue.get(job_id))
@@ -0,0 +1,79 @@
+# tests/test_manifest_module.py
+import os
+
+import pytest
+
+from manifest_module import JobManifest, scene_fingerprint
+
+SCENE = {"seq": 1, "narrative": "라면 물을 끓입니다.", "visual_prompt": "boiling water", "sound_effect": None}
+SETTINGS = ("ko-KR-Standard-C", "cinematic", "a young chef", "16:9")
+
+
+def fingerprint(scene=SCENE, settings=SETTINGS):
+    return scene_fingerprint(scene, *settings)
+
+
+def test_fingerprint_ignores_surrounding_whitespace_and_seq():
+    edited = dict(SCENE, seq=7, narrative="  라면 물을 끓입니다. \n")
+    assert fingerprint(edited) == fingerprint()
+
+
+@pytest.mark.parametrize("scene, settings", [
+    (dict(SCENE, narrative="라면 물을 두 번 끓입니다."), SETTINGS),
+    (dict(SCENE, visual_prompt="pouring noodles"), SETTINGS),
+    (dict(SCENE, sound_effect="bubble"), SETTINGS),
+    (SCENE, ("ko-KR-Neural2-A",) + SETTINGS[1:]),
+    (SCENE, SETTINGS[:3] + ("9:16",)),
+])
+def test_fingerprint_changes_with_any_input(scene, settings):
+    assert fingerprint(scene, settings) != fingerprint()
+
+
+@pytest.fixture
+def assets(tmp_path):
+    paths = {}
+    for name in ("audio.mp3", "cut1.png", "cut2.png", "sfx.mp3"):
+        path = tmp_path / name
+        path.write_bytes(b"x")
+        paths[name] = str(path)
+    return {"kind": "image", "paths": [paths["cut1.png"], paths["cut2.png"]],
+            "audio_path": paths["audio.mp3"], "sfx_path": paths["sfx.mp3"], "visual_prompt": "boiling water"}
+
+
+def test_reusable_assets_round_trip_through_saved_manifest(tmp_path, assets):
+    manifest = JobManifest("job", jobs_dir=str(tmp_path))
+    manifest.record_assets(1, fingerprint(), assets)
+    manifest.save()
+
+    reloaded = JobManifest("job", jobs_dir=str(tmp_path))
+    assert reloaded.reusable_assets(1, fingerprint()) == assets
+    assert reloaded.reusable_assets(2, fingerprint()) is None
+
+
+def test_reusable_assets_rejects_changed_fingerprint(tmp_path, assets):
+    manifest = JobManifest("job", jobs_dir=str(tmp_path))
+    manifest.record_assets(1, fingerprint(), assets)
+    assert manifest.reusable_assets(1, fingerprint(dict(SCENE, narrative="다른 대본"))) is None
+
+
+@pytest.mark.parametrize("missing", ["audio_path", "sfx_path", "paths"])
+def test_reusable_assets_rejects_deleted_files(tmp_path, assets, missing):
+    manifest = JobManifest("job", jobs_dir=str(tmp_path))
+    manifest.record_assets(1, fingerprint(), assets)
+    path = assets[missing][-1] if missing == "paths" else assets[missing]
+    os.remove(path)
+    assert manifest.reusable_assets(1, fingerprint()) is None
+
+
+def test_forget_missing_drops_removed_scenes(tmp_path, assets):
+    manifest = JobManifest("job", jobs_dir=str(tmp_path))
+    manifest.record_assets(1, fingerprint(), assets)
+    manifest.record_assets(2, fingerprint(), assets)
+    manifest.forget_missing([2])
+    assert manifest.reusable_assets(1, fingerprint()) is None
+    assert manifest.reusable_assets(2, fingerprint()) == assets
+
+
+def test_corrupt_manifest_starts_fresh(tmp_path):
+    (tmp_path / "job.json").write_text("{not json", encoding="utf-8")
+    assert JobManifest("job", jobs_dir=str(tmp_path)).data == {"job_id": "job", "scenes": {}}
@@ -0,0 +1,52 @@
+# tests/test_motion_module.py
+import numpy as np
+import pytest
+
+from motion_module import MOTION_EFFECTS, choose_effect, linear, plan_motion
+
+SRC = (1920, 1080)
+OUT = (1280, 720)
+
+
+@pytest.mark.parametrize("effect", MOTION_EFFECTS)
+@pytest.mark.parametrize("src", [SRC, (1080, 1920), (1024, 1024)])
+def test_every_frame_covers_output(effect, src):
+    matrices = plan_motion(effect, 48, src, OUT)
+    assert matrices.shape == (48, 2, 3)
+    scale, tx, ty = matrices[:, 0, 0], matrices[:, 0, 2], matrices[:, 1, 2]
+    eps = 1e-6
+    assert np.all(tx <= eps) and np.all(ty <= eps)
+    assert np.all(src[0] * scale + tx >= OUT[0] - eps)
+    assert np.all(src[1] * scale + ty >= OUT[1] - eps)
+    assert np.allclose(matrices[:, 0, 1], 0) and np.allclose(matrices[:, 1, 0], 0)
+
+
+def test_zoom_in_and_out_are_mirror_images():
+    zoom_in = plan_motion("zoom_in", 24, SRC, OUT, strength=0.1)[:, 0, 0]
+    zoom_out = plan_motion("zoom_out", 24, SRC, OUT, strength=0.1)[:, 0, 0]
+    base = OUT[0] / SRC[0]
+    assert zoom_in[0] == pytest.approx(base) and zoom_in[-1] == pytest.approx(base * 1.1)
+    assert np.all(np.diff(zoom_in) >= 0)
+    assert np.allclose(zoom_out, zoom_in[::-1])
+
+
+@pytest.mark.parametrize("effect, axis, forward", [
+    ("pan_right", 0, True), ("pan_left", 0, False), ("pan_down", 1, True), ("pan_up", 1, False),
+])
+def test_pan_moves_across_whole_margin(effect, axis, forward):
+    matrices = plan_motion(effect, 24, SRC, OUT, easing=linear)
+    offset = -matrices[:, axis, 2]
+    spare = SRC[axis] * matrices[0, 0, 0] - OUT[axis]
+    start, end = (0.0, spare) if forward else (spare, 0.0)
+    assert offset[0] == pytest.approx(start) and offset[-1] == pytest.approx(end)
+    assert np.allclose(np.diff(offset), (end - start) / 23)
+    assert np.allclose(matrices[:, 0, 0], matrices[0, 0, 0]) # 패닝은 고정 배율
+
+
+def test_single_frame_plan():
+    assert plan_motion("zoom_in", 0, SRC, OUT).shape == (1, 2, 3)
+
+
+def test_choose_effect_is_deterministic_per_seed():
+    assert choose_effect("cut_001.png") == choose_effect("cut_001.png")
+    assert {choose_effect(f"cut_{i}.png") for i in range(50)} == set(MOTION_EFFECTS)
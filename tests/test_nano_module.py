@@ -0,0 +1,110 @@
+# tests/test_nano_module.py
+import threading
+
+import pytest
+
+pytest.importorskip("fal_client")
+pytest.importorskip("dotenv")
+import nano_module
+import ratelimit_module
+from cache_module import AssetCache
+from ratelimit_module import RateLimiterRegistry
+
+
+class FakeHandle:
+    def __init__(self, url, gate=None, error=None):
+        self.url = url
+        self.gate = gate
+        self.error = error
+
+    def get(self):
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.error:
+            raise self.error
+        return {"images": [{"url": self.url}]}
+
+
+class FakeResponse:
+    def __init__(self, content, status_code=200):
+        self.content = content
+        self.status_code = status_code
+
+
+class FakeDownloads:
+    def get(self, url, **kwargs):
+        if url.endswith("/missing"):
+            return FakeResponse(b"", 404)
+        return FakeResponse(url.encode())
+
+
+@pytest.fixture
+def fal(monkeypatch, tmp_path):
+    """Fal 큐 제출을 기록하는 가짜. 프롬프트에 'error'가 있으면 결과 대기에서 실패합니다."""
+    cache = AssetCache(str(tmp_path / "cache"))
+    monkeypatch.setattr(nano_module, "get_default_cache", lambda: cache)
+    monkeypatch.setattr(nano_module, "get_download_manager", lambda: FakeDownloads())
+    limiters = RateLimiterRegistry()
+    monkeypatch.setattr(nano_module, "get_rate_limiters", lambda: limiters)
+    monkeypatch.setattr(ratelimit_module, "BASE_BACKOFF", 0.0)
+    state = {"submitted": [], "gate": None, "limiters": limiters}
+
+    def submit(model, arguments):
+        prompt = arguments["prompt"]
+        state["submitted"].append(prompt)
+        if prompt == "rejected":
+            raise RuntimeError("invalid prompt")
+        if prompt == "busy" and state["submitted"].count(prompt) == 1:
+            raise RuntimeError("429 Too Many Requests")
+        error = RuntimeError("generation failed") if prompt == "error" else None
+        return FakeHandle(f"https://fal.test/{prompt}", state["gate"], error)
+
+    monkeypatch.setattr(nano_module.fal_client, "submit", submit)
+    return state
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_submit_images_submits_all_before_waiting(fal, tmp_path):
+    fal["gate"] = threading.Event()
+    futures = nano_module.submit_images([("cat", "a.png"), ("dog", "b.png")], str(tmp_path / "out"))
+    # 결과를 기다리기 전에 두 작업 모두 큐에 들어가 있어야 함
+    assert fal["submitted"] == ["cat", "dog"]
+    assert not any(f.done() for f in futures)
+    fal["gate"].set()
+    paths = [f.result(timeout=5) for f in futures]
+    assert paths == [str(tmp_path / "out" / "a.png"), str(tmp_path / "out" / "b.png")]
+    assert read(paths[0]) == b"https://fal.test/cat"
+
+
+def test_same_prompt_is_generated_once_for_every_file(fal, tmp_path):
+    paths = nano_module.generate_images([("cat", "a.png"), ("cat", "b.png")], str(tmp_path / "out"))
+    assert fal["submitted"] == ["cat"]
+    assert [read(p) for p in paths] == [b"https://fal.test/cat"] * 2
+
+
+def test_cached_prompt_is_not_submitted_again(fal, tmp_path):
+    nano_module.generate_image("cat", "a.png", str(tmp_path / "out"))
+    path = nano_module.generate_image("cat", "other.png", str(tmp_path / "out"))
+    assert fal["submitted"] == ["cat"]
+    assert read(path) == b"https://fal.test/cat"
+
+
+def test_failures_become_none_without_affecting_others(fal, tmp_path):
+    jobs = [("rejected", "a.png"), ("error", "b.png"), ("missing", "c.png"), ("cat", "d.png")]
+    paths = nano_module.generate_images(jobs, str(tmp_path / "out"))
+    assert paths[:3] == [None, None, None]
+    assert read(paths[3]) == b"https://fal.test/cat"
+
+
+def test_submit_and_result_go_through_fal_limiter(fal, tmp_path):
+    paths = nano_module.generate_images([("busy", "a.png"), ("cat", "b.png")], str(tmp_path / "out"))
+    assert fal["submitted"] == ["busy", "busy", "cat"] # 과부하는 리미터가 다시 제출
+    assert read(paths[0]) == b"https://fal.test/busy"
+    snapshot = fal["limiters"].snapshot()
+    submit = snapshot[f"fal/{nano_module.MODEL_ID}"]
+    assert submit["throttled"] == 1 and submit["successes"] == 2
+    assert snapshot[f"fal/{nano_module.RESULT_MODEL}"]["successes"] == 2
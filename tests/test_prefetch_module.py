@@ -0,0 +1,44 @@
+# tests/test_prefetch_module.py
+import threading
+
+import pytest
+
+from prefetch_module import Prefetcher
+
+
+@pytest.fixture
+def prefetcher():
+    p = Prefetcher({"tts": 1})
+    yield p
+    p.shutdown()
+
+
+def test_same_key_is_submitted_once(prefetcher):
+    calls = []
+    first = prefetcher.submit(("tts", "안녕"), "tts", calls.append, "안녕")
+    second = prefetcher.submit(("tts", "안녕"), "tts", calls.append, "안녕")
+    assert first is second
+    first.result(timeout=5)
+    assert calls == ["안녕"]
+
+
+def test_cancel_except_drops_only_edited_scenes(prefetcher):
+    gate = threading.Event()
+    done = []
+
+    def synthesize(text):
+        if text == "첫 씬":
+            gate.wait(5) # 풀이 1개라 뒤 작업은 아직 시작 전
+        done.append(text)
+        return text
+
+    texts = ["첫 씬", "둘째 씬", "셋째 씬"]
+    futures = [prefetcher.submit(("tts", text), "tts", synthesize, text) for text in texts]
+    # 둘째 씬만 수정됨
+    assert prefetcher.cancel_except([("tts", "첫 씬"), ("tts", "셋째 씬"), ("tts", "둘째 씬 (수정)")]) == 1
+    gate.set()
+    assert futures[0].result(timeout=5) == "첫 씬"
+    assert futures[1].cancelled()
+    assert futures[2].result(timeout=5) == "셋째 씬"
+    assert done == ["첫 씬", "셋째 씬"]
+    assert prefetcher.pending() == 0
@@ -0,0 +1,150 @@
+# tests/test_ratelimit_module.py
+import email.utils
+import time
+
+import pytest
+
+import ratelimit_module
+from ratelimit_module import AdaptiveLimiter, RetryExhausted, classify_error, load_rate_limits
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class HttpError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.response = FakeResponse(status_code, headers)
+
+
+@pytest.fixture
+def no_sleep(monkeypatch):
+    slept = []
+    monkeypatch.setattr(ratelimit_module.time, "sleep", slept.append)
+    monkeypatch.setattr(ratelimit_module.random, "uniform", lambda low, high: high)
+    return slept
+
+
+def limiter(max_concurrency=8, cooldown=2.0):
+    return AdaptiveLimiter(("test", "default"), rate=1000.0, burst=1000, max_concurrency=max_concurrency, cooldown=cooldown)
+
+
+def test_throttle_halves_window_once_per_cooldown():
+    lim = limiter(max_concurrency=8)
+    for _ in range(3): # 같은 과부하 묶음
+        lim._acquire()
+        lim._release("throttled", 0.0)
+    assert lim.window == 4.0
+    assert lim.metrics["throttled"] == 3
+
+
+def test_throttle_after_cooldown_halves_again_but_not_below_one():
+    lim = limiter(max_concurrency=4, cooldown=0.0)
+    for _ in range(4):
+        lim._acquire()
+        lim._release("throttled", 0.0)
+    assert lim.window == 1.0
+    assert lim.metrics["window_min"] == 1.0
+
+
+def test_success_grows_window_additively_up_to_max():
+    lim = limiter(max_concurrency=4, cooldown=0.0)
+    lim._acquire()
+    lim._release("throttled", 0.0)
+    assert lim.window == 2.0
+    lim._acquire()
+    lim._release("ok", 0.0)
+    assert lim.window == 2.5 # +1/창
+    for _ in range(20):
+        lim._acquire()
+        lim._release("ok", 0.0)
+    assert lim.window == 4.0
+
+
+def test_retry_after_pauses_every_caller():
+    lim = limiter()
+    lim._acquire()
+    lim._release("throttled", 0.0, retry_after=0.2)
+    started = time.monotonic()
+    lim._acquire()
+    assert time.monotonic() - started >= 0.15
+
+
+@pytest.mark.parametrize("exc, expected", [
+    (HttpError(429), (True, None)),
+    (HttpError(503, {"Retry-After": "7"}), (True, 7.0)),
+    (HttpError(500), (False, None)),
+    (HttpError(404), (False, None)),
+    (Exception("429 RESOURCE_EXHAUSTED. {'retryDelay': '12s'}"), (True, 12.0)),
+    (Exception("model is overloaded"), (True, None)),
+    (ValueError("bad prompt"), (False, None)),
+])
+def test_classify_error(exc, expected):
+    assert classify_error(exc) == expected
+
+
+def test_retry_after_http_date():
+    when = email.utils.formatdate(time.time() + 30, usegmt=True)
+    throttled, retry_after = classify_error(HttpError(429, {"Retry-After": when}))
+    assert throttled and 25 <= retry_after <= 30
+
+
+def test_call_retries_throttled_calls_then_succeeds(no_sleep, monkeypatch):
+    monkeypatch.setattr(ratelimit_module, "BASE_BACKOFF", 0.01)
+    lim = limiter()
+    outcomes = [HttpError(429, {"Retry-After": "0.2"}), HttpError(503), "done"]
+
+    def flaky():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert lim.call(flaky) == "done"
+    assert no_sleep == [0.2, 0.02] # Retry-After가 백오프보다 길면 그만큼 기다림
+    assert lim.metrics["throttled"] == 2 and lim.metrics["successes"] == 1
+
+
+def test_call_raises_other_errors_without_retry(no_sleep):
+    lim = limiter()
+    calls = []
+
+    def broken():
+        calls.append(1)
+        raise ValueError("bad prompt")
+
+    with pytest.raises(ValueError):
+        lim.call(broken)
+    assert len(calls) == 1 and not no_sleep
+    assert lim.in_flight == 0
+
+
+def test_call_gives_up_with_retry_exhausted(no_sleep):
+    lim = limiter()
+
+    def always_busy():
+        raise HttpError(429)
+
+    with pytest.raises(RetryExhausted) as info:
+        lim.call(always_busy, max_attempts=3)
+    assert isinstance(info.value.last_error, HttpError)
+    assert len(no_sleep) == 2
+
+
+def test_load_rate_limits_override_and_reject_invalid():
+    env = {"RATE_LIMIT_TTS": "2.5,6,3", "RATE_LIMIT_VEO": "0,2,2", "RATE_LIMIT_FAL": "abc"}
+    limits = load_rate_limits(env.get)
+    assert limits["tts"] == {"rate": 2.5, "burst": 6, "max_concurrency": 3}
+    assert limits["veo"] == ratelimit_module.DEFAULT_RATE_LIMITS["veo"]
+    assert limits["fal"] == ratelimit_module.DEFAULT_RATE_LIMITS["fal"]
+
+
+def test_load_rate_limits_splits_quota_across_processes():
+    limits = load_rate_limits({"RATE_LIMIT_PROCESSES": "4"}.get)
+    tts = ratelimit_module.DEFAULT_RATE_LIMITS["tts"]
+    assert limits["tts"]["rate"] == tts["rate"] / 4
+    assert limits["tts"]["max_concurrency"] == tts["max_concurrency"] // 4
+    assert limits["veo"]["max_concurrency"] == 1 # 최소 1
@@ -0,0 +1,119 @@
+# tests/test_render_module.py
+import os
+import threading
+import wave
+from contextlib import contextmanager
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import render_module
+import trace_module as trace
+
+
+class FakeClip:
+    """write_videofile이 임시 파일에 쓰는 동안 다른 인코딩과 겹치도록 잠깐 멈추는 가짜 클립"""
+
+    def __init__(self, barrier=None, error=None):
+        self.barrier = barrier
+        self.error = error
+        self.written = []
+
+    def write_videofile(self, path, **kwargs):
+        self.written.append(path)
+        with open(path, "wb") as f:
+            f.write(b"segment")
+        if self.barrier is not None:
+            self.barrier.wait(5)
+        if self.error:
+            raise self.error
+
+
+def use_clip(monkeypatch, clip):
+    @contextmanager
+    def fake_scene_clip(spec, settings):
+        yield clip
+
+    monkeypatch.setattr(render_module, "scene_clip", fake_scene_clip)
+
+
+SETTINGS = {"fps": 24, "codec": "libx264", "preset": "ultrafast", "crf": 30}
+
+
+def test_concurrent_encodes_of_same_segment_use_separate_temp_files(monkeypatch, tmp_path):
+    clip = FakeClip(barrier=threading.Barrier(2))
+    use_clip(monkeypatch, clip)
+    path = str(tmp_path / "seg.mkv")
+    results, errors = [], []
+
+    def encode(seq):
+        try:
+            results.append(render_module.render_scene_segment({"seq": seq}, SETTINGS, path))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=encode, args=(seq,)) for seq in (1, 2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert results == [path, path]
+    assert len(set(clip.written)) == 2
+    assert os.listdir(tmp_path) == ["seg.mkv"]
+
+
+def test_failed_encode_leaves_no_segment_or_temp_file(monkeypatch, tmp_path):
+    use_clip(monkeypatch, FakeClip(error=RuntimeError("ffmpeg died")))
+    with pytest.raises(RuntimeError):
+        render_module.render_scene_segment({"seq": 1}, SETTINGS, str(tmp_path / "seg.mkv"))
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.fixture
+def scene_assets(tmp_path):
+    image = tmp_path / "image.png"
+    Image.fromarray(np.full((90, 160, 3), 120, np.uint8)).save(image)
+    audio = tmp_path / "voice.wav"
+    with wave.open(str(audio), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(16000)
+        f.writeframes(np.zeros(8000, np.int16).tobytes())
+    return str(image), str(audio)
+
+
+def test_render_parallel_encodes_duplicate_scenes_once(tmp_path, scene_assets):
+    image, audio = scene_assets
+    settings = render_module.make_render_settings((160, 90), profile="draft", segment_dir=str(tmp_path / "segments"))
+    settings["size"] = (160, 90)
+    os.makedirs(settings["segment_dir"])
+    scene = {"duration": 0.5, "audio_path": audio, "sfx_path": None, "kind": "images", "paths": [image], "subtitle": None}
+    timeline = [dict(scene, seq=1), dict(scene, seq=2)]
+
+    tracer = trace.Tracer("render")
+    with trace.activate(tracer):
+        output = render_module.render_parallel(timeline, settings, str(tmp_path / "out.mp4"), workers=2, log=lambda msg: None)
+    assert os.path.getsize(output) > 0
+    assert [r["name"] for r in tracer.records()].count("encode") == 1
+    assert [name for name in os.listdir(settings["segment_dir"]) if name.endswith(".mkv")] == [
+        os.path.basename(render_module.segment_file(render_module.frame_aligned(timeline[0], settings["fps"]), settings, settings["segment_dir"]))
+    ]
+
+
+def test_preview_segment_is_reused_by_render_on_shared_pool(tmp_path, scene_assets):
+    image, audio = scene_assets
+    settings = render_module.make_render_settings((160, 90), profile="draft", segment_dir=str(tmp_path / "segments"))
+    settings["size"] = (160, 90)
+    os.makedirs(settings["segment_dir"])
+    spec = {"seq": 1, "duration": 0.5, "audio_path": audio, "sfx_path": None, "kind": "images", "paths": [image], "subtitle": None}
+
+    tracer = trace.Tracer("render")
+    with trace.activate(tracer), render_module.segment_process_pool(1) as pool:
+        preview = render_module.submit_encode(pool, render_module.render_scene_preview, spec, settings, settings["segment_dir"]).result()
+        render_module.render_parallel([spec], settings, str(tmp_path / "out.mp4"), log=lambda msg: None, pool=pool)
+        assert pool.submit(os.getpid).result() != os.getpid() # 렌더링이 넘겨받은 풀을 닫지 않음
+    assert os.path.exists(preview)
+    names = [r["name"] for r in tracer.records()]
+    assert names.count("preview") == 1 and names.count("encode") == 1 # 미리보기 세그먼트를 다시 인코딩하지 않음
@@ -0,0 +1,137 @@
+# tests/test_subtitle_module.py
+import numpy as np
+import pytest
+
+import subtitle_module
+from subtitle_module import SubtitleOverlay, build_overlay, caption_chunks, timed_chunks
+
+FRAME = (64, 48) # (w, h)
+
+
+def make_overlay(x, y, size=(20, 10), seed=0):
+    rng = np.random.default_rng(seed)
+    sw, sh = size
+    alpha = rng.uniform(0, 1, (sh, sw, 1)).astype(np.float32)
+    rgb = rng.uniform(0, 255, (sh, sw, 3)).astype(np.float32)
+    return SubtitleOverlay(rgb * alpha, 1.0 - alpha, x, y), rgb, alpha
+
+
+def make_frame(seed=1):
+    return np.random.default_rng(seed).integers(0, 256, (FRAME[1], FRAME[0], 3), dtype=np.uint8)
+
+
+def reference_blend(frame, rgb, alpha, x, y):
+    """전체 화면 크기 RGBA 레이어를 만들어 섞는 기존 방식"""
+    h, w = frame.shape[:2]
+    layer_rgb = np.zeros((h + 200, w + 200, 3), np.float32)
+    layer_a = np.zeros((h + 200, w + 200, 1), np.float32)
+    sh, sw = alpha.shape[:2]
+    layer_rgb[y + 100:y + 100 + sh, x + 100:x + 100 + sw] = rgb
+    layer_a[y + 100:y + 100 + sh, x + 100:x + 100 + sw] = alpha
+    layer_rgb, layer_a = layer_rgb[100:100 + h, 100:100 + w], layer_a[100:100 + h, 100:100 + w]
+    return (frame * (1.0 - layer_a) + layer_rgb * layer_a).astype(np.uint8)
+
+
+@pytest.mark.parametrize("x, y", [(22, 30), (-5, 2), (50, 40), (-10, -4)])
+def test_blend_matches_full_frame_composite(x, y):
+    overlay, rgb, alpha = make_overlay(x, y)
+    frame = make_frame()
+    out = overlay.blend(frame)
+    assert out.shape == frame.shape and out.dtype == np.uint8
+    assert np.abs(out.astype(int) - reference_blend(frame, rgb, alpha, x, y)).max() <= 1
+
+
+def test_blend_outside_frame_returns_frame_unchanged():
+    overlay, _, _ = make_overlay(FRAME[0] + 5, 0)
+    frame = make_frame()
+    assert np.array_equal(overlay.blend(frame), frame)
+
+
+def test_blend_does_not_modify_decoder_frame():
+    overlay, _, _ = make_overlay(10, 10)
+    frame = make_frame()
+    frame.flags.writeable = False # 디코더가 넘기는 읽기 전용 프레임
+    before = frame.copy()
+    assert not np.array_equal(overlay.blend(frame, in_place=True), before)
+    assert np.array_equal(frame, before)
+
+
+def test_blend_in_place_writes_into_fresh_frame():
+    overlay, rgb, alpha = make_overlay(22, 30)
+    frame = make_frame()
+    expected = reference_blend(frame, rgb, alpha, 22, 30)
+    out = overlay.blend(frame, in_place=True)
+    assert out is frame
+    assert np.abs(out.astype(int) - expected).max() <= 1
+
+
+def test_apply_copies_static_frames_and_blends_moving_frames_in_place():
+    from moviepy.editor import ImageClip, VideoClip
+
+    overlay, _, _ = make_overlay(10, 10)
+    image = make_frame()
+    before = image.copy()
+    static = ImageClip(image).set_duration(1)
+    overlay.apply(static).get_frame(0)
+    assert np.array_equal(static.img, before) # 정지 화면 배열은 그대로
+
+    fresh = []
+
+    def make(t):
+        fresh.append(make_frame())
+        return fresh[-1]
+
+    out = overlay.apply(VideoClip(make, duration=1)).get_frame(0.5)
+    assert out is fresh[-1] # 프레임마다 새로 만든 배열은 복사하지 않음
+
+
+def test_build_overlay_sits_bottom_center():
+    timed = build_overlay("자막 테스트 문장", (640, 360), None, 24, 35, margin_bottom=20)
+    assert len(timed.cues) == 1
+    start, end, overlay = timed.cues[0]
+    assert start == 0 and end == float("inf")
+    sw, sh = overlay.size
+    assert 0 < sw <= 640 and 0 < sh < 360
+    assert overlay.x == int((640 - sw) / 2)
+    assert overlay.y == 360 - sh - 20
+
+
+def test_caption_chunks_group_lines_and_weigh_by_characters():
+    text = "가나다 라마바 사아자 차카타 파하"
+    chunks = caption_chunks(text, 3, max_lines=2)
+    assert [lines for lines, _ in chunks] == [("가나다", "라마바"), ("사아자", "차카타"), ("파하",)]
+    assert [weight for _, weight in chunks] == [6, 6, 2]
+    assert len(caption_chunks(text, 3, max_lines=0)) == 1
+
+
+def test_timed_chunks_split_duration_by_character_share():
+    timed = timed_chunks("가나다 라마바 사아자 차카타 파하", 7.0, 3, max_lines=2)
+    assert [lines for _, _, lines in timed] == [("가나다", "라마바"), ("사아자", "차카타"), ("파하",)]
+    starts = [start for start, _, _ in timed]
+    ends = [end for _, end, _ in timed]
+    assert starts == pytest.approx([0.0, 3.0, 6.0])
+    assert ends == pytest.approx([3.0, 6.0, 7.0])
+    assert ends[-1] == 7.0 # 마지막 묶음은 씬 끝까지 (반올림 오차 없이)
+
+
+def test_timed_subtitle_picks_chunk_for_frame_time():
+    timed = build_overlay("가나다 라마바 사아자 차카타 파하", (320, 180), None, 16, 3, margin_bottom=10, duration=7.0, max_lines=2)
+    first, second, last = (overlay for _, _, overlay in timed.cues)
+    assert timed.overlay_at(0.0) is first
+    assert timed.overlay_at(2.99) is first
+    assert timed.overlay_at(3.0) is second
+    assert timed.overlay_at(6.5) is last
+    assert timed.overlay_at(7.0) is last # 마지막 프레임
+
+
+def test_sprites_are_cached_and_read_only():
+    lines = ("캐시 확인",)
+    first = subtitle_module.render_text_sprite(lines, None, 20)
+    again = subtitle_module.render_text_sprite(lines, None, 20)
+    assert first[0] is again[0] and first[1] is again[1]
+    assert not first[0].flags.writeable and not first[1].flags.writeable
+    assert subtitle_module.load_font(None, 20) is subtitle_module.load_font(None, 20)
+
+    hits = subtitle_module.render_line_image.cache_info().hits
+    subtitle_module.render_sprite_image(("캐시 확인", "둘째 줄"), None, 20)
+    assert subtitle_module.render_line_image.cache_info().hits == hits + 1 # 이미 그린 줄은 다시 그리지 않음
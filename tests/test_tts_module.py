@@ -0,0 +1,56 @@
+# tests/test_tts_module.py
+import io
+import wave
+
+from tts_module import build_batch_ssml, pack_batches, split_wav
+
+
+def make_wav(n_frames, framerate=1000, channels=1):
+    out = io.BytesIO()
+    with wave.open(out, "wb") as dst:
+        dst.setnchannels(channels)
+        dst.setsampwidth(2)
+        dst.setframerate(framerate)
+        dst.writeframes(b"".join(i.to_bytes(2, "little") * channels for i in range(n_frames)))
+    return out.getvalue()
+
+
+def read_frames(wav_bytes):
+    with wave.open(io.BytesIO(wav_bytes), "rb") as src:
+        return src.getnframes(), src.readframes(src.getnframes())
+
+
+def test_split_wav_cuts_at_mark_times():
+    clips = split_wav(make_wav(1000), [0.0, 0.25, 0.6])
+    assert [read_frames(clip)[0] for clip in clips] == [250, 350, 400]
+
+
+def test_split_wav_keeps_every_frame_in_order():
+    wav = make_wav(1000, channels=2)
+    clips = split_wav(wav, [0.0, 0.333, 0.5])
+    assert b"".join(read_frames(clip)[1] for clip in clips) == read_frames(wav)[1]
+
+
+def test_split_wav_first_scene_starts_at_zero_and_clamps_late_marks():
+    # 첫 mark가 앞의 무음 뒤에 찍혀도 첫 씬은 맨 앞부터, 파일 끝을 넘는 mark는 빈 씬
+    clips = split_wav(make_wav(100), [0.02, 5.0])
+    assert [read_frames(clip)[0] for clip in clips] == [100, 0]
+
+
+def test_pack_batches_keeps_order_within_limit():
+    texts = ["가나다라마" * 20] * 7
+    limit = len(build_batch_ssml(texts[:3]).encode("utf-8"))
+    batches = pack_batches(texts, max_bytes=limit)
+    assert [i for batch in batches for i in batch] == list(range(7))
+    assert batches == [[0, 1, 2], [3, 4, 5], [6]]
+    for batch in batches:
+        assert len(build_batch_ssml([texts[i] for i in batch]).encode("utf-8")) <= limit
+
+
+def test_pack_batches_gives_oversized_scene_its_own_batch():
+    texts = ["짧음", "길다" * 500, "짧음"]
+    assert pack_batches(texts, max_bytes=200) == [[0], [1], [2]]
+
+
+def test_pack_batches_empty():
+    assert pack_batches([]) == []
@@ -0,0 +1,124 @@
+# tests/test_veo_module.py
+import threading
+
+import pytest
+
+import veo_module
+from executor_module import ProviderPool
+from veo_module import VeoJobManager
+
+
+class FakeVeo:
+    """start/poll 가짜. ready_after번 폴링하면 끝나고, errors[프롬프트]만큼 폴링이 먼저 실패합니다."""
+
+    def __init__(self, ready_after=1, errors=None, fail_start=()):
+        self.ready_after = ready_after
+        self.errors = dict(errors or {})
+        self.fail_start = set(fail_start)
+        self.started = []
+        self.polls = {}
+        self._lock = threading.Lock()
+
+    def start(self, prompt):
+        if prompt in self.fail_start:
+            raise RuntimeError("quota")
+        with self._lock:
+            self.started.append(prompt)
+        return prompt
+
+    def poll(self, handle):
+        with self._lock:
+            if self.errors.get(handle, 0) > 0:
+                self.errors[handle] -= 1
+                raise RuntimeError("503")
+            self.polls[handle] = self.polls.get(handle, 0) + 1
+            return self.polls[handle] >= self.ready_after, f"{handle}.mp4"
+
+
+@pytest.fixture
+def pool():
+    with ProviderPool() as p:
+        yield p
+
+
+def manager_for(pool, veo, **kwargs):
+    kwargs.setdefault("poll_interval", 0.01)
+    kwargs.setdefault("deadline", 5)
+    return VeoJobManager(pool, veo.start, veo.poll, log=lambda msg: None, **kwargs)
+
+
+def test_submits_every_prompt_and_resolves_paths(pool):
+    veo = FakeVeo(ready_after=3)
+    with manager_for(pool, veo) as manager:
+        futures = [manager.submit(f"scene{i}") for i in range(5)]
+        assert [f.result(timeout=5) for f in futures] == [f"scene{i}.mp4" for i in range(5)]
+    assert sorted(veo.started) == [f"scene{i}" for i in range(5)]
+
+
+def test_same_prompt_is_submitted_once(pool):
+    veo = FakeVeo()
+    with manager_for(pool, veo) as manager:
+        first, second = manager.submit("same"), manager.submit("same")
+        assert first is second
+        assert first.result(timeout=5) == "same.mp4"
+    assert veo.started == ["same"]
+
+
+def test_start_failure_resolves_to_none(pool):
+    veo = FakeVeo(fail_start={"bad"})
+    with manager_for(pool, veo) as manager:
+        assert manager.submit("bad").result(timeout=5) is None
+        assert manager.submit("good").result(timeout=5) == "good.mp4"
+
+
+def test_transient_poll_errors_are_retried(pool):
+    veo = FakeVeo(ready_after=2, errors={"flaky": veo_module.MAX_POLL_ERRORS - 1})
+    with manager_for(pool, veo) as manager:
+        assert manager.submit("flaky").result(timeout=5) == "flaky.mp4"
+
+
+def test_gives_up_after_max_poll_errors(pool):
+    veo = FakeVeo(ready_after=2, errors={"broken": 100})
+    with manager_for(pool, veo) as manager:
+        assert manager.submit("broken").result(timeout=5) is None
+        assert manager.submit("fine").result(timeout=5) == "fine.mp4"
+    assert veo.errors["broken"] == 100 - veo_module.MAX_POLL_ERRORS
+
+
+def test_deadline_resolves_unfinished_jobs_to_none(pool):
+    veo = FakeVeo(ready_after=10 ** 6)
+    logs = []
+    manager = VeoJobManager(pool, veo.start, veo.poll, poll_interval=0.01, deadline=0.2, log=logs.append)
+    future = manager.submit("slow")
+    assert future.result(timeout=5) is None
+    assert any("마감" in msg for msg in logs)
+    assert manager.submit("late").result(timeout=1) is None # 마감 뒤 제출은 바로 포기
+    manager.close()
+
+
+def test_close_resolves_pending_jobs(pool):
+    veo = FakeVeo(ready_after=10 ** 6)
+    manager = manager_for(pool, veo, poll_interval=60)
+    future = manager.submit("waiting")
+    manager.close()
+    assert future.result(timeout=1) is None
+
+
+def test_polling_does_not_wait_behind_throttled_starts():
+    # 'veo' 풀이 1개뿐이고 두 번째 제출이 (속도 제한에 걸린 것처럼) 첫 작업이 끝날 때까지 막혀 있어도 첫 작업은 폴링으로 끝나야 함
+    veo = FakeVeo(ready_after=2)
+    first_done = threading.Event()
+    start = veo.start
+
+    def throttled_start(prompt):
+        if prompt == "second":
+            assert first_done.wait(5), "폴링이 제출 뒤에 막힘"
+        return start(prompt)
+
+    with ProviderPool({"veo": 1}) as pool, \
+            VeoJobManager(pool, throttled_start, veo.poll, poll_interval=0.01, deadline=10, log=lambda msg: None) as manager:
+        first = manager.submit("first")
+        second = manager.submit("second")
+        assert first.result(timeout=5) == "first.mp4"
+        first_done.set()
+        assert second.result(timeout=5) == "second.mp4"
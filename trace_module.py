@@ -0,0 +1,231 @@
+# trace_module.py
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+
+class Span:
+    """구간 하나: 이름, 분류, 시작/끝(epoch 초), 스레드/프로세스, 부가 정보(bytes, cache, retries ...)"""
+
+    __slots__ = ("name", "cat", "start", "end", "pid", "tid", "thread", "args")
+
+    def __init__(self, name, cat, args):
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self.start = time.time()
+        self.end = None
+        thread = threading.current_thread()
+        self.pid = os.getpid()
+        self.tid = getattr(thread, "native_id", None) or threading.get_ident()
+        self.thread = thread.name
+
+    def set(self, **args):
+        self.args.update(args)
+
+    def add(self, key, amount=1):
+        self.args[key] = self.args.get(key, 0) + amount
+
+    def to_dict(self):
+        args = {k: round(v, 4) if isinstance(v, float) else v for k, v in self.args.items()}
+        return {
+            "name": self.name, "cat": self.cat, "start": self.start, "end": self.end,
+            "duration": (self.end or time.time()) - self.start,
+            "pid": self.pid, "tid": self.tid, "thread": self.thread, "args": args,
+        }
+
+
+class _NullSpan:
+    def set(self, **args):
+        pass
+
+    def add(self, key, amount=1):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """
+    [Trace] 단계별 구간(span)을 모아 Chrome trace(chrome://tracing, Perfetto)와 JSON lines로 내보냅니다.
+    구간은 스레드별 스택으로 중첩되고, 캐시/다운로드/리미터는 add()로 지금 열린 구간에 bytes, cache, retries를 붙입니다.
+    """
+
+    def __init__(self, name="pipeline"):
+        self.name = name
+        self.spans = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def span(self, name, cat="stage", **args):
+        span = Span(name, cat, args)
+        stack = self._stack()
+        stack.append(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set(error=f"{type(e).__name__}: {e}"[:200])
+            raise
+        finally:
+            span.end = time.time()
+            stack.pop()
+            with self._lock:
+                self.spans.append(span.to_dict())
+
+    def current(self):
+        stack = self._stack()
+        return stack[-1] if stack else NULL_SPAN
+
+    def extend(self, span_dicts):
+        """다른 프로세스(병렬 렌더링 워커)에서 기록한 구간을 합칩니다."""
+        with self._lock:
+            self.spans.extend(span_dicts)
+
+    def records(self):
+        with self._lock:
+            return sorted(self.spans, key=lambda s: s["start"])
+
+    def to_chrome(self):
+        """Chrome trace 형식 (ph=X 완료 이벤트 + 스레드 이름 메타데이터, 시간 단위 us)"""
+        records = self.records()
+        events, threads = [], {}
+        for s in records:
+            events.append({
+                "name": s["name"], "cat": s["cat"], "ph": "X",
+                "ts": round(s["start"] * 1e6), "dur": round(s["duration"] * 1e6),
+                "pid": s["pid"], "tid": s["tid"], "args": s["args"],
+            })
+            threads[(s["pid"], s["tid"])] = s["thread"]
+        for (pid, tid), thread_name in threads.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": thread_name}})
+        return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"trace": self.name}}
+
+    def export(self, base_path):
+        """base_path.trace.json (Chrome trace) + base_path.trace.jsonl 을 쓰고 두 경로를 돌려줍니다."""
+        chrome_path, jsonl_path = base_path + ".trace.json", base_path + ".trace.jsonl"
+        with open(chrome_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_chrome(), f, ensure_ascii=False)
+        with open(jsonl_path, "w", encoding="utf-8") as f:
+            for record in self.records():
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return {"chrome": chrome_path, "jsonl": jsonl_path}
+
+    def summary(self):
+        """구간 이름별 합계: {name: {"count", "seconds", "bytes", "retries", "cache_hits", "cache_misses"}}"""
+        totals = {}
+        for s in self.records():
+            entry = totals.setdefault(s["name"], {"count": 0, "seconds": 0.0, "bytes": 0, "retries": 0, "cache_hits": 0, "cache_misses": 0})
+            entry["count"] += 1
+            entry["seconds"] += s["duration"]
+            entry["bytes"] += s["args"].get("bytes", 0)
+            entry["retries"] += s["args"].get("retries", 0)
+            if s["args"].get("cache") == "hit":
+                entry["cache_hits"] += 1
+            elif s["args"].get("cache") == "miss":
+                entry["cache_misses"] += 1
+        for entry in totals.values():
+            entry["seconds"] = round(entry["seconds"], 3)
+        return dict(sorted(totals.items(), key=lambda item: -item[1]["seconds"]))
+
+
+class _NullTracer:
+    """추적이 꺼져 있을 때 쓰는 빈 구현 (호출 비용만 남음)"""
+
+    @contextmanager
+    def span(self, name, cat="stage", **args):
+        yield NULL_SPAN
+
+    def current(self):
+        return NULL_SPAN
+
+
+NULL_TRACER = _NullTracer()
+_active = None
+_active_lock = threading.Lock()
+
+
+def get_tracer():
+    """프로세스 전체에서 지금 켜져 있는 추적기 (없으면 아무것도 기록하지 않는 빈 추적기)"""
+    return _active or NULL_TRACER
+
+
+def is_active():
+    return _active is not None
+
+
+@contextmanager
+def activate(tracer):
+    """with 블록 동안 tracer를 프로세스 전역 추적기로 씁니다. (모든 스레드의 구간이 여기로 모임)"""
+    global _active
+    with _active_lock:
+        previous, _active = _active, tracer
+    try:
+        yield tracer
+    finally:
+        with _active_lock:
+            _active = previous
+
+
+def span(name, cat="stage", **args):
+    return get_tracer().span(name, cat, **args)
+
+
+def add(key, amount=1):
+    """지금 스레드에서 열린 구간에 값을 더합니다. (bytes, retries, motion_s 등)"""
+    get_tracer().current().add(key, amount)
+
+
+def annotate(**args):
+    """지금 스레드에서 열린 구간에 정보를 붙입니다. (cache="hit" 등)"""
+    get_tracer().current().set(**args)
+
+
+def traced(name, cat="provider"):
+    """함수 호출 전체를 구간 하나로 기록하는 데코레이터"""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name, cat):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def run_traced(fn, *args, **kwargs):
+    """
+    [Worker] 자식 프로세스에서 fn을 새 추적기로 실행하고 (결과, 구간 목록)을 돌려줍니다.
+    부모는 구간 목록을 Tracer.extend로 합칩니다. (시간은 epoch 기준이라 프로세스가 달라도 한 타임라인에 맞음)
+    """
+    tracer = Tracer(f"worker-{os.getpid()}")
+    with activate(tracer):
+        result = fn(*args, **kwargs)
+    return result, tracer.records()
+
+
+def profile_call(profile_path, fn, *args, **kwargs):
+    """
+    [Profile] fn을 cProfile로 감싸 실행하고 profile_path(.prof)와 상위 30개 함수 요약(.txt)을 남깁니다.
+    cProfile은 호출한 스레드만 보므로 별도 프로세스(병렬 세그먼트 인코딩) 안쪽은 들어가지 않습니다.
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        profiler.disable()
+        profiler.dump_stats(profile_path)
+        with open(os.path.splitext(profile_path)[0] + ".txt", "w", encoding="utf-8") as f:
+            pstats.Stats(profiler, stream=f).sort_stats("cumulative").print_stats(30)
@@ -1,27 +1,43 @@
 # tts_module.py
+import io
 import os
-from google.cloud import texttospeech
-from dotenv import load_dotenv
+import wave
+from xml.sax.saxutils import escape
+from cache_module import get_default_cache, make_key
+from client_module import get_default_registry
+from ratelimit_module import get_rate_limiters
 
-load_dotenv()
+# 프로바이더 SDK/dotenv는 실제로 합성할 때만 필요 (벤치마크/테스트는 SDK 없이 import)
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass
 # GOOGLE_APPLICATION_CREDENTIALS 환경 변수가 자동으로 로드되어 인증에 사용됩니다.
 
-def generate_audio(text, filename, output_dir="assets/audio"):
+def generate_audio(text, filename, output_dir="assets/audio", clients=None):
     """
     텍스트를 받아 음성 파일을 생성하고 지정된 경로에 저장하는 함수
     """
+    from google.cloud import texttospeech
+
     os.makedirs(output_dir, exist_ok=True)
     filepath = os.path.join(output_dir, filename)
 
-    if os.path.exists(filepath):
-        print(f"⏭️ 오디오 스킵: {filename} (이미 존재함)")
-        return filepath
+    # 같은 문장 + 같은 성우면 캐시에서 꺼내 씀 (파일명과 무관)
+    voice_name = "ko-KR-Standard-C"
+    cache = get_default_cache()
+    cache_key = make_key("audio", prompt=text, model="google-tts-mp3", voice=voice_name)
+    cached_path = cache.get(cache_key, ".mp3")
+    if cached_path:
+        print(f"⏭️ 오디오 스킵: {filename} (캐시 적중)")
+        return cache.materialize(cached_path, filepath)
 
     print(f"🎙️ 구글 TTS: 음성 생성 중... ({filename})")
     
     try:
-        # 1. 클라이언트 생성
-        client = texttospeech.TextToSpeechClient()
+        # 1. 클라이언트 (프로세스 전역 레지스트리에서 재사용)
+        client = (clients or get_default_registry()).tts_client()
 
         # 2. 입력 텍스트 설정
         synthesis_input = texttospeech.SynthesisInput(text=text)
@@ -30,7 +46,7 @@ def generate_audio(text, filename, output_dir="assets/audio"):
         # *참고: 구글 클라우드 콘솔에서 원하는 목소리 ID 확인 가능
         voice = texttospeech.VoiceSelectionParams(
             language_code="ko-KR",
-            name="ko-KR-Standard-C", 
+            name=voice_name, 
             ssml_gender=texttospeech.SsmlVoiceGender.MALE
         )
 
@@ -39,17 +55,138 @@ def generate_audio(text, filename, output_dir="assets/audio"):
             audio_encoding=texttospeech.AudioEncoding.MP3
         )
 
-        # 5. 음성 합성 요청
-        response = client.synthesize_speech(
+        # 5. 음성 합성 요청 (프로세스 공유 속도 제한 + 429/503 재시도)
+        response = get_rate_limiters().call(
+            "tts", voice_name, client.synthesize_speech,
             input=synthesis_input, voice=voice, audio_config=audio_config
         )
 
         # 6. 파일 저장
-        with open(filepath, "wb") as out:
-            out.write(response.audio_content)
-            print(f"✅ 오디오 저장 완료: {filepath}")
-            return filepath
+        cached_path = cache.put_bytes(cache_key, response.audio_content, ".mp3")
+        cache.materialize(cached_path, filepath)
+        print(f"✅ 오디오 저장 완료: {filepath}")
+        return filepath
             
     except Exception as e:
         print(f"❌ 구글 TTS 오류: {e}")
-        return None
\ No newline at end of file
+        return None
+
+# --- 일괄 합성 (SSML <mark> + timepoint로 씬별 분할) ---
+MAX_SSML_BYTES = 5000 # synthesize_speech 입력 크기 한도
+BATCH_GAP_MS = 200    # 씬 사이에 넣는 짧은 쉼 (자르는 지점을 깔끔하게)
+
+
+def build_batch_ssml(texts, gap_ms=BATCH_GAP_MS):
+    """
+    각 씬 앞에 <mark name="s{i}"/>를 넣어 하나의 SSML 문서로 합칩니다.
+    """
+    parts = ["<speak>"]
+    for i, text in enumerate(texts):
+        if i:
+            parts.append(f'<break time="{gap_ms}ms"/>')
+        parts.append(f'<mark name="s{i}"/>{escape(text)}')
+    parts.append("</speak>")
+    return "".join(parts)
+
+
+def pack_batches(texts, max_bytes=MAX_SSML_BYTES):
+    """
+    SSML 크기 한도 안에서 씬들을 순서대로 묶습니다. 혼자서도 한도를 넘는 씬은 [i] 단독 묶음이 됩니다.
+    """
+    batches, current = [], []
+    for i in range(len(texts)):
+        candidate = current + [i]
+        if current and len(build_batch_ssml([texts[j] for j in candidate]).encode("utf-8")) > max_bytes:
+            batches.append(current)
+            candidate = [i]
+        current = candidate
+    if current:
+        batches.append(current)
+    return batches
+
+
+def split_wav(wav_bytes, starts):
+    """
+    LINEAR16 WAV를 mark 시작 시각(초) 기준으로 잘라 씬별 WAV bytes 목록으로 돌려줍니다.
+    """
+    with wave.open(io.BytesIO(wav_bytes), "rb") as src:
+        params = src.getparams()
+        frames = src.readframes(src.getnframes())
+    frame_size = params.sampwidth * params.nchannels
+    total = len(frames) // frame_size
+    bounds = [min(total, max(0, int(round(t * params.framerate)))) for t in starts] + [total]
+    bounds[0] = 0 # 첫 씬은 맨 앞부터
+
+    clips = []
+    for begin, end in zip(bounds, bounds[1:]):
+        out = io.BytesIO()
+        with wave.open(out, "wb") as dst:
+            dst.setnchannels(params.nchannels)
+            dst.setsampwidth(params.sampwidth)
+            dst.setframerate(params.framerate)
+            dst.writeframes(frames[begin * frame_size:end * frame_size])
+        clips.append(out.getvalue())
+    return clips
+
+
+def synthesize_batch(texts, voice_name="ko-KR-Standard-C", gender="MALE", clients=None,
+                     credentials_json=None, credentials_path=None):
+    """
+    [Batch] 여러 씬을 RPC 한 번으로 합성하고 mark timepoint로 잘라 씬별 WAV bytes를 돌려줍니다.
+    """
+    from google.cloud import texttospeech_v1beta1 as tts
+
+    ssml = build_batch_ssml(texts)
+    if len(ssml.encode("utf-8")) > MAX_SSML_BYTES:
+        raise ValueError(f"SSML이 한도({MAX_SSML_BYTES} bytes)를 넘습니다.")
+
+    client = (clients or get_default_registry()).tts_client(credentials_json, credentials_path, beta=True)
+    request = tts.SynthesizeSpeechRequest(
+        input=tts.SynthesisInput(ssml=ssml),
+        voice=tts.VoiceSelectionParams(language_code="ko-KR", name=voice_name, ssml_gender=tts.SsmlVoiceGender[gender]),
+        audio_config=tts.AudioConfig(audio_encoding=tts.AudioEncoding.LINEAR16),
+        enable_time_pointing=[tts.SynthesizeSpeechRequest.TimepointType.SSML_MARK],
+    )
+    response = get_rate_limiters().call("tts", voice_name, client.synthesize_speech, request=request)
+
+    marks = {tp.mark_name: tp.time_seconds for tp in response.timepoints}
+    starts = [marks.get(f"s{i}") for i in range(len(texts))]
+    if any(t is None for t in starts):
+        raise ValueError("일부 mark의 timepoint가 없습니다.")
+    return split_wav(response.audio_content, starts)
+
+
+def generate_audio_batch(texts, voice_name="ko-KR-Standard-C", gender="MALE", clients=None,
+                         credentials_json=None, credentials_path=None, fallback=None):
+    """
+    [Batch] 캐시에 없는 씬만 모아서 SSML 한도 단위로 일괄 합성하고, 씬 순서대로 파일 경로 목록을 돌려줍니다.
+    한도를 넘는 씬이나 일괄 합성이 실패한 묶음은 fallback(text) (씬별 호출)로 처리합니다.
+    """
+    cache = get_default_cache()
+    paths = [None] * len(texts)
+    keys = [make_key("audio", prompt=text, model="google-tts-linear16-batch", voice=voice_name) for text in texts]
+
+    missing = []
+    for i, text in enumerate(texts):
+        # 씬별 호출(MP3)로 만든 적이 있으면 그것도 재사용
+        per_scene_key = make_key("audio", prompt=text, model="google-tts-mp3", voice=voice_name)
+        paths[i] = cache.get(keys[i], ".wav") or cache.get(per_scene_key, ".mp3")
+        if not paths[i]:
+            missing.append(i)
+
+    for batch in pack_batches([texts[i] for i in missing]):
+        indices = [missing[j] for j in batch]
+        try:
+            if len(indices) == 1 and len(build_batch_ssml([texts[indices[0]]]).encode("utf-8")) > MAX_SSML_BYTES:
+                raise ValueError("단독으로도 SSML 한도를 넘는 씬")
+            wavs = synthesize_batch(
+                [texts[i] for i in indices], voice_name, gender, clients, credentials_json, credentials_path
+            )
+            for i, wav_bytes in zip(indices, wavs):
+                paths[i] = cache.put_bytes(keys[i], wav_bytes, ".wav")
+            print(f"✅ TTS 일괄 합성: {len(indices)}개 씬 / 요청 1회")
+        except Exception as e:
+            print(f"⚠️ TTS 일괄 합성 불가 -> 씬별 합성으로 전환 ({len(indices)}개): {e}")
+            for i in indices:
+                paths[i] = fallback(texts[i]) if fallback else None
+    return paths
@@ -0,0 +1,158 @@
+# veo_module.py
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+DEFAULT_POLL_SECONDS = 10.0
+DEFAULT_DEADLINE_SECONDS = 300.0
+MAX_POLL_ERRORS = 3 # 폴링이 연속으로 이만큼 실패하면 그 작업은 포기 (이미지로 대체)
+POLL_WORKERS = 4 # 상태 확인 요청을 동시에 보내는 스레드 수 (제출용 'veo' 풀과 따로)
+
+
+class VeoJobManager:
+    """
+    [Veo] 장시간 생성 작업(operation)을 씬 목록이 정해지는 즉시 한꺼번에 제출하고, 스레드 하나가 돌아가며 폴링합니다.
+    생성은 서버에서 동시에 진행되므로 씬이 N개여도 전체 대기 시간은 Veo 한 번 정도입니다.
+
+    start(prompt) -> 핸들, poll(핸들) -> (끝났는지, 경로 또는 None) 두 함수만 알면 되므로 실제 API/벤치마크 가짜/재생 서버를 그대로 끼울 수 있습니다.
+    submit()은 프롬프트마다 Future(경로 또는 None)를 돌려줍니다. 마감 시각(deadline)이 지나면 남은 작업은 None으로 끝내
+    조립하는 쪽이 이미지 컷으로 넘어가게 합니다.
+
+    제출(start)은 pool의 'veo' 풀에서, 상태 확인(poll)은 관리자 전용 스레드 풀에서 실행하므로
+    속도 제한에 걸려 기다리는 제출이 이미 제출한 작업의 폴링을 막지 않습니다.
+    제출은 'veo' 속도 제한(ratelimit_module, 기본 burst 8 이후 10초에 1개)을 따르므로 씬이 burst보다 많으면
+    뒤쪽 씬은 제출이 늦어지고, 마감 전에 끝나지 않으면 이미지 컷으로 바뀝니다.
+    """
+
+    def __init__(self, pool, start, poll, poll_interval=DEFAULT_POLL_SECONDS, deadline=DEFAULT_DEADLINE_SECONDS, log=print):
+        self.pool = pool
+        self.start = start
+        self.poll = poll
+        self.poll_interval = poll_interval
+        self.deadline_at = time.time() + deadline if deadline else None
+        self.log = log
+        self._jobs = {}    # 프롬프트 -> Future
+        self._pending = [] # [(프롬프트, 핸들, 연속 폴링 실패 수)]
+        self._lock = threading.Lock()
+        self._resolve_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = threading.Event()
+        self._checks = ThreadPoolExecutor(max_workers=POLL_WORKERS, thread_name_prefix="veo-poll")
+        self._thread = threading.Thread(target=self._run, name="veo-poller", daemon=True)
+        self._thread.start()
+
+    def submit(self, prompt):
+        """생성 작업을 제출합니다. 같은 프롬프트는 한 번만 제출하고 같은 Future를 돌려줍니다."""
+        with self._lock:
+            future = self._jobs.get(prompt)
+            if future is not None:
+                return future
+            future = self._jobs[prompt] = Future()
+        if self._closed.is_set() or self._expired():
+            future.set_result(None)
+            return future
+        self.pool.submit("veo", self._start, prompt, future)
+        return future
+
+    def _expired(self):
+        return self.deadline_at is not None and time.time() >= self.deadline_at
+
+    def _start(self, prompt, future):
+        try:
+            handle = self.start(prompt)
+        except Exception as e:
+            self.log(f"Veo 제출 실패: {e}")
+            self._resolve(future, None)
+            return
+        # 캐시 적중 등 바로 끝나는 경우는 폴링 주기를 기다리지 않음 (확인은 폴링 풀에서 해 제출 스레드를 바로 돌려줌)
+        try:
+            self._checks.submit(self._first_check, prompt, handle)
+        except RuntimeError: # 이미 닫힘 (close가 남은 작업을 끝냄)
+            pass
+
+    def _first_check(self, prompt, handle):
+        try:
+            waiting, errors = self._check(prompt, handle, 0), 0
+        except Exception:
+            waiting, errors = True, 1
+        if waiting:
+            with self._lock:
+                self._pending.append((prompt, handle, errors))
+
+    def _check(self, prompt, handle, errors):
+        """한 번 폴링합니다. 계속 기다려야 하면 True."""
+        future = self._jobs[prompt]
+        if future.done():
+            return False
+        try:
+            done, path = self.poll(handle)
+        except Exception as e:
+            if errors + 1 >= MAX_POLL_ERRORS:
+                self.log(f"Veo 상태 확인 실패 ({errors + 1}회) -> 포기: {e}")
+                self._resolve(future, None)
+                return False
+            raise
+        if done:
+            self._resolve(future, path)
+            return False
+        return True
+
+    def _resolve(self, future, path):
+        with self._resolve_lock: # 폴링 결과와 마감 처리가 동시에 끝낼 수 있음
+            if not future.done():
+                future.set_result(path)
+
+    def _poll_once(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+        futures = [(item, self._checks.submit(self._check, *item)) for item in pending]
+        still = []
+        for (prompt, handle, errors), future in futures:
+            try:
+                if future.result():
+                    still.append((prompt, handle, 0))
+            except Exception:
+                still.append((prompt, handle, errors + 1))
+        with self._lock:
+            self._pending = still + self._pending
+
+    def _run(self):
+        while not self._closed.is_set():
+            timeout = self.poll_interval
+            if self.deadline_at is not None:
+                timeout = max(0.0, min(timeout, self.deadline_at - time.time()))
+            self._wake.wait(timeout)
+            self._wake.clear()
+            if self._closed.is_set():
+                break
+            if self._expired():
+                self._expire()
+                break
+            self._poll_once()
+
+    def _expire(self):
+        with self._lock:
+            waiting = [future for future in self._jobs.values() if not future.done()]
+            self._pending = []
+        if waiting:
+            self.log(f"⏰ Veo 마감 시간 초과: 끝나지 않은 {len(waiting)}개 씬은 AI 이미지로 대체합니다.")
+        for future in waiting:
+            self._resolve(future, None)
+
+    def close(self):
+        """폴링을 멈추고 끝나지 않은 작업은 None으로 끝냅니다. (서버 쪽 작업은 취소되지 않음)"""
+        self._closed.set()
+        self._wake.set()
+        self._thread.join()
+        self._checks.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            waiting = [future for future in self._jobs.values() if not future.done()]
+        for future in waiting:
+            self._resolve(future, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False